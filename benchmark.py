@@ -0,0 +1,421 @@
+'''
+Benchmarks for FPL Automation Project
+Author: Benjamin Tindal
+'''
+
+import argparse
+import os
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from fpl_auto import store
+from fpl_auto import elements
+from fpl_auto import evaluate
+from fpl_auto import metrics
+from fpl_auto import trees
+from fpl_auto import budget
+from fpl_auto.data import fpl_data, read_profiled_csv, CSV_PROFILES
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Benchmarks")
+    parser.add_argument('command', type=str,
+                        choices=[
+                            "discount", "training", "memory", "history", "engines", "incremental", "metrics", "trees", "budget"],
+                        help='discount = discount_next_n_gws against the per-player loop it replaced, training = get_training_data_all over a run of target gameweeks against the per-week concatenation it replaced, memory = memory used by a season loaded with the compact loading profile against reading every column, history = last -n matches of one player and of every player from the player history index against reading the gameweek CSVs, engines = fit time, predict time and test RMSE of each -engines model type over the walk-forward windows model.py trains on, incremental = total training time and next gameweek RMSE and accuracy of refitting every gameweek against warm starting with -warm_start stages and a full refit every -refit_every gameweeks, metrics = score_model over the training and test rows of every position and window against the per-row loop it replaced, with per position and price band metrics and bootstrap intervals, trees = predictions per second of the sklearn predict, the packed tree walk and the packed predict (table lookup for the boosted models), for batches of 1 row up to a what-if sweep of 10k+ rows, for each -engines tree model, budget = training time, stages kept and next gameweek RMSE of each -engines model type fitted as get_model does against fitted within -time_budget seconds per position and stopped early on a validation fold of the training data')
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, default='2023-24', help='Season to benchmark. Format: YYYY-YY e.g 2021-22, default: 2023-24')
+    parser.add_argument('-gw', type=int, default=10, help='Gameweek to benchmark, default: 10')
+    parser.add_argument('-n', type=int, default=5, help='Number of future gameweeks to discount, default: 5')
+    parser.add_argument('-repeat', type=int, default=20, help='How many times to repeat each measurement, default: 20')
+    parser.add_argument('-targets', type=int, default=10, help='How many target gameweeks to build training data for, from -gw onwards, default: 10')
+    parser.add_argument('-training_prev_weeks', type=int, default=19, help='How many past weeks of data to use for training, default: 19')
+    parser.add_argument('-engines', type=str, nargs='+', default=['linear', 'gradientboost', 'histgradientboost'],
+                        choices=['linear', 'randomforest', 'gradientboost', 'histgradientboost', 'neuralnetwork'], help='Model types to compare, default: linear gradientboost histgradientboost')
+    parser.add_argument('-model', type=str, default='gradientboost',
+                        choices=['linear', 'randomforest', 'gradientboost', 'histgradientboost', 'neuralnetwork'], help='Model type to train incrementally, default: gradientboost')
+    parser.add_argument('-warm_start', type=int, default=10, help='Stages added to the previous gameweek\'s models when warm starting, default: 10')
+    parser.add_argument('-refit_every', type=int, nargs='+', default=[4, 8], help='Full refit intervals to compare, default: 4 8')
+    parser.add_argument('-time_budget', type=float, default=None, help='Seconds each position\'s budgeted fit may take, default: no time limit')
+    parser.add_argument('-max_stages', type=int, default=None, help='Most stages of each position\'s budgeted fit, default: as many as get_model fits')
+    args = parser.parse_args()
+
+    return args
+
+def time_it(function, repeat):
+    """
+    Time a function, best of a number of runs.
+
+    Args:
+        function (function): Called with no arguments.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The fastest run in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def discount_loop(fpl, predictions, gw, n, discount_factor=0.8):
+    """
+    The per-player discounting loop discount_next_n_gws used before the xP matrix, kept as a reference.
+    """
+    n_next_weeks = fpl.post_model_weightings(predictions, gw, n)
+    for pos in n_next_weeks:
+        for i, row in pos.iterrows():
+            xp_array = row['xP']
+            for i in range(len(xp_array)):
+                xp_array[i] *= discount_factor ** i
+            row['xP'] = round(np.mean(xp_array), 2)
+    return n_next_weeks
+
+def score_model_loop(predictions, labels):
+    """
+    The per-row loop evaluate.score_model used before the metrics module, kept as a reference.
+    """
+    error = 0
+    mse = 0
+    accuracy = 0
+    for i in range(len(predictions)):
+        error += abs(predictions[i] - labels[i])
+        mse += (predictions[i] - labels[i]) ** 2
+        if round(predictions[i]) == labels[i]:
+            accuracy += 1
+    error /= len(predictions)
+    mse /= len(predictions)
+    accuracy /= len(predictions)
+
+    return error, np.sqrt(mse), accuracy
+
+def benchmark_discount(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    predictions = [pd.read_csv(f'predictions/{inputs.season}/GW{inputs.gw}/{pos}.tsv', sep='\t') for pos in ['GK', 'DEF', 'MID', 'FWD']]
+    n_players = sum(len(pos) for pos in predictions)
+
+    # Warm the caches so only the discounting is timed
+    fpl.discount_next_n_gws(predictions, inputs.gw, inputs.n)
+    loop_time = time_it(lambda: discount_loop(fpl, predictions, inputs.gw, inputs.n), inputs.repeat)
+    matrix_time = time_it(lambda: fpl.discount_next_n_gws(predictions, inputs.gw, inputs.n), inputs.repeat)
+    weighting_time = time_it(lambda: fpl.post_model_weightings_matrix(predictions, inputs.gw, inputs.n), inputs.repeat)
+
+    print(f'{inputs.season} GW{inputs.gw}: {n_players} players x {inputs.n} gameweeks')
+    print(f'Per-player loop:  {loop_time * 1000:.1f} ms')
+    print(f'xP matrix:        {matrix_time * 1000:.1f} ms ({loop_time / matrix_time:.1f}x faster)')
+    print(f'Discounting only: {(loop_time - weighting_time) * 1000:.1f} ms -> {(matrix_time - weighting_time) * 1000:.2f} ms')
+
+def training_data_loop(fpl, season, from_gw, to_gw):
+    """
+    The per-week concatenation get_training_data_all used before the season feature tensor, kept as a reference.
+    """
+    for i in range(from_gw, to_gw):
+        if i == from_gw:
+            if i < 1:
+                training = list(fpl.get_training_data(fpl.prev_season, 37 + i))
+            else:
+                training = list(fpl.get_training_data(season, i))
+        else:
+            if i < 1:
+                training_new = fpl.get_training_data(fpl.prev_season, 38 + i)
+            else:
+                training_new = fpl.get_training_data(season, i)
+            for position in range(4):
+                training[position] = (pd.concat((training[position][0], training_new[position][0])), pd.concat((training[position][1], training_new[position][1])))
+    return [train_test_split(features, labels, test_size=0.2, random_state=42) for features, labels in training]
+
+def measure(function):
+    """
+    Time a function once and record its peak traced memory.
+
+    Args:
+        function (function): Called with no arguments.
+
+    Returns:
+        tuple: The run time in seconds and the peak memory in bytes.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    run_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return run_time, peak
+
+def benchmark_training(inputs):
+    targets = range(inputs.gw, min(inputs.gw + inputs.targets, 39))
+
+    # Warm the frame cache so only building the training data is measured
+    warm = fpl_data(inputs.gw_data, inputs.season)
+    for i in targets:
+        training_data_loop(warm, inputs.season, i - inputs.training_prev_weeks, i)
+
+    def run_loop():
+        fpl = fpl_data(inputs.gw_data, inputs.season)
+        for i in targets:
+            training_data_loop(fpl, inputs.season, i - inputs.training_prev_weeks, i)
+
+    def run_tensor():
+        fpl = fpl_data(inputs.gw_data, inputs.season)
+        for i in targets:
+            fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i)
+
+    loop_time, loop_peak = measure(run_loop)
+    tensor_time, tensor_peak = measure(run_tensor)
+
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {len(targets)} target gameweeks x {inputs.training_prev_weeks} training weeks')
+    print(f'Per-week concat: {loop_time:.2f} s, peak memory {loop_peak / 2**20:.1f} MB')
+    print(f'Feature tensor:  {tensor_time:.2f} s, peak memory {tensor_peak / 2**20:.1f} MB ({loop_time / tensor_time:.1f}x faster)')
+
+def benchmark_memory(inputs):
+    season_location = f'{inputs.gw_data}/{inputs.season}'
+    gw_store = store.open_store(inputs.gw_data, inputs.season)
+
+    # Parsing every gameweek CSV, as building the store does
+    def read_gws(**kwargs):
+        for path in gw_store.source_files().values():
+            pd.read_csv(path, **kwargs)
+    _, full_peak = measure(read_gws)
+    _, profile_peak = measure(lambda: read_gws(usecols=lambda column: column in store.STORE_COLUMNS))
+
+    # The store's columns as written before the compact encoding, strings as fixed-width unicode and numbers as 64 bit
+    plain_bytes = 0
+    for column in gw_store.columns:
+        values = gw_store.get_column(column)
+        if values.dtype == object:
+            values = values.astype(str)
+        elif values.dtype.kind in 'iuf':
+            values = values.astype(np.float64 if values.dtype.kind == 'f' else np.int64)
+        plain_bytes += values.nbytes
+    store_bytes = sum(os.path.getsize(f'{gw_store.path}/{file_name}') for file_name in os.listdir(gw_store.path))
+
+    weeks = list(gw_store.weeks)
+    full_weeks = sum(gw_store.get_week(week).memory_usage(deep=True).sum() for week in weeks)
+    compact_weeks = sum(gw_store.get_week(week, compact=True).memory_usage(deep=True).sum() for week in weeks)
+
+    print(f'{inputs.season}: {len(weeks)} gameweeks')
+    print(f'Parsing gameweek CSVs: peak {full_peak / 2**20:.1f} MB all columns, {profile_peak / 2**20:.1f} MB stored columns only')
+    print(f'Gameweek store:        {plain_bytes / 2**20:.1f} MB plain, {store_bytes / 2**20:.1f} MB compact')
+    print(f'Gameweek frames:       {full_weeks / 2**20:.1f} MB as read, {compact_weeks / 2**20:.1f} MB compact')
+    for file_name, profile in CSV_PROFILES.items():
+        path = f'{season_location}/{file_name}'
+        if os.path.exists(path):
+            full = pd.read_csv(path).memory_usage(deep=True).sum()
+            profiled = read_profiled_csv(path, profile).memory_usage(deep=True).sum()
+            print(f'{file_name + ":":22} {full / 2**10:.0f} KB all columns, {profiled / 2**10:.0f} KB profiled')
+
+def benchmark_history(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    player_history = fpl.get_player_history(inputs.season)
+    all_elements = np.array(sorted(player_history.directories))
+    element = int(all_elements[0])
+
+    def read_gws():
+        gw_data = [pd.read_csv(f'{inputs.gw_data}/{inputs.season}/gws/gw{week_num}.csv') for week_num in range(1, inputs.gw)]
+        gw_data = pd.concat(gw_data)
+        return gw_data[gw_data['element'] == element].tail(inputs.n)
+
+    csv_time = time_it(read_gws, 1)
+    one_time = time_it(lambda: player_history.last_k(element, inputs.n, ['total_points', 'minutes'], before_round=inputs.gw), inputs.repeat)
+    batch_time = time_it(lambda: player_history.batch(all_elements, ['total_points', 'minutes'], k=inputs.n, before_round=inputs.gw), inputs.repeat)
+
+    print(f'{inputs.season} before GW{inputs.gw}: last {inputs.n} matches')
+    print(f'Gameweek CSVs, one player: {csv_time * 1000:.1f} ms')
+    print(f'History index, one player: {one_time * 1e6:.0f} us')
+    print(f'History index, {len(all_elements)} players: {batch_time * 1e6:.0f} us')
+
+def benchmark_engines(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    targets = range(inputs.gw, min(inputs.gw + inputs.targets, 39))
+    windows = [fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i) for i in targets]
+
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {len(targets)} walk-forward windows of {inputs.training_prev_weeks} weeks')
+    # Test RMSE is evaluate.score_model's, averaged over the positions and windows
+    print(f'{"Engine":18} {"Fit (s)":>9} {"Predict (s)":>12} {"Test RMSE":>10}')
+    for engine in inputs.engines:
+        fit_time = 0
+        predict_time = 0
+        rmses = []
+        for training_data, test_data in windows:
+            start = time.perf_counter()
+            models = fpl.get_model(engine, training_data, random_state=0)
+            fit_time += time.perf_counter() - start
+
+            for model, (features, labels) in zip(models, test_data):
+                start = time.perf_counter()
+                predictions = np.round(model.predict(features), 5)
+                predict_time += time.perf_counter() - start
+                rmses.append(evaluate.score_model(predictions, labels.to_numpy())[1])
+        print(f'{engine:18} {fit_time:9.2f} {predict_time:12.3f} {np.mean(rmses):10.3f}')
+
+def benchmark_incremental(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    targets = range(inputs.gw, min(inputs.gw + inputs.targets, 39))
+    windows = [fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i)[0] for i in targets]
+    # Scored on the target gameweek itself, the window's own test split overlaps what earlier warm started models trained on
+    next_gws = [fpl.get_training_data(inputs.season, i) for i in targets]
+
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {inputs.model}, {len(targets)} walk-forward windows of {inputs.training_prev_weeks} weeks')
+    print(f'{"Mode":26} {"Training (s)":>13} {"Next GW RMSE":>13} {"Next GW ACC":>12}')
+    # A refit interval of 1 refits every gameweek, as model.py does without -warm_start
+    for refit_every in [1] + inputs.refit_every:
+        training_time = 0
+        rmses = []
+        accuracies = []
+        models = None
+        for offset, (training_data, test_data) in enumerate(zip(windows, next_gws)):
+            if offset % refit_every == 0:
+                models = fpl.get_model(inputs.model, training_data, random_state=0)
+            else:
+                models = fpl.update_models(models, training_data, inputs.warm_start)
+            training_time += fpl.fit_wall_time
+
+            for model, (features, labels) in zip(models, test_data):
+                _, rmse, accuracy = evaluate.score_model(np.round(model.predict(features), 5), labels.to_numpy())
+                rmses.append(rmse)
+                accuracies.append(accuracy)
+        mode = 'refit every gameweek' if refit_every == 1 else f'+{inputs.warm_start} stages, refit every {refit_every}'
+        print(f'{mode:26} {training_time:13.2f} {np.mean(rmses):13.3f} {np.mean(accuracies) * 100:11.2f}%')
+
+def benchmark_budget(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    targets = range(inputs.gw, min(inputs.gw + inputs.targets, 39))
+    windows = [fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i) for i in targets]
+    # Scored on the target gameweek itself, as model.py's test split is not used by either mode
+    next_gws = [fpl.get_training_data(inputs.season, i) for i in targets]
+
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {len(targets)} walk-forward windows of {inputs.training_prev_weeks} weeks, '
+          f'time budget {"none" if inputs.time_budget is None else f"{inputs.time_budget}s"}, max stages {inputs.max_stages or "as get_model"}')
+    print(f'{"Engine":18} {"Mode":9} {"Training (s)":>13} {"Slowest fit (s)":>16} {"Mean stages":>12} {"Next GW RMSE":>13}')
+    for engine in inputs.engines:
+        for mode in ['full', 'budgeted']:
+            training_time = 0
+            slowest = 0
+            stages = []
+            rmses = []
+            for (training_data, _), next_gw in zip(windows, next_gws):
+                if mode == 'full':
+                    models = fpl.get_model(engine, training_data, random_state=0)
+                    stages += [budget.fitted_stages(model) for model in models]
+                else:
+                    models = fpl.get_budgeted_model(engine, training_data, inputs.time_budget, inputs.max_stages, random_state=0)
+                    stages += list(fpl.fit_stages.values())
+                training_time += fpl.fit_wall_time
+                slowest = max(slowest, *fpl.fit_times.values())
+
+                for model, (features, labels) in zip(models, next_gw):
+                    rmses.append(evaluate.score_model(np.round(model.predict(features), 5), labels.to_numpy())[1])
+            mean_stages = '-' if None in stages else f'{np.mean(stages):.0f}'
+            print(f'{engine:18} {mode:9} {training_time:13.2f} {slowest:16.2f} {mean_stages:>12} {np.mean(rmses):13.3f}')
+
+def benchmark_metrics(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    targets = range(inputs.gw, min(inputs.gw + inputs.targets, 39))
+    predictions = []
+    labels = []
+    prices = []
+    positions = []
+    for i in targets:
+        training_data, test_data = fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i)
+        models = fpl.get_model('linear', training_data)
+        for position, model in enumerate(models):
+            for features, position_labels in (training_data[position], test_data[position]):
+                predictions.append(np.round(model.predict(features), 5))
+                labels.append(position_labels.to_numpy())
+                prices.append(features['value'].to_numpy() / 10)
+                positions.append(np.full(len(features), position))
+    rows = sum(len(pair_labels) for pair_labels in labels)
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {len(labels)} (predictions, labels) pairs, {rows} rows')
+
+    loop = np.array([score_model_loop(pair_predictions, pair_labels) for pair_predictions, pair_labels in zip(predictions, labels)])
+    batch = metrics.score_batch(predictions, labels)
+    batch = np.column_stack([batch[metric] for metric in metrics.METRICS])
+    print(f'Largest difference from the loop: {np.abs(loop - batch).max():.2e}')
+
+    loop_time = time_it(lambda: [score_model_loop(pair_predictions, pair_labels) for pair_predictions, pair_labels in zip(predictions, labels)], 1)
+    score_time = time_it(lambda: [evaluate.score_model(pair_predictions, pair_labels) for pair_predictions, pair_labels in zip(predictions, labels)], inputs.repeat)
+    batch_time = time_it(lambda: metrics.score_batch(predictions, labels), inputs.repeat)
+    print(f'Per-row loop:           {loop_time * 1000:9.1f} ms')
+    print(f'score_model per pair:   {score_time * 1000:9.1f} ms ({loop_time / score_time:.0f}x)')
+    print(f'score_batch, one pass:  {batch_time * 1000:9.1f} ms ({loop_time / batch_time:.0f}x)')
+
+    all_predictions = np.concatenate(predictions)
+    all_labels = np.concatenate(labels)
+    grouped_time = time_it(lambda: metrics.score_groups(all_predictions, all_labels, np.concatenate(positions)), inputs.repeat)
+    bands_time = time_it(lambda: metrics.score_groups(all_predictions, all_labels, metrics.price_band(np.concatenate(prices))), inputs.repeat)
+    pairs = np.repeat(np.arange(len(labels)), [len(pair_labels) for pair_labels in labels])
+    bootstrap_time = time_it(lambda: metrics.bootstrap(all_predictions, all_labels, random_state=0), 1)
+    pairs_time = time_it(lambda: metrics.bootstrap(all_predictions, all_labels, groups=pairs, random_state=0), inputs.repeat)
+    print(f'Per position:           {grouped_time * 1000:9.1f} ms')
+    print(f'Per price band:         {bands_time * 1000:9.1f} ms')
+    print(f'Bootstrap rows (1000x): {bootstrap_time * 1000:9.1f} ms')
+    print(f'Bootstrap pairs (1000x):{pairs_time * 1000:9.1f} ms')
+
+    by_position = metrics.score_groups(all_predictions, all_labels, np.concatenate(positions))
+    by_band = metrics.score_groups(all_predictions, all_labels, metrics.price_band(np.concatenate(prices)), len(metrics.PRICE_BANDS) + 1)
+    band_names = [f'<={edge:.1f}m' for edge in metrics.PRICE_BANDS] + [f'>{metrics.PRICE_BANDS[-1]:.1f}m']
+    intervals = metrics.bootstrap(all_predictions, all_labels, groups=pairs, random_state=0)
+    for name, group, scores in [(position, j, by_position) for j, position in enumerate(elements.POSITIONS)] + [(band, j, by_band) for j, band in enumerate(band_names)]:
+        print(f'{name:8} rows: {scores["count"][group]:7d}  AE: {scores["error"][group]:.3f}  RMSE: {scores["rmse"][group]:.3f}  ACC: {scores["accuracy"][group] * 100:.2f}%')
+    print('95% intervals, resampling pairs: ' + ', '.join(f'{metric}: {low:.4f}-{high:.4f}' for metric, (low, high) in intervals.items()))
+
+def benchmark_trees(inputs):
+    fpl = fpl_data(inputs.gw_data, inputs.season)
+    training_data, test_data = fpl.get_training_data_all(inputs.season, inputs.gw - inputs.training_prev_weeks, inputs.gw)
+    # The midfielders, the largest position, with the training rows repeated up to a what-if sweep of 10k+ rows
+    features = test_data[2][0]
+    sweep = pd.concat([training_data[2][0]] * -(-10000 // len(training_data[2][0])))
+    print(f'{inputs.season} GW{inputs.gw} MID: {len(training_data[2][0])} training rows, {len(features)} test rows')
+
+    for engine in inputs.engines:
+        if engine not in ('gradientboost', 'randomforest'):
+            continue
+        model = fpl.get_model(engine, training_data, random_state=0)[2]
+        start = time.perf_counter()
+        packed = trees.export_model(model)
+        export_time = time.perf_counter() - start
+        difference = np.abs(packed.predict(sweep) - model.predict(sweep)).max()
+        print(f'{engine}: {len(packed.roots)} trees, {len(packed.value)} nodes, depth {packed.depth}, '
+              f'{"table lookup" if packed.leaf_table is not None else "walked"}, exported in {export_time * 1000:.1f} ms, '
+              f'largest difference from sklearn {difference:.1e}')
+        print(f'{"Rows per call":>14} {"sklearn (rows/s)":>17} {"walk (rows/s)":>14} {"predict (rows/s)":>17} {"Speed-up":>9}')
+        for batch in [features.iloc[:1], features.iloc[:20], features.iloc[:200], features, sweep]:
+            rows = len(batch)
+            # Many calls per run for small batches, where the per-call overhead dominates
+            calls = max(1, 1000 // rows)
+            sklearn_time = time_it(lambda: [model.predict(batch) for _ in range(calls)], inputs.repeat) / calls
+            walk_time = time_it(lambda: [packed.walk(batch) for _ in range(calls)], inputs.repeat) / calls
+            if packed.leaf_table is not None:
+                packed_time = time_it(lambda: [packed.predict(batch) for _ in range(calls)], inputs.repeat) / calls
+            else:
+                # Walked ensembles predict by walking
+                packed_time = walk_time
+            print(f'{rows:14d} {rows / sklearn_time:17,.0f} {rows / walk_time:14,.0f} {rows / packed_time:17,.0f} {sklearn_time / packed_time:8.1f}x')
+
+def main():
+    inputs = parse_args()
+    if inputs.command == 'discount':
+        benchmark_discount(inputs)
+    elif inputs.command == 'training':
+        benchmark_training(inputs)
+    elif inputs.command == 'memory':
+        benchmark_memory(inputs)
+    elif inputs.command == 'history':
+        benchmark_history(inputs)
+    elif inputs.command == 'engines':
+        benchmark_engines(inputs)
+    elif inputs.command == 'incremental':
+        benchmark_incremental(inputs)
+    elif inputs.command == 'metrics':
+        benchmark_metrics(inputs)
+    elif inputs.command == 'trees':
+        benchmark_trees(inputs)
+    elif inputs.command == 'budget':
+        benchmark_budget(inputs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+'''
+Dataset Tools for FPL Automation Project
+Author: Benjamin Tindal
+'''
+
+import argparse
+import time
+from fpl_auto import store
+from fpl_auto import gw_calendar
+from fpl_auto import manifest
+from fpl_auto import evaluate
+from fpl_auto.data import fpl_data
+
+# Seasons model.py predicts for, plus the season before the first for early training windows
+SEASONS = ['2020-21', '2021-22', '2022-23', '2023-24', '2024-25']
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Dataset Tools")
+    parser.add_argument('command', type=str,
+                        choices=[
+                            "build", "load", "manifest", "ingest", "refresh_calendar"],
+                        help='build = convert gameweek CSVs into the columnar store, load = build the gameweek, player and understat stores with a pool of parser threads and report throughput, manifest = record the size and content hash of every input file and list the files added, changed or removed since the last run, ingest = update the stores with newly scraped files for the latest season (or -season), parsing only what changed, and mark the predictions they invalidate as stale, refresh_calendar = save the live gameweek deadlines from the FPL API for the latest season')
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-season', type=str, nargs='+', default=None, help='Season(s) to process. Format: YYYY-YY e.g 2021-22, default: ' + ', '.join(SEASONS))
+    parser.add_argument('-force',
+                        action=argparse.BooleanOptionalAction, default=False, help='Rebuild even if the store is up to date, default: False')
+    parser.add_argument('-workers', type=int, default=4, help='Number of threads parsing CSVs for load, default: 4')
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    inputs = parse_args()
+    data_location = inputs.gw_data.rstrip('/')
+    seasons = inputs.season if inputs.season is not None else SEASONS
+
+    if inputs.command == 'build':
+        store.build_stores(data_location, seasons, force=inputs.force)
+    elif inputs.command == 'load':
+        fpl_data(data_location, seasons[-1]).bulk_load(seasons, workers=inputs.workers, force=inputs.force)
+    elif inputs.command == 'manifest':
+        for season in seasons:
+            season_manifest = manifest.open_manifest(data_location, season)
+            changes = season_manifest.refresh()
+            season_manifest.save()
+            print(f'{season}: {len(season_manifest.entries)} files, {len(changes["added"])} added, {len(changes["changed"])} changed, {len(changes["removed"])} removed')
+            for file_name in changes['changed']:
+                print(f'    changed: {file_name}')
+    elif inputs.command == 'ingest':
+        for season in (inputs.season if inputs.season is not None else SEASONS[-1:]):
+            start = time.perf_counter()
+            changes = fpl_data(data_location, season).ingest(season)
+            print(f'{season}: {len(changes["added"])} files added, {len(changes["changed"])} changed, {len(changes["removed"])} removed in {time.perf_counter() - start:.2f} s')
+            if len(changes['weeks']) > 0:
+                print(f'    gameweeks updated: {", ".join(f"GW{week_num}" for week_num in changes["weeks"])}')
+                stale = evaluate.mark_predictions_stale(season, min(changes['weeks']))
+                if len(stale) > 0:
+                    print(f'    predictions now stale: {", ".join(f"GW{week_num}" for week_num in stale)}, '
+                          f're-run model.py -season {season} -target_gw {stale[0]} -repeat {stale[-1] - stale[0] + 1} -s')
+    elif inputs.command == 'refresh_calendar':
+        # The FPL API only ever serves the live season
+        gw_calendar.refresh_snapshot(data_location, seasons[-1])
+
+if __name__ == '__main__':
+    main()
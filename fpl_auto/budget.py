@@ -0,0 +1,171 @@
+import copy
+import time
+import warnings
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPRegressor
+from fpl_auto import metrics
+
+# Stages (boosting rounds, trees or epochs) fitted between validation checks, per model class
+CHECK_STEPS = {
+    GradientBoostingRegressor: 10,
+    HistGradientBoostingRegressor: 10,
+    RandomForestRegressor: 50,
+    MLPRegressor: 5,
+}
+
+# Checks in a row without a better validation RMSE before training stops
+DEFAULT_PATIENCE = 3
+
+def stage_limit(model):
+    """
+    Get the number of stages a model is configured to fit.
+
+    Args:
+        model: The scikit-learn estimator.
+
+    Returns:
+        int: Its n_estimators or max_iter, or None for models without stages.
+    """
+    if isinstance(model, (GradientBoostingRegressor, RandomForestRegressor)):
+        return model.n_estimators
+    if isinstance(model, (HistGradientBoostingRegressor, MLPRegressor)):
+        return model.max_iter
+    return None
+
+def fitted_stages(model):
+    """
+    Get the number of stages a fitted model has.
+
+    Args:
+        model: The fitted scikit-learn estimator.
+
+    Returns:
+        int: Its boosting stages, trees or epochs, or None for models without stages.
+    """
+    if isinstance(model, (GradientBoostingRegressor, RandomForestRegressor)):
+        return len(model.estimators_)
+    if isinstance(model, (HistGradientBoostingRegressor, MLPRegressor)):
+        return model.n_iter_
+    return None
+
+def grow(model, stages, fitted_stages):
+    """
+    Set a model up to continue fitting from fitted_stages to stages on its next fit.
+
+    Args:
+        model: The scikit-learn estimator, with CHECK_STEPS.
+        stages (int): The stages it should have after the fit.
+        fitted_stages (int): The stages it has now.
+    """
+    if isinstance(model, GradientBoostingRegressor):
+        model.set_params(warm_start=True, n_estimators=stages)
+    elif isinstance(model, RandomForestRegressor):
+        # The validation split stands in for the out-of-bag score, which would be recomputed on every fit
+        model.set_params(warm_start=True, n_estimators=stages, oob_score=False)
+    elif isinstance(model, HistGradientBoostingRegressor):
+        # Stopped on the given validation split rather than one of its own
+        model.set_params(warm_start=True, early_stopping=False, max_iter=stages)
+    else:
+        # A warm started network trains max_iter more epochs per fit
+        model.set_params(warm_start=True, max_iter=stages - fitted_stages)
+
+def truncate(model, stages):
+    """
+    Cut a boosted or forest model back to its first stages, which predict just as if it had stopped there.
+
+    Args:
+        model (GradientBoostingRegressor or RandomForestRegressor): The fitted model, cut in place.
+        stages (int): The stages to keep.
+    """
+    model.estimators_ = model.estimators_[:stages]
+    model.set_params(n_estimators=stages)
+    if isinstance(model, GradientBoostingRegressor):
+        model.train_score_ = model.train_score_[:stages]
+        model.n_estimators_ = stages
+
+def validation_rmse(model, validation):
+    """
+    Score a model on held out data.
+
+    Args:
+        model: The fitted scikit-learn estimator.
+        validation (tuple): The (features, labels) held out.
+
+    Returns:
+        float: The root mean squared error of its predictions.
+    """
+    features, labels = validation
+    return float(metrics.score(model.predict(features), labels.to_numpy())['rmse'])
+
+def fit_budgeted(model, features, labels, validation, time_budget=None, max_stages=None, patience=DEFAULT_PATIENCE):
+    """
+    Fit a model a few stages at a time until its validation RMSE stops improving or the budget runs out.
+
+    Boosted models gain rounds, forests gain trees and networks train more epochs between checks, each fit
+    warm started from the last. The model then keeps the stages with the best validation RMSE. Models
+    without stages (linear regression) are fitted once.
+
+    Args:
+        model: The unfitted scikit-learn estimator.
+        features (pandas.DataFrame): The training features.
+        labels (pandas.Series): The training labels.
+        validation (tuple): The (features, labels) held out to stop on, e.g. get_training_data_all's test split.
+        time_budget (float): Stop before the next check would take the fit past this many seconds, going by
+                             how long the last one took (default: None, no time limit).
+        max_stages (int): The most stages to fit (default: None, the model's own n_estimators or max_iter).
+        patience (int): Stop after this many checks in a row without a better validation RMSE (default: DEFAULT_PATIENCE).
+
+    Returns:
+        tuple: The fitted model (a copy of the given one for networks and binned boosting), and a dict of the
+               'stages' kept, the 'fit_time' in seconds, the 'validation_rmse' and why fitting 'stopped':
+               'patience', 'time', 'stages' or, for models without stages, 'fit'.
+    """
+    start = time.perf_counter()
+    step = CHECK_STEPS.get(type(model))
+    if step is None:
+        model.fit(features, labels)
+        return model, {'stages': None, 'fit_time': time.perf_counter() - start,
+                       'validation_rmse': validation_rmse(model, validation), 'stopped': 'fit'}
+
+    if max_stages is None:
+        max_stages = stage_limit(model)
+    # Boosted and forest models can be cut back to their best stages, the others are copied whenever they improve
+    prefix = isinstance(model, (GradientBoostingRegressor, RandomForestRegressor))
+    best = (float('inf'), 0, None)
+    stages = 0
+    misses = 0
+    stopped = 'stages'
+    while stages < max_stages:
+        check_start = time.perf_counter()
+        next_stages = min(stages + step, max_stages)
+        grow(model, next_stages, stages)
+        stages = next_stages
+        with warnings.catch_warnings():
+            # Networks warn that they have not converged after every few epochs
+            warnings.simplefilter('ignore', ConvergenceWarning)
+            model.fit(features, labels)
+
+        rmse = validation_rmse(model, validation)
+        if rmse < best[0]:
+            best = (rmse, stages, None if prefix else copy.deepcopy(model))
+            misses = 0
+        else:
+            misses += 1
+            if misses >= patience:
+                stopped = 'patience'
+                break
+
+        now = time.perf_counter()
+        if time_budget is not None and stages < max_stages and now - start + (now - check_start) > time_budget:
+            stopped = 'time'
+            break
+
+    rmse, stages, copied = best
+    if prefix:
+        truncate(model, stages)
+    else:
+        model = copied
+    return model, {'stages': stages, 'fit_time': time.perf_counter() - start, 'validation_rmse': rmse, 'stopped': stopped}
@@ -0,0 +1,156 @@
+import collections
+import os
+import threading
+
+# Default memory cap for the shared frame cache, can be overridden with FPL_CACHE_MB
+DEFAULT_MAX_MB = 256
+
+class frame_cache:
+    def __init__(self, max_bytes):
+        """
+        Initialize a bounded least-recently-used cache of DataFrames.
+
+        Args:
+            max_bytes (int): The memory cap, the least recently used frames are evicted past this.
+        """
+        self.max_bytes = max_bytes
+        self.frames = collections.OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = collections.Counter()
+        self.lock = threading.RLock()
+
+    def get(self, key, loader):
+        """
+        Get a frame from the cache, loading it on a miss.
+
+        Frames returned are shared, so callers must not modify them in place.
+
+        Args:
+            key (tuple): The cache key, e.g. (data_location, season, week).
+            loader (function): Called with no arguments to load the frame on a miss.
+
+        Returns:
+            pandas.DataFrame: The cached frame.
+        """
+        with self.lock:
+            if key in self.frames:
+                self.hits += 1
+                self.frames.move_to_end(key)
+                return self.frames[key]
+            self.misses += 1
+            self.loads[key] += 1
+
+        frame = loader()
+
+        with self.lock:
+            self.put(key, frame)
+        return frame
+
+    def put(self, key, frame):
+        """
+        Add a frame to the cache, evicting the least recently used frames if over the memory cap.
+
+        Args:
+            key (tuple): The cache key.
+            frame (pandas.DataFrame): The frame to cache.
+        """
+        with self.lock:
+            if key in self.frames:
+                self.total_bytes -= self.sizes.pop(key)
+                del self.frames[key]
+
+            size = int(frame.memory_usage(index=True, deep=True).sum())
+            # Frames bigger than the whole cache are never kept
+            if size > self.max_bytes:
+                return
+
+            self.frames[key] = frame
+            self.sizes[key] = size
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes:
+                old_key, _ = self.frames.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(old_key)
+                self.evictions += 1
+
+    def discard(self, key):
+        """
+        Drop a frame from the cache, e.g. because the file it was loaded from changed.
+
+        Args:
+            key (tuple): The cache key.
+        """
+        with self.lock:
+            if key in self.frames:
+                self.total_bytes -= self.sizes.pop(key)
+                del self.frames[key]
+
+    def resize(self, max_bytes):
+        """
+        Change the memory cap, evicting frames if the cache is now over it.
+
+        Args:
+            max_bytes (int): The new memory cap.
+        """
+        with self.lock:
+            self.max_bytes = max_bytes
+            while self.total_bytes > self.max_bytes and len(self.frames) > 0:
+                old_key, _ = self.frames.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(old_key)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Empty the cache and reset its counters.
+        """
+        with self.lock:
+            self.frames.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.loads.clear()
+
+    def stats(self):
+        """
+        Get the cache's counters.
+
+        Returns:
+            dict: Hits, misses, evictions, frames held, bytes held and the most times any key was loaded.
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'frames': len(self.frames),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_loads_per_key': max(self.loads.values(), default=0),
+            }
+
+# Process-wide cache shared by every fpl_data (and so every team) instance
+frames = frame_cache(int(float(os.environ.get('FPL_CACHE_MB', DEFAULT_MAX_MB)) * 2**20))
+
+def set_max_mb(max_mb):
+    """
+    Set the memory cap of the shared frame cache.
+
+    Args:
+        max_mb (float): The memory cap in megabytes.
+    """
+    frames.resize(int(max_mb * 2**20))
+
+def print_stats():
+    """
+    Print a one line summary of the shared frame cache.
+    """
+    stats = frames.stats()
+    print(f"Frame cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+          f"{stats['frames']} frames ({stats['bytes'] / 2**20:.1f}/{stats['max_bytes'] / 2**20:.0f} MB), "
+          f"each frame loaded at most {stats['max_loads_per_key']}x")
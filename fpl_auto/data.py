@@ -4,10 +4,89 @@ from sklearn import linear_model
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.neural_network import MLPRegressor
-import datetime
+import collections
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import joblib
 import requests 
 import json
+from fpl_auto import store
+from fpl_auto import cache
+from fpl_auto import gw_calendar
+from fpl_auto import rolling
+from fpl_auto import fixtures
+from fpl_auto import features
+from fpl_auto import elements
+from fpl_auto import history
+from fpl_auto import manifest
+from fpl_auto import model_cache
+from fpl_auto import budget
+
+# Share of xP added (or taken away) for each fixture difficulty rating
+DIFFICULTY_WEIGHTS = {1: 0.2, 2: 0.05, 3: 0.0, 4: -0.05, 5: -0.2}
+
+# Gameweeks whose per-position split get_all_pos_data keeps
+POS_DATA_WEEKS = 4
+
+# Columns read from each season-level CSV and their dtypes (None = as parsed), everything else is
+# skipped, e.g. the stringified per-fixture stats that make up most of fixtures.csv
+CSV_PROFILES = {
+    'fixtures.csv': {'event': None, 'finished': 'bool', 'id': 'int16', 'kickoff_time': None, 'team_a': 'int8', 'team_a_score': 'float32', 'team_h': 'int8', 'team_h_score': 'float32', 'team_h_difficulty': 'int8', 'team_a_difficulty': 'int8'},
+    'players_raw.csv': {'id': 'int16', 'element_type': 'int8', 'first_name': None, 'second_name': None},
+    'cleaned_players.csv': {'first_name': None, 'second_name': None, 'element_type': 'category'},
+    'player_idlist.csv': {'first_name': None, 'second_name': None, 'id': 'int16'},
+    'teams.csv': {'name': None, 'id': None, 'strength_attack_home': None, 'strength_attack_away': None, 'strength_defence_home': None, 'strength_defence_away': None},
+}
+
+def read_profiled_csv(path, profile=None):
+    """
+    Read a CSV with only the columns and dtypes in its loading profile.
+
+    Args:
+        path (str): The path of the CSV.
+        profile (dict): Column --> dtype (None to let pandas infer it), or None to read every column.
+
+    Returns:
+        pandas.DataFrame: The CSV contents, columns missing from the file are left out.
+    """
+    if profile is None:
+        return pd.read_csv(path)
+    dtypes = {column: dtype for column, dtype in profile.items() if dtype is not None}
+    return pd.read_csv(path, usecols=lambda column: column in profile, dtype=dtypes)
+
+def fit_model(model, features, labels):
+    """
+    Fit a model and time it.
+
+    Args:
+        model: The scikit-learn estimator.
+        features (pandas.DataFrame): The training features.
+        labels (pandas.Series): The training labels.
+
+    Returns:
+        float: The time the fit took in seconds.
+    """
+    start = time.perf_counter()
+    model.fit(features, labels)
+    return time.perf_counter() - start
+
+def fit_model_copy(model, features, labels):
+    """
+    Fit a model in a worker process and time it.
+
+    Args:
+        model: The scikit-learn estimator.
+        features (pandas.DataFrame): The training features.
+        labels (pandas.Series): The training labels.
+
+    Returns:
+        tuple: The fitted model, which is the worker's copy, and the time the fit took in seconds.
+    """
+    return model, fit_model(model, features, labels)
 
 class fpl_data:
     def __init__(self, data_location, season):
@@ -25,6 +104,18 @@ class fpl_data:
         self.team_list = self.get_team_list(season)
         self.team_to_id = self.team_list.reset_index().set_index('name').to_dict()['id']
         self.id_to_name = self.id_to_name_dict()
+        self.calendar = gw_calendar.open_calendar(self.data_location, season)
+        self.rolling_windows = {}
+        self.fixture_indexes = {}
+        self.feature_tensors = {}
+        self.element_tables = {}
+        self.element_names = None
+        self.player_histories = {}
+        self.pos_data = collections.OrderedDict()
+        self.fit_times = {}
+        self.fit_wall_time = None
+        self.fit_stages = {}
+        self.models_cached = False
 
     def get_player_list(self, season):
         """
@@ -36,9 +127,9 @@ class fpl_data:
         Returns:
             dict: The player list for the specified season.
         """
-        player_list = pd.read_csv(f'{self.data_location}/{season}/cleaned_players.csv')
+        player_list = self.get_csv(season, 'cleaned_players.csv')
         # Merge first_name and second_name columns into one column
-        player_list['name'] = player_list['first_name'] + ' ' + player_list['second_name']
+        player_list = player_list.assign(name=player_list['first_name'] + ' ' + player_list['second_name'])
         player_list = player_list[['name', 'element_type']]
         player_list = player_list.set_index('name')
         player_list = player_list.rename(columns={'element_type': 'position'})
@@ -46,6 +137,20 @@ class fpl_data:
         player_dict = player_list.to_dict(orient='dict')['position']
 
         return player_dict
+
+    def get_element_list(self, season):
+        """
+        Retrieve the player list for a given season, keyed by element ID.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            dict: Element ID --> position for the specified season.
+        """
+        players = self.get_csv(season, 'players_raw.csv')
+        positions = players['element_type'].map(dict(enumerate(elements.POSITIONS, start=1)))
+        return dict(zip(players['id'][positions.notna()].tolist(), positions[positions.notna()]))
     
     def get_team_list(self, season):
         """
@@ -57,10 +162,104 @@ class fpl_data:
         Returns:
             pandas.DataFrame: The team list for the specified season.
         """
-        team_list = pd.read_csv(f'{self.data_location}/{season}/teams.csv')
+        team_list = self.get_csv(season, 'teams.csv')
         team_list = team_list[['name', 'id', 'strength_attack_home', 'strength_attack_away', 'strength_defence_home', 'strength_defence_away']]
         return team_list.set_index('name')
     
+    def get_csv(self, season, file_name):
+        """
+        Read a season-level CSV through the frame cache shared by every fpl_data instance.
+
+        Args:
+            season (str): The season of the data.
+            file_name (str): The CSV file name, e.g. 'teams.csv'.
+
+        Returns:
+            pandas.DataFrame: The CSV contents, shared with other callers so it must not be modified in place.
+                              Only the columns in the file's CSV_PROFILES entry are read, if it has one.
+        """
+        path = f'{self.data_location}/{season}/{file_name}'
+        return cache.frames.get((self.data_location, season, file_name), lambda: read_profiled_csv(path, CSV_PROFILES.get(file_name)))
+
+    def bulk_load(self, seasons=None, directories=('gws', 'players', 'understat'), workers=4, force=False):
+        """
+        Load whole seasons of per-gameweek and per-player CSVs into their columnar stores, parsing the files of
+        each store in parallel.
+
+        Args:
+            seasons (list): The seasons to load (default: every season in the data location).
+            directories (tuple): The directories of each season to load, any of 'gws', 'players' and 'understat'.
+            workers (int): The number of threads parsing CSVs at once (default: 4).
+            force (bool): Whether to rebuild stores that are already up to date.
+
+        Returns:
+            dict: (season, directory) --> store, for every directory the seasons have.
+        """
+        if seasons is None:
+            seasons = sorted(name for name in os.listdir(self.data_location) if re.fullmatch(r'\d{4}-\d{2}', name))
+
+        stores = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for season in seasons:
+                for directory in directories:
+                    if not os.path.isdir(f'{self.data_location}/{season}/{directory}'):
+                        continue
+                    season_store = store.open_store(self.data_location, season, directory, pool=pool, force=force)
+                    stores[(season, directory)] = season_store
+
+                    stats = season_store.build_stats
+                    if stats is None:
+                        print(f'{season} {directory}: {len(season_store.parts)} files, up to date')
+                    else:
+                        seconds = max(stats['seconds'], 1e-9)
+                        megabytes = stats['bytes'] / 2**20
+                        print(f'{season} {directory}: {stats["files"]} files, {megabytes:.1f} MB in {seconds:.2f} s '
+                              f'({stats["files"] / seconds:.0f} files/s, {megabytes / seconds:.1f} MB/s), {stats["reused"]} unchanged files reused')
+        return stores
+
+    def ingest(self, season):
+        """
+        Bring a season's stores up to date after new files are scraped, parsing only the new or changed CSVs.
+
+        Only the columnar stores are updated incrementally. Frames, fixture tables and the calendar shared by
+        every fpl_data instance in the process are dropped when their files changed, while features, rolling
+        windows and player histories are built from the updated stores by the fpl_data instances that use them
+        next, e.g. the next model.py run.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            dict: Lists of 'added', 'changed' and 'removed' input files (relative to the season directory),
+                  and 'weeks', the gameweeks whose gw{N}.csv was added or changed.
+        """
+        season_manifest = manifest.open_manifest(self.data_location, season)
+        changes = season_manifest.refresh()
+        season_manifest.save()
+        changed_files = changes['added'] + changes['changed'] + changes['removed']
+        gw_files = {file_name: int(file_name[len('gws/gw'):-len('.csv')]) for file_name in changed_files if re.fullmatch(r'gws/gw\d+\.csv', file_name)}
+        changes['weeks'] = sorted(week_num for file_name, week_num in gw_files.items() if file_name not in changes['removed'])
+
+        for directory in store.STORE_TYPES:
+            if any(file_name.startswith(f'{directory}/') for file_name in changed_files):
+                store.close_store(self.data_location, season, directory)
+                # Only stores that have been built before are kept up to date, the rest are built when first used
+                if os.path.isdir(f'{self.data_location}/{season}/.store/{directory}') and os.path.isdir(f'{self.data_location}/{season}/{directory}'):
+                    store.open_store(self.data_location, season, directory)
+
+        for file_name in changed_files:
+            if '/' not in file_name:
+                cache.frames.discard((self.data_location, season, file_name))
+        for week_num in gw_files.values():
+            cache.frames.discard((self.data_location, season, week_num))
+        if 'fixtures.csv' in changed_files:
+            fixtures.close_table(self.data_location, season)
+        if season == self.season and ('fixtures.csv' in changed_files or gw_calendar.SNAPSHOT_FILE in changed_files or len(gw_files) > 0):
+            gw_calendar.close_calendar(self.data_location, season)
+            self.calendar = gw_calendar.open_calendar(self.data_location, season)
+
+        return changes
+
     def get_gw_data(self, season, week_num):
         """
         Retrieve the game week data for a given season and week.
@@ -73,16 +272,70 @@ class fpl_data:
             pandas.DataFrame: The game week data for the specified season and week.
         """
         try:
+            # Slice the week out of the season's columnar store rather than parsing gw{N}.csv
             if week_num < 1:
-                gw_data = pd.read_csv(f'{self.data_location}/{self.prev_season}/gws/gw{38 + week_num}.csv')
-            else:
-                gw_data = pd.read_csv(f'{self.data_location}/{season}/gws/gw{week_num}.csv')
+                season, week_num = self.prev_season, 38 + week_num
+            gw_store = store.open_store(self.data_location, season)
+            gw_data = cache.frames.get((self.data_location, season, week_num), lambda: gw_store.get_week(week_num))
         except FileNotFoundError:
             #print(f'File not found: {self.data_location}/{season}/gws/gw{week_num}.csv, Either the gameweek has not happened yet, or the data is not available.')
             pass
-        gw_data = gw_data[['name', 'position', 'team', 'assists', 'bps', 'clean_sheets', 'creativity', 'goals_conceded', 'goals_scored', 'ict_index', 'influence', 'minutes', 'own_goals', 'penalties_missed', 'penalties_saved', 'red_cards', 'saves', 'threat', 'total_points', 'yellow_cards', 'selected', 'was_home', 'value']]
+        gw_data = gw_data[store.GW_COLUMNS]
         return gw_data.set_index('name')
 
+    def get_element_table(self, season, week_num):
+        """
+        Retrieve the game week data for a given season and week as dense arrays indexed by element ID.
+
+        Args:
+            season (str): The season of the data.
+            week_num (int): The week number of the data, 0 or below for the end of the previous season.
+
+        Returns:
+            elements.element_table: The game week data for the specified season and week.
+        """
+        if (season, week_num) not in self.element_tables:
+            team_to_id = self.get_team_list(season)['id'].to_dict()
+            if week_num < 1:
+                # Element IDs are only stable within a season, so weeks from the previous season
+                # are carried over by name onto this season's IDs and clubs
+                gw_store = store.open_store(self.data_location, self.prev_season)
+                gw_data = cache.frames.get((self.data_location, self.prev_season, 38 + week_num), lambda: gw_store.get_week(38 + week_num))
+                _, name_to_ids = self.get_element_names()
+                ids = gw_data['name'].map(name_to_ids)
+                gw_data = gw_data.assign(element=ids)[ids.notna()].explode('element')
+            else:
+                gw_store = store.open_store(self.data_location, season)
+                gw_data = cache.frames.get((self.data_location, season, week_num), lambda: gw_store.get_week(week_num))
+            self.element_tables[(season, week_num)] = elements.element_table(gw_data, team_to_id)
+        return self.element_tables[(season, week_num)]
+
+    def get_element_names(self):
+        """
+        Get the names of every element in the season, for resolving IDs at the edges.
+
+        player_idlist.csv only lists the players at the club when it was saved, so the
+        names seen in the season's gameweeks fill in everyone who has since left.
+
+        Returns:
+            tuple: Element ID --> name (dict) and name --> list of element IDs (dict).
+        """
+        if self.element_names is None:
+            id_to_name = {}
+            try:
+                gw_store = store.open_store(self.data_location, self.season)
+                seen = pd.DataFrame({'element': gw_store.get_column('element'), 'name': gw_store.get_column('name')}).drop_duplicates()
+                id_to_name = dict(zip(seen['element'].tolist(), seen['name'].tolist()))
+            except FileNotFoundError:
+                pass
+            id_to_name.update(self.id_to_name)
+
+            name_to_ids = {}
+            for element, name in sorted(id_to_name.items()):
+                name_to_ids.setdefault(name, []).append(element)
+            self.element_names = (id_to_name, name_to_ids)
+        return self.element_names
+
     def get_pos_data(self, season, week_num, position):
         """
         Retrieve player data for a specific position in a given season and week.
@@ -109,6 +362,10 @@ class fpl_data:
         """
         Retrieve player data for all positions in a given season and week.
 
+        The gameweek is read, joined to the team list and cleaned once, then sorted by position so
+        that each position is a slice of the same frame. Frames are shared with other callers, so
+        they must not be modified in place.
+
         Args:
             season (str): The season of the data.
             week_num (int): The week number of the data.
@@ -116,11 +373,38 @@ class fpl_data:
         Returns:
             tuple: Player data for all positions in the given season and week.
         """
-        gk_data = self.get_pos_data(season, week_num, 'GK')
-        def_data = self.get_pos_data(season, week_num, 'DEF')
-        mid_data = self.get_pos_data(season, week_num, 'MID')
-        fwd_data = self.get_pos_data(season, week_num, 'FWD')
-        return gk_data, def_data, mid_data, fwd_data
+        key = (season, week_num)
+        if key in self.pos_data:
+            self.pos_data.move_to_end(key)
+            return self.pos_data[key]
+
+        gw_data = self.get_gw_data(season, week_num)
+        # Append team data to player data
+        gw_data = gw_data.join(self.team_list, on='team')
+        unmatched = gw_data['position'][~gw_data['team'].isin(self.team_list.index)].unique()
+
+        # Drop rows with NaN values
+        gw_data = gw_data.dropna()
+        # A stable sort keeps each position's players in gameweek order
+        position_codes = gw_data['position'].map({position: code for code, position in enumerate(elements.POSITIONS)}).fillna(len(elements.POSITIONS)).to_numpy()
+        order = np.argsort(position_codes, kind='stable')
+        bounds = np.searchsorted(position_codes[order], np.arange(len(elements.POSITIONS) + 1))
+        gw_data = gw_data.iloc[order].drop(['position', 'team', 'ict_index'], axis=1)
+
+        all_pos_data = []
+        for i, position in enumerate(elements.POSITIONS):
+            pos_data = gw_data.iloc[bounds[i]:bounds[i + 1]]
+            if len(unmatched) > 0 and position not in unmatched:
+                # Teams missing from the team list (e.g. a relegated club in last season's weeks) make the
+                # joined columns float, keep them as they are for positions without any of those players
+                pos_data = pos_data.astype(self.team_list.dtypes.to_dict())
+            all_pos_data.append(pos_data)
+        all_pos_data = tuple(all_pos_data)
+        self.pos_data[key] = all_pos_data
+        # The four positions of a week are usually asked for together, so only the latest few weeks are kept
+        while len(self.pos_data) > POS_DATA_WEEKS:
+            self.pos_data.popitem(last=False)
+        return all_pos_data
     
     def sum_player_data(self, season, from_gw, to_gw):
         """
@@ -137,24 +421,17 @@ class fpl_data:
         if self.season == '2022-23' and from_gw == 7:
             from_gw = 8
 
-        gk_data = self.get_pos_data(season, from_gw, 'GK')
-        def_data = self.get_pos_data(season, from_gw, 'DEF')
-        mid_data = self.get_pos_data(season, from_gw, 'MID')
-        fwd_data = self.get_pos_data(season, from_gw, 'FWD')
-
+        weeks = [from_gw]
         for i in range(from_gw + 1, to_gw + 1):
             if self.season == '2022-23' and i == 7:
                 continue
-            gk_data = pd.concat((gk_data, self.get_pos_data(season, i, 'GK')))
-            def_data = pd.concat((def_data, self.get_pos_data(season, i, 'DEF')))
-            mid_data = pd.concat((mid_data, self.get_pos_data(season, i, 'MID')))
-            fwd_data = pd.concat((fwd_data, self.get_pos_data(season, i, 'FWD')))
+            weeks.append(i)
 
-        # Group by player name and calculate the average
-        gk_data = gk_data.groupby('name').mean().reset_index().set_index('name')
-        def_data = def_data.groupby('name').mean().reset_index().set_index('name')
-        mid_data = mid_data.groupby('name').mean().reset_index().set_index('name')
-        fwd_data = fwd_data.groupby('name').mean().reset_index().set_index('name')
+        # Average each player over the window, only the weeks that entered or left it since the last call are read
+        gk_data = self.rolling_window(season, 'GK', weeks)
+        def_data = self.rolling_window(season, 'DEF', weeks)
+        mid_data = self.rolling_window(season, 'MID', weeks)
+        fwd_data = self.rolling_window(season, 'FWD', weeks)
 
         #print(f'Before: {len(gk_data)}')
         
@@ -179,6 +456,26 @@ class fpl_data:
 
         return gk_data, def_data, mid_data, fwd_data
     
+    def rolling_window(self, season, position, weeks):
+        """
+        Get the per-player means for a position over a window of game weeks.
+
+        Args:
+            season (str): The season of the data.
+            position (str): The position of the players.
+            weeks (list): The game weeks in the window.
+
+        Returns:
+            pandas.DataFrame: The mean of each feature per player, indexed by name.
+        """
+        key = (season, position)
+        if key not in self.rolling_windows:
+            index = elements.POSITIONS.index(position)
+            self.rolling_windows[key] = rolling.rolling_means(lambda week_num: self.get_all_pos_data(season, week_num)[index])
+        window = self.rolling_windows[key]
+        window.move_to(weeks)
+        return window.means()
+
     def prune_features(self, features):
         """
         Remove unnecessary columns from the features.
@@ -282,21 +579,32 @@ class fpl_data:
         Returns:
             tuple: The training data and test data for each position.
         """
+        # The (season, week) pairs in the window, the first week reaching into the previous season is 37 + i rather than 38 + i
+        season_weeks = []
         for i in range(from_gw, to_gw):
-            if i == from_gw:
-                if i < 1:
-                    training_gk, training_def, training_mid, training_fwd = self.get_training_data(self.prev_season, 37 + i)
-                else:
-                    training_gk, training_def, training_mid, training_fwd = self.get_training_data(season, i)
+            if i < 1:
+                season_weeks.append((self.prev_season, 37 + i if i == from_gw else 38 + i))
+            else:
+                season_weeks.append((season, i))
+
+        # Each run of consecutive weeks is one slice of that season's feature tensor
+        runs = []
+        for week_season, week_num in season_weeks:
+            if len(runs) > 0 and runs[-1][0] == week_season and runs[-1][2] == week_num - 1:
+                runs[-1][2] = week_num
             else:
-                if i < 1:
-                    training_gk_new, training_def_new, training_mid_new, training_fwd_new = self.get_training_data(self.prev_season, 38 + i)
-                else:
-                    training_gk_new, training_def_new, training_mid_new, training_fwd_new = self.get_training_data(season, i)
-                training_gk = (pd.concat((training_gk[0], training_gk_new[0])), pd.concat((training_gk[1], training_gk_new[1])))
-                training_def = (pd.concat((training_def[0], training_def_new[0])), pd.concat((training_def[1], training_def_new[1])))
-                training_mid = (pd.concat((training_mid[0], training_mid_new[0])), pd.concat((training_mid[1], training_mid_new[1])))
-                training_fwd = (pd.concat((training_fwd[0], training_fwd_new[0])), pd.concat((training_fwd[1], training_fwd_new[1])))
+                runs.append([week_season, week_num, week_num])
+
+        pieces = []
+        for week_season, first_week, last_week in runs:
+            tensor = self.get_feature_tensor(week_season)
+            for week_num in range(first_week, last_week + 1):
+                if not tensor.has_week(week_num):
+                    # Raises just as loading the missing week on its own does
+                    self.get_gw_data(week_season, week_num)
+            pieces.append(tensor.get_weeks(first_week, last_week))
+
+        training_gk, training_def, training_mid, training_fwd = [self.concat_training_data([piece for run in pieces for piece in run[position]]) for position in range(4)]
             
         gk_features_train, gk_features_test, gk_labels_train, gk_labels_test = train_test_split(training_gk[0], training_gk[1], test_size=0.2, random_state=42)
         def_features_train, def_features_test, def_labels_train, def_labels_test = train_test_split(training_def[0], training_def[1], test_size=0.2, random_state=42)
@@ -318,13 +626,59 @@ class fpl_data:
 
         return training_data, test_data
 
-    def get_model(self, model_type, training_data):
+    def get_feature_tensor(self, season):
         """
-        Get the model for a given model type and training data.
+        Get the training features and labels for every gameweek of a season, built once per season.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            features.feature_tensor: The season's feature tensor.
+        """
+        if season not in self.feature_tensors:
+            try:
+                weeks = list(store.open_store(self.data_location, season).weeks)
+            except FileNotFoundError:
+                weeks = []
+            self.feature_tensors[season] = features.feature_tensor(lambda week_num: self.get_training_data(season, week_num), weeks)
+        return self.feature_tensors[season]
+
+    def get_player_history(self, season):
+        """
+        Get the per-player history index for a season, built once per season.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            history.player_history: The season's player histories, keyed by element ID.
+        """
+        if season not in self.player_histories:
+            self.player_histories[season] = history.player_history(self.data_location, season)
+        return self.player_histories[season]
+
+    def concat_training_data(self, pieces):
+        """
+        Join (features, labels) pieces of training data, without copying if there is only one.
+
+        Args:
+            pieces (list): The (features, labels) pieces, in order.
+
+        Returns:
+            tuple: The joined features and labels.
+        """
+        if len(pieces) == 1:
+            return pieces[0]
+        return (pd.concat([piece[0] for piece in pieces]), pd.concat([piece[1] for piece in pieces]))
+
+    def make_models(self, model_type, random_state=None):
+        """
+        Get the unfitted model of each position for a given model type.
 
         Args:
             model_type (str): The type of model to use.
-            training_data (tuple): The training data for each position.
+            random_state (int): Seed for the models, each position gets its own seed derived from it (default: None, unseeded).
 
         Returns:
             tuple: The models for each position.
@@ -356,13 +710,155 @@ class fpl_data:
             mid_model = GradientBoostingRegressor(criterion='squared_error', n_estimators=n_est, learning_rate=0.1, max_depth=3, max_features=20) # Midfielder
             fwd_model = GradientBoostingRegressor(criterion='squared_error', n_estimators=n_est, learning_rate=0.1, max_depth=3, max_features=10) # Forward
 
+        elif model_type == 'histgradientboost':
+            # Binned boosting on all cores, stopping once 10 rounds in a row fail to improve on a held out 10% of the window
+            gk_model = HistGradientBoostingRegressor(max_iter=500, learning_rate=0.1, max_depth=3, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10) # Goalkeeper
+            def_model = HistGradientBoostingRegressor(max_iter=500, learning_rate=0.1, max_depth=3, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10) # Defender
+            mid_model = HistGradientBoostingRegressor(max_iter=500, learning_rate=0.1, max_depth=3, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10) # Midfielder
+            fwd_model = HistGradientBoostingRegressor(max_iter=500, learning_rate=0.1, max_depth=3, early_stopping=True, validation_fraction=0.1, n_iter_no_change=10) # Forward
+
+        models = (gk_model, def_model, mid_model, fwd_model)
+        if random_state is not None:
+            for position, model in enumerate(models):
+                if 'random_state' in model.get_params():
+                    model.set_params(random_state=random_state + position)
+
+        return models
+
+    def get_model(self, model_type, training_data, n_jobs=1, random_state=None, cache_key=None):
+        """
+        Get the model for a given model type and training data.
+
+        The time each position's model took to fit is kept in self.fit_times, and the wall-clock time
+        of fitting all four in self.fit_wall_time. self.models_cached is True if they were loaded from
+        the model cache instead.
+
+        Args:
+            model_type (str): The type of model to use.
+            training_data (tuple): The training data for each position.
+            n_jobs (int): How many of the four position models to fit at once in worker processes, -1 for all four (default: 1).
+            random_state (int): Seed for the models, each position gets its own seed derived from it (default: None,
+                                unseeded when fitting one at a time, seeds drawn from numpy's global RNG otherwise).
+            cache_key (tuple): (season, target_gw, training_prev_weeks) the models are for, to load them from the on-disk
+                               model cache when the hyperparameters and training data match, and save them there
+                               after fitting otherwise (default: None, always fit and never save).
+
+        Returns:
+            tuple: The models for each position.
+        """
+        models = self.make_models(model_type, random_state)
+
+        self.models_cached = False
+        if cache_key is not None:
+            fitted = model_cache.open_model_cache(self.data_location)
+            key = model_cache.model_key(*cache_key, model_type, models, model_cache.data_hash(training_data))
+            cached = fitted.get(key)
+            if cached is not None:
+                self.models_cached = True
+                self.fit_times = dict.fromkeys(elements.POSITIONS, 0.0)
+                self.fit_wall_time = 0.0
+                return cached
+
+        if random_state is None and n_jobs != 1:
+            # Draw the seeds in position order up front, so the models do not depend on which fit runs first
+            random_state = int(np.random.randint(2**31 - 4))
+            for position, model in enumerate(models):
+                if 'random_state' in model.get_params():
+                    model.set_params(random_state=random_state + position)
+
         # Fit training data to model
-        gk_model.fit(training_data[0][0], training_data[0][1])
-        def_model.fit(training_data[1][0], training_data[1][1])
-        mid_model.fit(training_data[2][0], training_data[2][1])
-        fwd_model.fit(training_data[3][0], training_data[3][1])
+        start = time.perf_counter()
+        if n_jobs == 1:
+            fit_times = [fit_model(model, features, labels) for model, (features, labels) in zip(models, training_data)]
+        else:
+            # Gradient boosting holds the GIL between stages, so the positions are fitted in worker processes
+            # and the fitted models sent back
+            workers = len(models) if n_jobs == -1 else min(n_jobs, len(models))
+            fitted_models = joblib.Parallel(n_jobs=workers, backend='loky')(
+                joblib.delayed(fit_model_copy)(model, features, labels) for model, (features, labels) in zip(models, training_data))
+            models = tuple(model for model, _ in fitted_models)
+            fit_times = [seconds for _, seconds in fitted_models]
+        self.fit_wall_time = time.perf_counter() - start
+        self.fit_times = dict(zip(elements.POSITIONS, fit_times))
+
+        if cache_key is not None:
+            fitted.put(key, models)
+
+        return models
+
+    def get_budgeted_model(self, model_type, training_data, time_budget=None, max_stages=None, random_state=None):
+        """
+        Get the model for a given model type and training data, each position fitted within a budget and stopped
+        early once it stops improving on a validation fold of its training data (see budget.fit_budgeted).
 
-        return gk_model, def_model, mid_model, fwd_model
+        The fold is split off the training data the way get_training_data_all splits off its test data, so the
+        test data stays unseen and scores the same way as for get_model. The models are fitted on the rest.
+
+        The stages each position's model kept are recorded in self.fit_stages, and the fit times in self.fit_times
+        and self.fit_wall_time as with get_model. Budgeted models are never cached, the stages kept can depend on
+        how fast the fit ran.
+
+        Args:
+            model_type (str): The type of model to use.
+            training_data (tuple): The training data for each position.
+            time_budget (float or dict): Seconds each position's fit may take, or position --> seconds (default: None, no time limit).
+            max_stages (int or dict): The most boosting stages, trees or epochs per position, or position --> stages
+                                      (default: None, as many as get_model fits).
+            random_state (int): Seed for the models, each position gets its own seed derived from it (default: None, unseeded).
+
+        Returns:
+            tuple: The models for each position.
+        """
+        models = []
+        self.fit_times = {}
+        self.fit_stages = {}
+        start = time.perf_counter()
+        for position, model, (features, labels) in zip(elements.POSITIONS, self.make_models(model_type, random_state), training_data):
+            position_time = time_budget.get(position) if isinstance(time_budget, dict) else time_budget
+            position_stages = max_stages.get(position) if isinstance(max_stages, dict) else max_stages
+            features_fit, features_validation, labels_fit, labels_validation = train_test_split(features, labels, test_size=0.2, random_state=42)
+            model, report = budget.fit_budgeted(model, features_fit, labels_fit, (features_validation, labels_validation), position_time, position_stages)
+            models.append(model)
+            self.fit_times[position] = report['fit_time']
+            self.fit_stages[position] = report['stages']
+        self.fit_wall_time = time.perf_counter() - start
+        self.models_cached = False
+
+        return tuple(models)
+
+    def update_models(self, models, training_data, n_new=10):
+        """
+        Continue fitting the previous gameweek's models on the next training window instead of starting again.
+
+        Boosted models are warm started, keeping their fitted stages and adding n_new more fitted to the
+        residuals on the new window, so an update costs about n_new / n_estimators of a full fit. Other
+        models are refitted from scratch: linear regression cannot be warm started, the network's extra
+        epochs cost as much as a fit, and n_new more trees barely move a forest of 1000 fitted to the old
+        windows (while recomputing its out-of-bag score over every tree). The fit times are kept in
+        self.fit_times as with get_model.
+
+        Args:
+            models (tuple): The models for each position, updated in place.
+            training_data (tuple): The training data for each position.
+            n_new (int): How many stages to add to each boosted model (default: 10).
+
+        Returns:
+            tuple: The models for each position.
+        """
+        start = time.perf_counter()
+        fit_times = []
+        for model, (features, labels) in zip(models, training_data):
+            if isinstance(model, GradientBoostingRegressor):
+                model.set_params(warm_start=True, n_estimators=model.n_estimators + n_new)
+            elif isinstance(model, HistGradientBoostingRegressor):
+                # Early stopping would compare the new window against a validation split of the old one
+                model.set_params(warm_start=True, early_stopping=False, max_iter=model.n_iter_ + n_new)
+            fit_times.append(fit_model(model, features, labels))
+        self.fit_wall_time = time.perf_counter() - start
+        self.fit_times = dict(zip(elements.POSITIONS, fit_times))
+        self.models_cached = False
+
+        return models
     
     def get_player_predictions(self, season, from_gw, to_gw, models):
         """
@@ -409,12 +905,14 @@ class fpl_data:
         
         Args:
             week_num (int): The week number.
-            player (str): The player name.
-            gw_data (pandas.DataFrame): The game week data.
+            player (str or int): The player name, or element ID when gw_data is an element table.
+            gw_data (pandas.DataFrame or elements.element_table): The game week data.
             
         Returns:
             float: The price of the player.
         """
+        if isinstance(gw_data, elements.element_table):
+            return gw_data.price(player)
         gw_data = gw_data[['value']].to_dict()['value']
         if player in gw_data:
             return gw_data[player] / 10
@@ -478,9 +976,12 @@ class fpl_data:
         Returns:
             pandas.DataFrame: The players who didn't play.
         """
-        if gameweek < self.get_recent_gw():
+        if self.calendar.is_finished(gameweek):
             gw_data = self.get_gw_data(season, gameweek)
             gw_data = gw_data[gw_data['minutes'] == 0]
+        else:
+            # Nobody can have missed a gameweek that hasn't been played yet, and its gw{N}.csv may not exist
+            gw_data = pd.DataFrame(columns=store.GW_COLUMNS).set_index('name')
         return gw_data
 
     def post_model_weightings(self, clean_predictions, week_num, next_num_gws):
@@ -493,44 +994,56 @@ class fpl_data:
             next_num_gws (int): The number of future gameweeks to predict.
 
         Returns:
-            list: The post-model weightings.
+            list: The post-model weightings, one DataFrame per position with an array of xP per player.
+        """
+        overall_predictions = []
+        for names, next_gws_p, no_team in self.post_model_weightings_matrix(clean_predictions, week_num, next_num_gws):
+            post_predictions = []
+            for name, player_no_team, player_p in zip(names, no_team, next_gws_p):
+                if player_no_team and next_num_gws == 1:
+                    player_p = [0]
+                post_predictions.append([name, player_p])
+
+            post_predictions = pd.DataFrame(post_predictions, columns=['Name', 'xP'])
+            overall_predictions.append(post_predictions)
+        return overall_predictions
+
+    def post_model_weightings_matrix(self, clean_predictions, week_num, next_num_gws):
+        """
+        Apply post-model weightings to the predictions, keeping each position's xP as one matrix.
+
+        Args:
+            clean_predictions (list): The clean predictions.
+            week_num (int): The week number.
+            next_num_gws (int): The number of future gameweeks to predict.
+
+        Returns:
+            list: (names (pandas.Series), xP (numpy.ndarray) shaped [players, next_num_gws], no team (numpy.ndarray)) for each position.
         """
         overall_predictions = []
         gw_data = self.get_gw_data(self.season, week_num)
+
+        # Each player's club, players listed twice (double gameweeks) or not at all get 0 xP
+        player_teams = gw_data['team'][~gw_data.index.duplicated(keep=False)]
+        fixture_index = self.get_fixture_index(self.season)
+
         # For each pos in predictions
         for pos in clean_predictions:
             # change pos into dataframe, skip first header
             pos = pos.reset_index()
-            # For each player in pos
-            post_predictions = []
-            for i in range(len(pos)):
-                name = pos.loc[i, 'Name']
-                xP = pos.loc[i, 'xP']
-                next_gws_p = np.ones(next_num_gws) * xP
-                try:
-                    team_name = self.get_player_team(name, week_num, gw_data)
-                    team_id = self.team_to_id[team_name]
-                    fixture_list = self.get_future_fixtures_for_player(name, week_num, gw_data)[0:next_num_gws]
-                except (KeyError, TypeError):
-                    if next_num_gws == 1:
-                        post_predictions.append([name, [0]])
-                    else:
-                        post_predictions.append([name, np.zeros(next_num_gws)])
-                    continue
-
-                for i, fixture in enumerate(fixture_list.itertuples()):
-                    home_fixture = fixture.team_h == team_id
-                    home_away_p = 0.1 if home_fixture else -0.1
-                    difficulty = fixture.team_h_difficulty if home_fixture else fixture.team_a_difficulty
-                    diff_p = 0.2 if difficulty == 1 else 0.05 if difficulty == 2 else 0.0 if difficulty == 3 else -0.05 if difficulty == 4 else -0.2
-                    p = xP + home_away_p + diff_p
-                    p = round(p, 3)
-                    next_gws_p[i] = p
-
-                post_predictions.append([name, next_gws_p])
-
-            post_predictions = pd.DataFrame(post_predictions, columns=['Name', 'xP'])
-            overall_predictions.append(post_predictions)
+            xP = pos['xP'].to_numpy()
+            team_ids = pos['Name'].map(player_teams).map(self.team_to_id)
+            no_team = team_ids.isna().to_numpy()
+
+            # Each player's next fixtures, players without enough fixtures left keep their xP for the rest
+            next_fixtures = fixture_index.next_fixtures(team_ids.fillna(0).to_numpy(dtype=np.int64), week_num, next_num_gws)
+            home_away_p = np.where(next_fixtures['is_home'], 0.1, -0.1)
+            diff_p = pd.Series(next_fixtures['difficulty'].ravel()).map(DIFFICULTY_WEIGHTS).fillna(0.0).to_numpy().reshape(home_away_p.shape)
+            p = np.round(xP[:, None] + home_away_p + diff_p, 3)
+            next_gws_p = np.where(next_fixtures['row'] >= 0, p, np.ones(next_num_gws) * xP[:, None])
+            next_gws_p[no_team] = 0
+
+            overall_predictions.append((pos['Name'], next_gws_p, no_team))
         return overall_predictions
     
     def post_model_weightings_for_next_gw(self, clean_predictions, week_num):
@@ -545,72 +1058,71 @@ class fpl_data:
             list: The post-model weightings for the next gameweek.
         """
         overall_predictions = []
-        next_num_gws = 1
         gw_data = self.get_gw_data(self.season, week_num)
+
+        # Each player's club, players listed twice (double gameweeks) or not at all get 0 xP
+        player_teams = gw_data['team'][~gw_data.index.duplicated(keep=False)]
+
+        fixture_index = self.get_fixture_index(self.season)
+
         # For each pos in predictions
         for pos in clean_predictions:
             # Change pos into dataframe, skip first header
             pos = pos.reset_index()
-            
-            # Create an empty list to store post predictions
-            post_predictions = []
-            
-            # For each player in pos
-            for i in range(len(pos)):
-                name = pos.loc[i, 'Name']
-                xP = pos.loc[i, 'xP']
-                p = xP
-                
-                try:
-                    team_name = self.get_player_team(name, week_num, gw_data)
-                    team_id = self.team_to_id[team_name]
-                    fixture_list = self.get_future_fixtures_for_player(name, week_num, gw_data)[0:next_num_gws]
-                except (KeyError, TypeError):
-                   post_predictions.append([name, 0])
-                   continue
-
-                fixture = fixture_list.iloc[0]
-
-                # Home Advantage
-                home_away_p = 0
-                home_fixture = False
-                if fixture['team_h'] == team_id:
-                    home_fixture = True
-                
-                if home_fixture:
-                    home_away_p = p * 0.1
-                else:
-                    home_away_p = p * -0.1
-                
-                # Difficulty of fixture (based on team)
-                diff_p = 0
-                if home_fixture:
-                    difficulty = fixture['team_h_difficulty']
-                else:
-                    difficulty = fixture['team_a_difficulty']
-
-                if difficulty == 1:
-                    diff_p = p * 0.2
-                elif difficulty == 2:
-                    diff_p = p * 0.05
-                elif difficulty == 3:
-                    diff_p = p * 0.0
-                elif difficulty == 4:
-                    diff_p = p * -0.05
-                elif difficulty == 5:
-                    diff_p = p * -0.2
-            
-                # Check for form?
-                p += home_away_p + diff_p
-                p = round(p, 3)
-                
-                post_predictions.append([name, p])
+            p = pos['xP'].to_numpy(dtype=np.float64)
+
+            # Each club's next fixture
+            team_ids = pos['Name'].map(player_teams).map(self.team_to_id)
+            fixture = fixture_index.next_fixtures(team_ids.fillna(0).to_numpy(dtype=np.int64), week_num, 1)
+            home_fixture = fixture['is_home'][:, 0]
+
+            # Home Advantage
+            home_away_p = np.where(home_fixture, p * 0.1, p * -0.1)
+
+            # Difficulty of fixture (based on team)
+            diff_p = p * pd.Series(fixture['difficulty'][:, 0]).map(DIFFICULTY_WEIGHTS).fillna(0.0).to_numpy()
+
+            # Check for form?
+            p = p + (home_away_p + diff_p)
+
+            # Players without a club get 0 xP, players whose club has no fixture left keep their xP
+            no_fixture = fixture['row'][:, 0] < 0
+            p = np.where(no_fixture, pos['xP'].to_numpy(dtype=np.float64), p)
+            # Rounded by numpy, as rounding each float64 xP was, which splits some values ending in 5 differently to Python's round
+            p = np.where(team_ids.isna(), 0.0, np.round(p, 3))
 
             # Convert to dataframe and set index to name
-            post_predictions = pd.DataFrame(post_predictions, columns=['Name', 'xP'])
+            post_predictions = pd.DataFrame({'Name': pos['Name'], 'xP': p})
             overall_predictions.append(post_predictions)
 
         return overall_predictions
+
+    def get_fixture_index(self, season):
+        """
+        Get the team x gameweek fixture index for a season.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            fixtures.fixture_index: The season's fixture index.
+        """
+        if season not in self.fixture_indexes:
+            self.fixture_indexes[season] = fixtures.fixture_index(self.get_fixture_table(season).fixtures)
+        return self.fixture_indexes[season]
+
+    def get_fixture_table(self, season):
+        """
+        Get a season's fixtures, read once per process without the per-player stats column.
+
+        Args:
+            season (str): The season of the data.
+
+        Returns:
+            fixtures.fixture_table: The season's fixtures, whose get_stats() parses the stats column on first use.
+        """
+        path = f'{self.data_location}/{season}/fixtures.csv'
+        return fixtures.open_table(self.data_location, season, lambda: read_profiled_csv(path, CSV_PROFILES['fixtures.csv']))
         
     def id_to_name_dict(self):
         """
@@ -619,9 +1131,9 @@ class fpl_data:
         Returns:
             dict: The id to name dictionary.
         """
-        players = pd.read_csv(f'{self.data_location}/{self.season}/player_idlist.csv')
+        players = self.get_csv(self.season, 'player_idlist.csv')
         # Combine name = first name + last_name
-        players['name'] = players['first_name'] + ' ' + players['second_name']
+        players = players.assign(name=players['first_name'] + ' ' + players['second_name'])
 
         # Create dict (id --> name)
         id_to_name = players.set_index('id')['name'].to_dict()
@@ -630,22 +1142,21 @@ class fpl_data:
     
     def get_recent_gw(self):
         """
-        Get's the most recent gameweek's ID.
+        Get's the most recent gameweek's ID, read from the local calendar rather than the FPL API.
 
         Returns:
             int: The most recent gameweek's ID.
         """
+        return self.calendar.current_gw()
 
-        data = requests.get('https://fantasy.premierleague.com/api/bootstrap-static/')
-        data = json.loads(data.content)
+    def get_finished_gw(self):
+        """
+        Get the most recent gameweek that has finished.
 
-        gameweeks = data['events']
-        
-        now = datetime.datetime.utcnow()
-        for gameweek in gameweeks:
-            next_deadline_date = datetime.datetime.strptime(gameweek['deadline_time'], '%Y-%m-%dT%H:%M:%SZ')
-            if next_deadline_date > now:
-                return gameweek['id'] - 1
+        Returns:
+            int: The most recent finished gameweek's ID.
+        """
+        return self.calendar.finished_gw
             
     def get_avg_score_list(self):
         """
@@ -675,7 +1186,7 @@ class fpl_data:
             pandas.DataFrame: The future fixtures for the specified season and week.
         """
         # load fixtures.csv
-        all_fixtures = pd.read_csv(f'{self.data_location}/{season}/fixtures.csv')
+        all_fixtures = self.get_fixture_table(season).fixtures
 
         # Get fixtures where event > current gw
         future_fixtures = all_fixtures[all_fixtures['event'] > week_num]
@@ -694,8 +1205,10 @@ class fpl_data:
         """
         # convert team_name to id
         team_id = self.team_to_id[team_name]
-        upcoming_fixtures = self.get_future_fixtures(self.season, week_num)
-        team_fixtures = upcoming_fixtures[(upcoming_fixtures['team_a'] == team_id) | (upcoming_fixtures['team_h'] == team_id)]
+        fixture_index = self.get_fixture_index(self.season)
+        rows = fixture_index.next_fixtures(team_id, week_num, fixture_index.seq_row.shape[1])['row']
+        all_fixtures = self.get_fixture_table(self.season).fixtures
+        team_fixtures = all_fixtures.iloc[rows[rows >= 0]]
         team_fixtures = team_fixtures[['event', 'team_h', 'team_a', 'team_h_difficulty', 'team_a_difficulty']]
         return team_fixtures
     
@@ -720,13 +1233,15 @@ class fpl_data:
         Get the team of a player for a given week.
 
         Args:
-            player_name (str): The player name.
+            player_name (str or int): The player name, or element ID when gw_data is an element table.
             week_num (int): The week number.
-            gw_data (pandas.DataFrame): The game week data.
+            gw_data (pandas.DataFrame or elements.element_table): The game week data.
 
         Returns:
-            str: The team of the player.
+            str: The team of the player, its team ID for an element table.
         """
+        if isinstance(gw_data, elements.element_table):
+            return gw_data.club_of(player_name)
         try:
             return gw_data.loc[player_name]['team']
         except KeyError:
@@ -772,22 +1287,20 @@ class fpl_data:
         """
         if gw + n > 38:
             n = 38 - gw
-        
-        # Get the next n gameweeks
-        n_next_weeks = self.post_model_weightings(predictions, gw, n)
-        
+
         if n == 0 or gw >= 36:
-            return n_next_weeks
-        
-        # For each player in each position
-        for pos in n_next_weeks:
-            for i, row in pos.iterrows():
-                xp_array = row['xP']
-                for i in range(len(xp_array)):
-                    xp_array[i] *= discount_factor ** i
-                if sum:
-                    row['xP'] = round(np.mean(xp_array), 2)
-                else:
-                    row['xP'] = xp_array
-        
-        return n_next_weeks
\ No newline at end of file
+            return self.post_model_weightings(predictions, gw, n)
+
+        # Discount every player's next n gameweeks at once, Python's ** matches the old per-element discounting exactly
+        discount = np.array([discount_factor ** i for i in range(n)])
+        n_next_weeks = []
+        for names, next_gws_p, _ in self.post_model_weightings_matrix(predictions, gw, n):
+            discounted = next_gws_p * discount
+            if sum:
+                # Kept as an object column of floats so that sorting (and ties) behave as before
+                xP = pd.Series(list(np.round(discounted.mean(axis=1), 2)), dtype=object)
+            else:
+                xP = list(discounted)
+            n_next_weeks.append(pd.DataFrame({'Name': names, 'xP': xP}))
+
+        return n_next_weeks
@@ -0,0 +1,166 @@
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+# Position codes used by the element arrays, -1 for anything else (e.g. managers)
+POSITIONS = ['GK', 'DEF', 'MID', 'FWD']
+
+class element_table:
+    def __init__(self, gw_data, team_to_id):
+        """
+        Initialize dense per-element arrays for a gameweek, indexed by FPL element ID.
+
+        A player with two fixtures in the gameweek keeps their last row, the same row the
+        name-keyed dictionaries end up with.
+
+        Args:
+            gw_data (pandas.DataFrame): The gameweek's rows, with an element column.
+            team_to_id (dict): Team name --> team ID for the gameweek's season.
+        """
+        gw_data = gw_data.drop_duplicates(subset='element', keep='last')
+        element = gw_data['element'].to_numpy(dtype=np.int64)
+        size = int(element.max(initial=0)) + 1
+
+        self.present = np.zeros(size, dtype=bool)
+        self.value = np.zeros(size, dtype=np.float64)
+        self.position = np.full(size, -1, dtype=np.int8)
+        self.club = np.zeros(size, dtype=np.int16)
+        self.points = np.zeros(size, dtype=np.int16)
+        self.minutes = np.zeros(size, dtype=np.int16)
+
+        self.present[element] = True
+        self.value[element] = gw_data['value'].to_numpy(dtype=np.float64) / 10
+        self.position[element] = gw_data['position'].map({position: code for code, position in enumerate(POSITIONS)}).fillna(-1).to_numpy(dtype=np.int8)
+        if 'team' in gw_data.columns:
+            self.club[element] = gw_data['team'].map(team_to_id).fillna(0).to_numpy(dtype=np.int16)
+        self.points[element] = gw_data['total_points'].to_numpy(dtype=np.int16)
+        self.minutes[element] = gw_data['minutes'].to_numpy(dtype=np.int16)
+
+    def has(self, element):
+        """
+        Check whether an element played a part in the gameweek's data.
+
+        Args:
+            element (int): The element ID.
+
+        Returns:
+            bool: True if the element has a row in the gameweek.
+        """
+        return isinstance(element, (int, np.integer)) and 0 <= element < len(self.present) and bool(self.present[element])
+
+    def price(self, element):
+        """
+        Get the price of an element.
+
+        Args:
+            element (int): The element ID.
+
+        Returns:
+            float: The price in millions, or None if the element is not in the gameweek.
+        """
+        if self.has(element):
+            return float(self.value[element])
+        return None
+
+    def club_of(self, element):
+        """
+        Get the club of an element.
+
+        Args:
+            element (int): The element ID.
+
+        Returns:
+            int: The team ID, or None if the element is not in the gameweek.
+        """
+        if self.has(element):
+            return int(self.club[element])
+        return None
+
+    def column(self, name):
+        """
+        Get a read-only mapping view of one of the arrays, for code written against name-keyed dictionaries.
+
+        Args:
+            name (str): 'position', 'points' or 'minutes'.
+
+        Returns:
+            element_column: Element ID --> value for every element in the gameweek.
+        """
+        if name == 'position':
+            return element_column(self, self.position, POSITIONS)
+        return element_column(self, getattr(self, name))
+
+    def didnt_play(self):
+        """
+        Get the elements that played no minutes in the gameweek.
+
+        Returns:
+            dict: Element ID --> minutes (always 0).
+        """
+        return dict.fromkeys(np.flatnonzero(self.present & (self.minutes == 0)).tolist(), 0)
+
+class element_column(Mapping):
+    def __init__(self, table, values, labels=None):
+        """
+        Initialize a mapping view of an element array.
+
+        Args:
+            table (element_table): The table the array belongs to.
+            values (numpy.ndarray): The array, indexed by element ID.
+            labels (list): Optional labels the array's codes are translated to.
+        """
+        self.table = table
+        self.values = values
+        self.labels = labels
+
+    def __getitem__(self, element):
+        if not self.table.has(element):
+            raise KeyError(element)
+        value = self.values[element].item()
+        if self.labels is not None:
+            return self.labels[value] if value >= 0 else None
+        return value
+
+    def __contains__(self, element):
+        return self.table.has(element)
+
+    def __iter__(self):
+        return iter(np.flatnonzero(self.table.present).tolist())
+
+    def __len__(self):
+        return int(self.table.present.sum())
+
+def predictions_to_elements(predictions, name_to_elements):
+    """
+    Re-key name-keyed prediction frames by element ID.
+
+    Predictions are made per name, so players who share a name all get that name's xP.
+
+    Args:
+        predictions (list): Name/xP DataFrames, one per position.
+        name_to_elements (dict): Name --> list of element IDs.
+
+    Returns:
+        list: The same frames with Name holding element IDs, names without an ID are dropped.
+    """
+    element_predictions = []
+    for pos in predictions:
+        ids = pos['Name'].map(name_to_elements)
+        pos = pos.assign(Name=ids)[ids.notna()].explode('Name')
+        element_predictions.append(pos.astype({'Name': np.int64}).reset_index(drop=True))
+    return element_predictions
+
+def xp_array(predictions):
+    """
+    Scatter a position's element-keyed predictions into a dense xP array.
+
+    Args:
+        predictions (pandas.DataFrame): Name (element ID) and xP columns.
+
+    Returns:
+        numpy.ndarray: xP indexed by element ID, NaN for elements without a prediction.
+    """
+    element = predictions['Name'].to_numpy(dtype=np.int64)
+    xp = np.full(int(element.max(initial=0)) + 1, np.nan)
+    xp[element] = pd.to_numeric(predictions['xP'], errors='coerce').to_numpy(dtype=np.float64)
+    return xp
@@ -1,10 +1,11 @@
 import matplotlib.pyplot as plt
 import numpy as np
 import os
-import math
 import numpy as np
 import json
 import os
+from sklearn.inspection import permutation_importance
+from fpl_auto import metrics
 
 def score_model(predictions, labels):
     """
@@ -12,25 +13,32 @@ def score_model(predictions, labels):
 
     Args:
         predictions (list): The predicted values.
-        labels (list): The actual values.
+        labels (list): The actual values, matched to the predictions by position.
 
     Returns:
         tuple: A tuple containing the error, RMSE, and accuracy.
     """
-    # Calculate error
-    error = 0
-    mse = 0
-    accuracy = 0
-    for i in range(len(predictions)):
-        error += abs(predictions[i] - labels[i])
-        mse += (predictions[i] - labels[i]) ** 2
-        if round(predictions[i]) == labels[i]:
-            accuracy += 1
-    error /= len(predictions)
-    mse /= len(predictions)
-    accuracy /= len(predictions)
-
-    return error, math.sqrt(mse), accuracy
+    scores = metrics.score(predictions, labels)
+    return float(scores['error']), float(scores['rmse']), float(scores['accuracy'])
+
+def feature_importances(model, features, labels):
+    """
+    Get how much a model relies on each feature.
+
+    Tree models report their own impurity-based importances. Others (linear regression, the network and
+    binned boosting) have none, so the mean drop in score when each feature is shuffled is used instead.
+
+    Args:
+        model: The fitted scikit-learn estimator.
+        features (pandas.DataFrame): Held out features to shuffle, for models without their own importances.
+        labels (pandas.Series): The labels of those features.
+
+    Returns:
+        numpy.ndarray: The importance of each feature, in column order.
+    """
+    if hasattr(model, 'feature_importances_'):
+        return model.feature_importances_
+    return permutation_importance(model, features, labels, n_repeats=5, random_state=0).importances_mean
 
 def display_weights(week_num, weights, feature_names, pos):
     """
@@ -107,6 +115,59 @@ def export_tsv(clean_predictions, season, week_num):
 
     print(f'- Saved predictions to {directory}[POS].tsv')
 
+    stale = stale_predictions(season)
+    if week_num in stale:
+        stale.remove(week_num)
+        save_stale_predictions(season, stale)
+
+def stale_predictions(season):
+    """
+    Get the gameweeks whose saved predictions were made before data they depend on changed.
+
+    Args:
+        season (str): The season of the predictions.
+
+    Returns:
+        list: The stale gameweek numbers, sorted.
+    """
+    try:
+        with open(f'predictions/{season}/stale.json') as f:
+            return sorted(json.load(f))
+    except FileNotFoundError:
+        return []
+
+def save_stale_predictions(season, weeks):
+    """
+    Save the gameweeks whose predictions are stale, cleared again as export_tsv rewrites each of them.
+
+    Args:
+        season (str): The season of the predictions.
+        weeks (list): The stale gameweek numbers.
+    """
+    os.makedirs(f'predictions/{season}', exist_ok=True)
+    with open(f'predictions/{season}/stale.json', 'w') as f:
+        json.dump(sorted(set(weeks)), f)
+
+def mark_predictions_stale(season, from_week):
+    """
+    Mark every saved prediction for a gameweek after a given one as stale, as they were made without its data.
+
+    Args:
+        season (str): The season of the predictions.
+        from_week (int): The gameweek whose data changed.
+
+    Returns:
+        list: The gameweeks newly marked as stale.
+    """
+    if not os.path.isdir(f'predictions/{season}'):
+        return []
+    saved = [int(name[2:]) for name in os.listdir(f'predictions/{season}') if name.startswith('GW') and name[2:].isdigit()]
+    stale = stale_predictions(season)
+    newly_stale = sorted(week_num for week_num in saved if week_num > from_week and week_num not in stale)
+    if len(newly_stale) > 0:
+        save_stale_predictions(season, stale + newly_stale)
+    return newly_stale
+
 def plot_p_minus_xp(p_list, xp_list, from_week, to_week):
     """
     Plots the difference between the actual points and expected points for each gameweek.
@@ -239,13 +300,9 @@ def score_model_against_list(p_list, avg_list):
     Returns:
         tuple: A tuple containing the number of weeks where the model performed better than the global average and the number of weeks where the model performed worse.
     """
-    bad = 0
-    good = 0
-    for i, p in enumerate(p_list):
-        if p < avg_list[i]:
-            bad += 1
-        else:
-            good += 1
+    p_list = np.asarray(p_list)
+    bad = int(np.count_nonzero(p_list < np.asarray(avg_list[:len(p_list)])))
+    good = len(p_list) - bad
     return good, bad
 
 def box_plot_by_season(points, seasons):
@@ -0,0 +1,84 @@
+import pandas as pd
+
+class feature_tensor:
+    def __init__(self, load_week, weeks):
+        """
+        Initialize a season's training features and labels, one frame per position with every gameweek stacked in order.
+
+        Each gameweek's rows are contiguous, so a run of consecutive gameweeks is a single slice of
+        the season's frames rather than a concatenation of per-week frames. Empty gameweeks are kept
+        aside as they were loaded, as their dtypes still matter when they are joined to other weeks.
+
+        Args:
+            load_week (function): Called with a week number, returns that week's (features, labels) for each position.
+            weeks (list): The week numbers available for the season.
+        """
+        self.weeks = sorted(weeks)
+        self.offsets = {}
+        features = [[], [], [], []]
+        labels = [[], [], [], []]
+        starts = [0, 0, 0, 0]
+        self.empty_weeks = [{}, {}, {}, {}]
+
+        for week_num in self.weeks:
+            week_offsets = []
+            for position, (week_features, week_labels) in enumerate(load_week(week_num)):
+                week_offsets.append((starts[position], starts[position] + len(week_features)))
+                starts[position] += len(week_features)
+                if len(week_features) > 0:
+                    features[position].append(week_features)
+                    labels[position].append(week_labels)
+                else:
+                    self.empty_weeks[position][week_num] = (week_features, week_labels)
+            self.offsets[week_num] = week_offsets
+
+        self.features = []
+        self.labels = []
+        for position in range(4):
+            if len(features[position]) > 0:
+                self.features.append(pd.concat(features[position]))
+                self.labels.append(pd.concat(labels[position]))
+            else:
+                self.features.append(None)
+                self.labels.append(None)
+
+    def has_week(self, week_num):
+        """
+        Check whether a gameweek is in the tensor.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek is in the tensor.
+        """
+        return week_num in self.offsets
+
+    def get_weeks(self, first_week, last_week):
+        """
+        Get the training data for a run of consecutive gameweeks, as slices of the season's frames.
+
+        Args:
+            first_week (int): The first week number.
+            last_week (int): The last week number (inclusive), every week in between must be in the tensor.
+
+        Returns:
+            tuple: A list of (features, labels) pieces for each position, in week order. This is a single
+                   slice unless the run includes an empty gameweek, which is returned as its own piece.
+        """
+        training_data = []
+        for position in range(4):
+            pieces = []
+            start = self.offsets[first_week][position][0]
+            for week_num in range(first_week, last_week + 1):
+                if week_num in self.empty_weeks[position]:
+                    stop = self.offsets[week_num][position][0]
+                    if stop > start:
+                        pieces.append((self.features[position].iloc[start:stop], self.labels[position].iloc[start:stop]))
+                    pieces.append(self.empty_weeks[position][week_num])
+                    start = stop
+            stop = self.offsets[last_week][position][1]
+            if stop > start or len(pieces) == 0:
+                pieces.append((self.features[position].iloc[start:stop], self.labels[position].iloc[start:stop]))
+            training_data.append(pieces)
+        return tuple(training_data)
@@ -0,0 +1,269 @@
+import ast
+import json
+import numpy as np
+import pandas as pd
+
+# Gameweeks in a Premier League season
+N_EVENTS = 38
+
+# Fixture tables opened so far, keyed by (data_location, season)
+_tables = {}
+
+class fixture_index:
+    def __init__(self, fixtures):
+        """
+        Initialize a dense team x gameweek index of a season's fixtures.
+
+        Every array is indexed by team ID directly, so row 0 is never filled and can be used for
+        players without a club. Two layouts are kept:
+            - By gameweek, shaped [team, gameweek, slot]. Slot 0 holds a team's first fixture of the
+              gameweek and slot 1 the second of a double gameweek, n_fixtures is 0 for a blank gameweek.
+            - By sequence, shaped [team, k], the team's k-th fixture of the season in fixtures.csv order.
+        Empty entries have event, opponent and difficulty 0 and row -1. Fixtures that have not been
+        given a gameweek yet are left out of both.
+
+        Args:
+            fixtures (pandas.DataFrame): The season's fixtures.csv.
+        """
+        fixtures = fixtures[fixtures['event'].notna()]
+        rows = fixtures.index.to_numpy()
+        events = fixtures['event'].to_numpy(dtype=np.int64)
+        team_h = fixtures['team_h'].to_numpy(dtype=np.int64)
+        team_a = fixtures['team_a'].to_numpy(dtype=np.int64)
+
+        # Each fixture from both teams' point of view, in fixtures.csv order
+        order = np.argsort(np.concatenate((np.arange(len(rows)), np.arange(len(rows)))), kind='stable')
+        team = np.concatenate((team_h, team_a))[order]
+        opponent = np.concatenate((team_a, team_h))[order]
+        is_home = np.concatenate((np.ones(len(rows), dtype=bool), np.zeros(len(rows), dtype=bool)))[order]
+        difficulty = np.concatenate((fixtures['team_h_difficulty'].to_numpy(dtype=np.int64), fixtures['team_a_difficulty'].to_numpy(dtype=np.int64)))[order]
+        event = np.concatenate((events, events))[order]
+        row = np.concatenate((rows, rows))[order]
+
+        self.n_teams = int(max(team.max(initial=0), 1))
+        self.n_events = int(max(event.max(initial=0), N_EVENTS))
+
+        # Position of each fixture in its team's season and in its team's gameweek
+        seq_pos = pd.Series(team).groupby(team).cumcount().to_numpy()
+        slot = pd.Series(team * (self.n_events + 1) + event).groupby(team * (self.n_events + 1) + event).cumcount().to_numpy()
+        self.n_slots = int(max(slot.max(initial=0) + 1, 1))
+        width = int(max(seq_pos.max(initial=0) + 1, 1))
+
+        shape = (self.n_teams + 1, self.n_events, self.n_slots)
+        self.opponent = np.zeros(shape, dtype=np.int16)
+        self.is_home = np.zeros(shape, dtype=bool)
+        self.difficulty = np.zeros(shape, dtype=np.int8)
+        self.row = np.full(shape, -1, dtype=np.int32)
+        self.n_fixtures = np.zeros(shape[:2], dtype=np.int8)
+
+        self.opponent[team, event - 1, slot] = opponent
+        self.is_home[team, event - 1, slot] = is_home
+        self.difficulty[team, event - 1, slot] = difficulty
+        self.row[team, event - 1, slot] = row
+        np.add.at(self.n_fixtures, (team, event - 1), 1)
+
+        shape = (self.n_teams + 1, width)
+        self.seq_event = np.zeros(shape, dtype=np.int16)
+        self.seq_opponent = np.zeros(shape, dtype=np.int16)
+        self.seq_is_home = np.zeros(shape, dtype=bool)
+        self.seq_difficulty = np.zeros(shape, dtype=np.int8)
+        self.seq_row = np.full(shape, -1, dtype=np.int32)
+
+        self.seq_event[team, seq_pos] = event
+        self.seq_opponent[team, seq_pos] = opponent
+        self.seq_is_home[team, seq_pos] = is_home
+        self.seq_difficulty[team, seq_pos] = difficulty
+        self.seq_row[team, seq_pos] = row
+
+    def next_fixtures(self, team_ids, week_num, n):
+        """
+        Get the next n fixtures after a gameweek for a team or a batch of teams.
+
+        Args:
+            team_ids (int or array-like): The team ID(s), 0 for no team.
+            week_num (int): The week number, only fixtures in later gameweeks are returned.
+            n (int): The number of fixtures to return per team.
+
+        Returns:
+            dict: event, opponent, is_home, difficulty and row (the fixture's position in fixtures.csv)
+                  arrays shaped [n] for one team or [teams, n] for a batch, padded with empty entries
+                  when a team has fewer than n fixtures left.
+        """
+        single = np.ndim(team_ids) == 0
+        team_ids = np.atleast_1d(np.asarray(team_ids, dtype=np.int64))
+
+        # Stable sort puts each team's remaining fixtures first, still in fixtures.csv order
+        future = (self.seq_event[team_ids] > week_num) & (self.seq_row[team_ids] >= 0)
+        take = min(n, future.shape[1])
+        order = np.argsort(~future, axis=1, kind='stable')[:, :take]
+        valid = np.take_along_axis(future, order, axis=1)
+
+        arrays = {
+            'event': self.seq_event,
+            'opponent': self.seq_opponent,
+            'is_home': self.seq_is_home,
+            'difficulty': self.seq_difficulty,
+            'row': self.seq_row,
+        }
+        next_fixtures = {}
+        for key, array in arrays.items():
+            empty = -1 if key == 'row' else 0
+            values = np.full((len(team_ids), n), empty, dtype=array.dtype)
+            values[:, :take] = np.where(valid, np.take_along_axis(array[team_ids], order, axis=1), empty)
+            next_fixtures[key] = values[0] if single else values
+        return next_fixtures
+
+    def gameweeks(self, team_ids, from_gw, to_gw):
+        """
+        Get every fixture in a range of gameweeks for a team or a batch of teams.
+
+        Args:
+            team_ids (int or array-like): The team ID(s), 0 for no team.
+            from_gw (int): The first gameweek.
+            to_gw (int): The last gameweek (inclusive).
+
+        Returns:
+            dict: n_fixtures shaped [gameweeks] and opponent, is_home, difficulty and row shaped
+                  [gameweeks, slot] for one team, with a leading [teams] axis for a batch.
+        """
+        weeks = slice(from_gw - 1, to_gw)
+        return {
+            'n_fixtures': self.n_fixtures[team_ids, weeks],
+            'opponent': self.opponent[team_ids, weeks],
+            'is_home': self.is_home[team_ids, weeks],
+            'difficulty': self.difficulty[team_ids, weeks],
+            'row': self.row[team_ids, weeks],
+        }
+
+class fixture_table:
+    def __init__(self, data_location, season, fixtures):
+        """
+        Initialize a season's fixtures, parsed once with the stats column left out.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season of the data.
+            fixtures (pandas.DataFrame): The season's fixtures.csv without its stats column.
+        """
+        self.path = f'{data_location}/{season}/fixtures.csv'
+        self.fixtures = fixtures
+        self.stats = None
+
+    def get_stats(self):
+        """
+        Get the per-player stats of every fixture, read from the stats column and parsed the first time they are asked for.
+
+        Returns:
+            fixture_stats: The season's fixture stats.
+        """
+        if self.stats is None:
+            self.stats = fixture_stats(pd.read_csv(self.path, usecols=['id', 'stats']))
+        return self.stats
+
+class fixture_stats:
+    def __init__(self, stats):
+        """
+        Initialize the per-player stats of a season's fixtures, keyed by FPL element ID.
+
+        Every (element, fixture) pair with at least one stat is a row of a dense [pair, stat] matrix,
+        each element's rows contiguous and in fixtures.csv order, so an element's fixtures are the
+        slice starts[element]:stops[element].
+
+        Args:
+            stats (pandas.DataFrame): The id and stats columns of fixtures.csv.
+        """
+        identifiers = {}
+        fixture_ids = []
+        elements = []
+        stat_codes = []
+        values = []
+        for fixture_id, fixture_stats_text in zip(stats['id'].to_numpy(), stats['stats'].to_numpy()):
+            if not isinstance(fixture_stats_text, str):
+                continue
+            for stat in parse_stats(fixture_stats_text):
+                code = identifiers.setdefault(stat['identifier'], len(identifiers))
+                for side in ('h', 'a'):
+                    for entry in stat[side]:
+                        fixture_ids.append(fixture_id)
+                        elements.append(entry['element'])
+                        stat_codes.append(code)
+                        values.append(entry['value'])
+
+        self.identifiers = list(identifiers)
+        fixture_ids = np.asarray(fixture_ids, dtype=np.int64)
+        elements = np.asarray(elements, dtype=np.int64)
+        fixture_rows = pd.Index(stats['id']).get_indexer(fixture_ids)
+
+        # One row per (element, fixture), ordered by element and then by the fixture's row in fixtures.csv
+        pair_keys = elements * (len(stats) + 1) + fixture_rows
+        pairs, pair_of_entry = np.unique(pair_keys, return_inverse=True)
+        self.values = np.zeros((len(pairs), len(self.identifiers)), dtype=np.int32)
+        np.add.at(self.values, (pair_of_entry, np.asarray(stat_codes, dtype=np.int64)), np.asarray(values, dtype=np.int32))
+        pair_elements = pairs // (len(stats) + 1)
+        self.fixture = stats['id'].to_numpy(dtype=np.int64)[pairs % (len(stats) + 1)]
+
+        size = int(pair_elements.max(initial=0)) + 1
+        self.starts = np.searchsorted(pair_elements, np.arange(size), side='left')
+        self.stops = np.searchsorted(pair_elements, np.arange(size), side='right')
+
+    def for_element(self, element):
+        """
+        Get an element's stats in every fixture they have a stat in.
+
+        Args:
+            element (int): The element ID.
+
+        Returns:
+            dict: 'fixture' (the fixture IDs) and one array per stat (e.g. 'bps'), 0 where the element has none.
+        """
+        if 0 <= element < len(self.starts):
+            rows = slice(self.starts[element], self.stops[element])
+        else:
+            rows = slice(0, 0)
+        element_stats = {'fixture': self.fixture[rows]}
+        for code, identifier in enumerate(self.identifiers):
+            element_stats[identifier] = self.values[rows, code]
+        return element_stats
+
+def parse_stats(stats_text):
+    """
+    Parse one fixture's stats, stored in fixtures.csv as the repr of a Python list.
+
+    Args:
+        stats_text (str): The fixture's stats column.
+
+    Returns:
+        list: One dict per stat, with the identifier and the home ('h') and away ('a') values per element.
+    """
+    try:
+        # The repr only holds ints and plain identifiers, so it is JSON once the quotes are swapped
+        return json.loads(stats_text.replace("'", '"'))
+    except json.JSONDecodeError:
+        return ast.literal_eval(stats_text)
+
+def open_table(data_location, season, load):
+    """
+    Get the fixture table for a season, reading fixtures.csv only once per process.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        load (function): Called with no arguments to read fixtures.csv without its stats column.
+
+    Returns:
+        fixture_table: The season's fixture table.
+    """
+    key = (data_location, season)
+    if key not in _tables:
+        _tables[key] = fixture_table(data_location, season, load())
+    return _tables[key]
+
+def close_table(data_location, season):
+    """
+    Forget a season's fixture table, so the next open_table reads fixtures.csv again.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+    """
+    _tables.pop((data_location, season), None)
@@ -0,0 +1,177 @@
+import bisect
+import datetime
+import json
+import os
+import pandas as pd
+import requests
+
+# Name of the saved bootstrap-static snapshot in each season's directory
+SNAPSHOT_FILE = 'bootstrap_static.json'
+
+# FPL deadlines fall 90 minutes before the first kickoff of the gameweek
+DEADLINE_OFFSET = datetime.timedelta(minutes=90)
+
+# Calendars already read from disk, one per season
+_calendars = {}
+
+class gw_calendar:
+    def __init__(self, data_location, season):
+        """
+        Initialize the gameweek calendar for a season from local data only.
+
+        Deadlines come from the saved bootstrap-static snapshot if there is one, otherwise from the
+        kickoff times in fixtures.csv, otherwise every gameweek with a gw{N}.csv counts as finished.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season of the data.
+        """
+        self.data_location = data_location
+        self.season = season
+        self.snapshot_path = f'{data_location}/{season}/{SNAPSHOT_FILE}'
+
+        if os.path.exists(self.snapshot_path):
+            events = self.events_from_snapshot()
+        elif os.path.exists(f'{data_location}/{season}/fixtures.csv'):
+            events = self.events_from_fixtures()
+        else:
+            events = self.events_from_gws()
+
+        # Event IDs and their deadlines, sorted by deadline for bisecting
+        events = sorted(events, key=lambda event: (event[1], event[0]))
+        self.event_ids = [event[0] for event in events]
+        self.deadlines = [event[1] for event in events]
+        # Highest event ID seen up to each deadline, so lookups are a single bisect
+        self.latest_ids = []
+        for event_id in self.event_ids:
+            self.latest_ids.append(max(event_id, self.latest_ids[-1]) if self.latest_ids else event_id)
+
+        # Most recent gameweek that, along with every gameweek before it, has finished
+        self.finished_gw = 0
+        for event_id, _, finished in sorted(events):
+            if not finished:
+                break
+            self.finished_gw = event_id
+
+    def events_from_snapshot(self):
+        """
+        Read the gameweeks from the saved bootstrap-static snapshot.
+
+        Returns:
+            list: (event ID, deadline, finished) for each gameweek.
+        """
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+
+        events = []
+        for event in snapshot['events']:
+            deadline = datetime.datetime.strptime(event['deadline_time'], '%Y-%m-%dT%H:%M:%SZ')
+            events.append((event['id'], deadline, event['finished']))
+        return events
+
+    def events_from_fixtures(self):
+        """
+        Work out the gameweeks from the kickoff times in fixtures.csv.
+
+        Returns:
+            list: (event ID, deadline, finished) for each gameweek.
+        """
+        fixtures = pd.read_csv(f'{self.data_location}/{self.season}/fixtures.csv', usecols=['event', 'kickoff_time', 'finished'])
+        fixtures = fixtures.dropna(subset=['event', 'kickoff_time'])
+        fixtures['kickoff_time'] = pd.to_datetime(fixtures['kickoff_time'], format='%Y-%m-%dT%H:%M:%SZ')
+
+        events = []
+        for event_id, event_fixtures in fixtures.groupby('event'):
+            deadline = event_fixtures['kickoff_time'].min().to_pydatetime() - DEADLINE_OFFSET
+            events.append((int(event_id), deadline, bool(event_fixtures['finished'].all())))
+        return events
+
+    def events_from_gws(self):
+        """
+        Treat every gameweek with a gw{N}.csv as finished, for old seasons with no fixtures.csv.
+
+        Returns:
+            list: (event ID, deadline, finished) for each gameweek.
+        """
+        events = []
+        for week_num in range(1, 39):
+            if os.path.exists(f'{self.data_location}/{self.season}/gws/gw{week_num}.csv'):
+                events.append((week_num, datetime.datetime.min, True))
+        return events
+
+    def current_gw(self, now=None):
+        """
+        Get the most recent gameweek whose deadline has passed.
+
+        Args:
+            now (datetime.datetime): The time to check against in UTC (default: now).
+
+        Returns:
+            int: The gameweek's ID, or 0 before the first deadline.
+        """
+        if now is None:
+            now = datetime.datetime.utcnow()
+        i = bisect.bisect_right(self.deadlines, now)
+        if i == 0:
+            return 0
+        return self.latest_ids[i - 1]
+
+    def is_finished(self, week_num):
+        """
+        Check whether a gameweek has finished.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek has finished.
+        """
+        return week_num <= self.finished_gw
+
+def open_calendar(data_location, season):
+    """
+    Get the calendar for a season, reading it from disk only once per process.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        gw_calendar: The gameweek calendar.
+    """
+    key = (data_location, season)
+    if key not in _calendars:
+        _calendars[key] = gw_calendar(data_location, season)
+    return _calendars[key]
+
+def close_calendar(data_location, season):
+    """
+    Forget a season's calendar, so the next open_calendar reads the deadlines again.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+    """
+    _calendars.pop((data_location, season), None)
+
+def refresh_snapshot(data_location, season):
+    """
+    Download the gameweek deadlines from the FPL API and save them as the season's snapshot.
+
+    This is the only place the calendar touches the network.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season the live FPL API is currently serving.
+    """
+    res = requests.get('https://fantasy.premierleague.com/api/bootstrap-static/', timeout=30)
+    res.raise_for_status()
+    events = json.loads(res.content)['events']
+
+    snapshot = {'events': [{key: event[key] for key in ['id', 'deadline_time', 'finished', 'average_entry_score']} for event in events]}
+    with open(f'{data_location}/{season}/{SNAPSHOT_FILE}', 'w') as f:
+        json.dump(snapshot, f)
+
+    close_calendar(data_location, season)
+    calendar = open_calendar(data_location, season)
+    print(f'{season}: saved {len(events)} gameweek deadlines, GW{calendar.current_gw()} is the current gameweek, GW{calendar.finished_gw} the last finished')
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from fpl_auto import store
+
+class player_history:
+    def __init__(self, data_location, season):
+        """
+        Initialize an index of every player's gameweek history for a season, keyed by FPL element ID.
+
+        The players/<First_Last_id>/gw.csv files are held in the season's players store as one
+        contiguous run of rows per player, in round order, so each player's history is the slice
+        starts[element]:stops[element] of every column. A player renamed during the season can have
+        an old directory holding the start of the same history, only the longest is indexed.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season of the data.
+        """
+        self.season = season
+        self.store = store.open_store(data_location, season, 'players')
+        self.decoded = {}
+        # Round --> running count of rows from earlier rounds, for cutting histories off before a gameweek
+        self.earlier = {}
+
+        element = self.store.columns['element']
+        size = int(element.max(initial=0)) + 1 if len(element) > 0 else 1
+        self.starts = np.zeros(size, dtype=np.int64)
+        self.stops = np.zeros(size, dtype=np.int64)
+        self.directories = {}
+        for directory, part in self.store.parts.items():
+            start, stop = part['start'], part['stop']
+            if stop == start:
+                continue
+            player = int(element[start])
+            if stop - start >= self.stops[player] - self.starts[player]:
+                self.starts[player], self.stops[player] = start, stop
+                self.directories[player] = directory
+
+        self.rounds = self.column('round')
+
+    def column(self, name):
+        """
+        Get one column of every player's history, decoded once and kept.
+
+        Args:
+            name (str): The gw.csv column name.
+
+        Returns:
+            numpy.ndarray: The column's values, each player's rows contiguous and in round order.
+        """
+        if name not in self.decoded:
+            values = self.store.get_column(name)
+            # The store keeps the narrowest integer type, widen it so sums over a history cannot overflow
+            self.decoded[name] = values.astype(np.int64) if values.dtype.kind in 'iu' else values
+        return self.decoded[name]
+
+    def has(self, element):
+        """
+        Check whether a player has a history for the season.
+
+        Args:
+            element (int): The element ID.
+
+        Returns:
+            bool: True if the player has at least one row.
+        """
+        return 0 <= element < len(self.starts) and self.stops[element] > self.starts[element]
+
+    def bounds(self, elements, k=None, before_round=None):
+        """
+        Get the rows of each player's history to use, optionally only rounds before a gameweek and only the last k.
+
+        Args:
+            elements (array-like): The element IDs, unknown IDs get no rows.
+            k (int): Keep at most the last k matches of each player (default: every match).
+            before_round (int): Only use matches from rounds before this one (default: every round).
+
+        Returns:
+            tuple: Start and stop row arrays, one entry per element.
+        """
+        elements = np.asarray(elements, dtype=np.int64)
+        known = (elements >= 0) & (elements < len(self.starts))
+        safe = np.where(known, elements, 0)
+        starts = np.where(known, self.starts[safe], 0)
+        stops = np.where(known, self.stops[safe], 0)
+        if before_round is not None:
+            # Rounds are sorted within a player, so the rows before a round are at the start of their slice
+            if before_round not in self.earlier:
+                self.earlier[before_round] = np.concatenate(([0], np.cumsum(self.rounds < before_round)))
+            earlier = self.earlier[before_round]
+            stops = starts + earlier[stops] - earlier[starts]
+        if k is not None:
+            starts = np.maximum(starts, stops - k)
+        return starts, stops
+
+    def last_k(self, element, k, columns=None, before_round=None):
+        """
+        Get a player's last k matches.
+
+        Args:
+            element (int): The element ID.
+            k (int): The number of matches.
+            columns (list): The columns to return (default: every column).
+            before_round (int): Only use matches from rounds before this one (default: every round).
+
+        Returns:
+            dict: Column --> the player's values for up to k matches, oldest first.
+        """
+        starts, stops = self.bounds([element], k=k, before_round=before_round)
+        rows = slice(int(starts[0]), int(stops[0]))
+        return {name: self.column(name)[rows] for name in (columns or self.store.columns)}
+
+    def batch(self, elements, columns=None, k=None, before_round=None):
+        """
+        Get the histories of a batch of players as flat arrays.
+
+        Args:
+            elements (array-like): The element IDs.
+            columns (list): The columns to return (default: every column).
+            k (int): Keep at most the last k matches of each player (default: every match).
+            before_round (int): Only use matches from rounds before this one (default: every round).
+
+        Returns:
+            tuple: Offsets (numpy.ndarray of len(elements) + 1, player i's rows are offsets[i]:offsets[i + 1])
+                   and a dict of column --> the players' values, one after another.
+        """
+        starts, stops = self.bounds(elements, k=k, before_round=before_round)
+        lengths = stops - starts
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return offsets, {name: self.column(name)[rows] for name in (columns or self.store.columns)}
+
+    def window_means(self, elements, columns, from_round, to_round):
+        """
+        Average each player's matches over a range of rounds, like the per-player means sum_player_data uses.
+
+        Args:
+            elements (array-like): The element IDs.
+            columns (list): The numeric columns to average.
+            from_round (int): The first round.
+            to_round (int): The last round (inclusive).
+
+        Returns:
+            pandas.DataFrame: The mean of each column per player, indexed by element ID, NaN for players
+                              without a match in the range.
+        """
+        elements = np.asarray(elements, dtype=np.int64)
+        offsets, values = self.batch(elements, columns=columns + ['round'], before_round=to_round + 1)
+        in_range = values['round'] >= from_round
+        player = np.repeat(np.arange(len(elements)), np.diff(offsets))[in_range]
+        counts = np.bincount(player, minlength=len(elements))
+        means = {}
+        for name in columns:
+            sums = np.bincount(player, weights=values[name][in_range].astype(np.float64), minlength=len(elements))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means[name] = sums / counts
+        return pd.DataFrame(means, index=pd.Index(elements, name='element'), columns=columns)
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import re
+
+# Bump whenever the hash or the manifest layout changes so old manifests are rehashed
+MANIFEST_VERSION = 1
+
+# Bytes read at a time when hashing a file
+CHUNK_SIZE = 2**20
+
+# Manifests opened so far, keyed by (data_location, season)
+_manifests = {}
+
+def hash_file(path):
+    """
+    Hash a file's contents.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The hex BLAKE2b (128 bit) digest of the file.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class manifest:
+    def __init__(self, data_location, season):
+        """
+        Initialize the manifest of a season's input files, recording the size, modification time and content hash of each.
+
+        A file is only rehashed when its size or modification time changes, and derived artifacts
+        depend on content hashes rather than modification times, so a scraper refresh that rewrites
+        files with the same contents invalidates nothing.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season of the data.
+        """
+        self.data_location = data_location
+        self.season = season
+        self.root = f'{data_location}/{season}'
+        self.path = f'{self.root}/.store/manifest.json'
+        self.entries = {}
+        self.dirty = False
+
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved.get('version') == MANIFEST_VERSION:
+                self.entries = saved['files']
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+    def input_files(self):
+        """
+        Find every input file of the season: the season-level CSVs, the gameweeks, the player histories and the understat logs.
+
+        Returns:
+            list: Paths relative to the season directory, sorted.
+        """
+        files = [name for name in os.listdir(self.root) if name.endswith('.csv') or name.endswith('.json')]
+        if os.path.isdir(f'{self.root}/gws'):
+            files += [f'gws/{name}' for name in os.listdir(f'{self.root}/gws') if re.fullmatch(r'gw\d+\.csv', name)]
+        if os.path.isdir(f'{self.root}/players'):
+            files += [f'players/{name}/gw.csv' for name in os.listdir(f'{self.root}/players') if os.path.isfile(f'{self.root}/players/{name}/gw.csv')]
+        if os.path.isdir(f'{self.root}/understat'):
+            files += [f'understat/{name}' for name in os.listdir(f'{self.root}/understat') if name.endswith('.csv')]
+        return sorted(files)
+
+    def entry(self, file_name):
+        """
+        Get a file's manifest entry, hashing it only if it is new or its size or modification time changed.
+
+        Args:
+            file_name (str): The path relative to the season directory, e.g. 'gws/gw1.csv'.
+
+        Returns:
+            dict: size, mtime_ns and hash, or None if the file does not exist.
+        """
+        try:
+            stat = os.stat(f'{self.root}/{file_name}')
+        except FileNotFoundError:
+            if self.entries.pop(file_name, None) is not None:
+                self.dirty = True
+            return None
+
+        entry = self.entries.get(file_name)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': hash_file(f'{self.root}/{file_name}')}
+            self.entries[file_name] = entry
+            self.dirty = True
+        return entry
+
+    def content_hash(self, file_name):
+        """
+        Get the content hash of a file.
+
+        Args:
+            file_name (str): The path relative to the season directory.
+
+        Returns:
+            str: The file's hash, or None if the file does not exist.
+        """
+        entry = self.entry(file_name)
+        return None if entry is None else entry['hash']
+
+    def fingerprint(self, file_names):
+        """
+        Combine the content hashes of the files an artifact is built from.
+
+        Args:
+            file_names (list): Paths relative to the season directory, missing files count as a dependency too.
+
+        Returns:
+            str: A hash that changes whenever any of the files' contents do, or the set of files changes.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for file_name in sorted(file_names):
+            digest.update(f'{file_name}\0{self.content_hash(file_name)}\n'.encode())
+        return digest.hexdigest()
+
+    def is_fresh(self, file_names, fingerprint):
+        """
+        Check whether an artifact built from some of the season's files is still up to date.
+
+        Args:
+            file_names (list): Paths relative to the season directory the artifact was built from.
+            fingerprint (str): The fingerprint recorded when the artifact was built, or None if it never was.
+
+        Returns:
+            bool: True if none of the files' contents have changed since.
+        """
+        return fingerprint is not None and fingerprint == self.fingerprint(file_names)
+
+    def refresh(self):
+        """
+        Bring the manifest up to date with every input file of the season.
+
+        Returns:
+            dict: Lists of 'added', 'changed' and 'removed' files since the manifest was last refreshed.
+        """
+        old_hashes = {file_name: entry['hash'] for file_name, entry in self.entries.items()}
+        files = self.input_files()
+        for file_name in files:
+            self.entry(file_name)
+        for file_name in set(self.entries) - set(files):
+            del self.entries[file_name]
+            self.dirty = True
+
+        return {
+            'added': sorted(set(files) - set(old_hashes)),
+            'changed': sorted(file_name for file_name in files if file_name in old_hashes and old_hashes[file_name] != self.entries[file_name]['hash']),
+            'removed': sorted(set(old_hashes) - set(files)),
+        }
+
+    def save(self):
+        """
+        Write the manifest to disk if any entry changed.
+        """
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'season': self.season, 'files': self.entries}, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+def open_manifest(data_location, season):
+    """
+    Get the manifest for a season, reading it from disk only once per process.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+
+    Returns:
+        manifest: The season's manifest.
+    """
+    key = (data_location, season)
+    if key not in _manifests:
+        _manifests[key] = manifest(data_location, season)
+    return _manifests[key]
@@ -0,0 +1,134 @@
+import numpy as np
+
+# Metrics computed by every function here, in the order evaluate.score_model returns them
+METRICS = ['error', 'rmse', 'accuracy']
+
+# Upper edges of the price bands in £m, a player priced above the last edge is in the top band
+PRICE_BANDS = [5.0, 6.5, 8.0, 10.0]
+
+# Rows of draws held at once by bootstrap, to bound its memory
+BOOTSTRAP_CHUNK_ROWS = 2**20
+
+def score(predictions, labels):
+    """
+    Calculate the mean absolute error, root mean squared error and rounded accuracy along the last axis.
+
+    Accuracy counts a prediction as right when it rounds (half to even, like Python's round) to the label.
+
+    Args:
+        predictions (array-like): The predicted values, e.g. shape (n,) for one model or (models, n) for a batch.
+        labels (array-like): The actual values, the same shape or broadcastable to it, e.g. (n,).
+
+    Returns:
+        dict: 'error', 'rmse' and 'accuracy', each a float (or an array with the batch shape).
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    residuals = predictions - labels
+    return {
+        'error': np.abs(residuals).mean(axis=-1),
+        'rmse': np.sqrt(np.square(residuals).mean(axis=-1)),
+        'accuracy': (np.round(predictions) == labels).mean(axis=-1),
+    }
+
+def score_groups(predictions, labels, groups, n_groups=None):
+    """
+    Calculate the metrics of every group of rows at once, e.g. per position, gameweek or price band.
+
+    Args:
+        predictions (array-like): The predicted values, shape (n,).
+        labels (array-like): The actual values, shape (n,).
+        groups (array-like): The non-negative group number of each row, shape (n,).
+        n_groups (int): The number of groups (default: the largest group number + 1).
+
+    Returns:
+        dict: 'error', 'rmse', 'accuracy' and 'count', each an array with one entry per group, NaN for groups without rows.
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    if n_groups is None:
+        n_groups = int(groups.max(initial=-1)) + 1
+
+    residuals = predictions - labels
+    counts = np.bincount(groups, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'error': np.bincount(groups, weights=np.abs(residuals), minlength=n_groups) / counts,
+            'rmse': np.sqrt(np.bincount(groups, weights=np.square(residuals), minlength=n_groups) / counts),
+            'accuracy': np.bincount(groups, weights=(np.round(predictions) == labels).astype(np.float64), minlength=n_groups) / counts,
+            'count': counts,
+        }
+
+def score_batch(predictions, labels):
+    """
+    Calculate the metrics of many (predictions, labels) pairs of different lengths in one pass.
+
+    Args:
+        predictions (list): The predicted values of each pair, e.g. the four positions of many gameweeks.
+        labels (list): The actual values of each pair.
+
+    Returns:
+        dict: 'error', 'rmse', 'accuracy' and 'count', each an array with one entry per pair.
+    """
+    lengths = [len(pair_labels) for pair_labels in labels]
+    groups = np.repeat(np.arange(len(lengths)), lengths)
+    return score_groups(np.concatenate(predictions), np.concatenate(labels), groups, len(lengths))
+
+def price_band(values, edges=PRICE_BANDS):
+    """
+    Put prices into bands.
+
+    Args:
+        values (array-like): The prices in £m.
+        edges (list): The upper edge of each band but the last, ascending (default: PRICE_BANDS).
+
+    Returns:
+        numpy.ndarray: The band of each price, 0 for the cheapest band up to len(edges) for the dearest.
+    """
+    return np.searchsorted(edges, np.asarray(values, dtype=np.float64), side='left')
+
+def bootstrap(predictions, labels, n_resamples=1000, confidence=0.95, groups=None, random_state=None):
+    """
+    Estimate confidence intervals for the metrics by resampling with replacement.
+
+    Rows are resampled one at a time by default. Given groups (e.g. the gameweek or the window of each row),
+    whole groups are resampled instead, which respects rows of a group being correlated and only costs
+    one draw per group.
+
+    Args:
+        predictions (array-like): The predicted values, shape (n,).
+        labels (array-like): The actual values, shape (n,).
+        n_resamples (int): The number of resamples (default: 1000).
+        confidence (float): The coverage of each interval (default: 0.95).
+        groups (array-like): The non-negative group number of each row, to resample groups rather than rows (default: None).
+        random_state (int): Seed for the resampling (default: None, unseeded).
+
+    Returns:
+        dict: 'error', 'rmse' and 'accuracy' --> (low, high) percentile interval.
+    """
+    predictions = np.asarray(predictions, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.float64)
+    residuals = predictions - labels
+    # Per row (or group) sums, so a resample is only a weighted sum of them
+    sums = np.stack([np.abs(residuals), np.square(residuals), np.round(predictions) == labels, np.ones(len(labels))], axis=1)
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.int64)
+        sums = np.stack([np.bincount(groups, weights=column) for column in sums.T], axis=1)
+
+    rng = np.random.default_rng(random_state)
+    n = len(sums)
+    totals = np.empty((n_resamples, sums.shape[1]))
+    chunk = max(1, BOOTSTRAP_CHUNK_ROWS // max(n, 1))
+    for start in range(0, n_resamples, chunk):
+        stop = min(start + chunk, n_resamples)
+        draws = rng.integers(0, n, size=(stop - start, n))
+        # How many times each resample drew each row, counted for the whole chunk at once
+        counts = np.bincount((draws + n * np.arange(stop - start)[:, None]).ravel(), minlength=(stop - start) * n)
+        totals[start:stop] = counts.reshape(stop - start, n) @ sums
+    resampled = totals[:, :3] / totals[:, 3:]
+    resampled[:, 1] = np.sqrt(resampled[:, 1])
+
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(resampled, [tail, 100 - tail], axis=0)
+    return {metric: (low[i], high[i]) for i, metric in enumerate(METRICS)}
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import pickle
+import time
+import pandas as pd
+import sklearn
+
+# Bump whenever the key or the file layout changes so old models are never loaded
+MODEL_CACHE_VERSION = 1
+
+# Default disk cap and age limit for fitted models, can be overridden with FPL_MODEL_CACHE_MB and FPL_MODEL_CACHE_DAYS
+DEFAULT_MAX_MB = 512
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Model caches opened so far, keyed by data_location
+_caches = {}
+
+def data_hash(training_data):
+    """
+    Hash the contents of the training data of every position.
+
+    Args:
+        training_data (list): The (features, labels) training data for each position.
+
+    Returns:
+        str: A hash that changes whenever any feature, label, column or row changes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for features, labels in training_data:
+        digest.update(json.dumps([list(features.columns), [str(dtype) for dtype in features.dtypes], len(features)]).encode())
+        digest.update(pd.util.hash_pandas_object(features, index=True).to_numpy().tobytes())
+        digest.update(pd.util.hash_pandas_object(labels, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def model_key(season, target_gw, training_prev_weeks, model_type, models, training_hash):
+    """
+    Build the cache key of a set of position models.
+
+    Args:
+        season (str): The season predicted for.
+        target_gw (int): The gameweek predicted for.
+        training_prev_weeks (int): How many past weeks the models are trained on.
+        model_type (str): The model type given to get_model.
+        models (tuple): The unfitted models of each position, their hyperparameters are part of the key.
+        training_hash (str): The data_hash of the training data.
+
+    Returns:
+        str: The hex key.
+    """
+    params = [{name: repr(value) for name, value in model.get_params().items()} for model in models]
+    key = [MODEL_CACHE_VERSION, sklearn.__version__, season, target_gw, training_prev_weeks, model_type, params, training_hash]
+    return hashlib.blake2b(json.dumps(key, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+class model_cache:
+    def __init__(self, directory, max_bytes, max_age):
+        """
+        Initialize an on-disk cache of fitted models, one pickle per key.
+
+        A model is dropped once it has not been used for max_age seconds, and the least recently used
+        models are dropped while the cache is over max_bytes.
+
+        Args:
+            directory (str): The directory the models are kept in.
+            max_bytes (int): The disk cap.
+            max_age (float): The age limit in seconds.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key):
+        """
+        Get the file a model is kept in.
+
+        Args:
+            key (str): The model key.
+
+        Returns:
+            str: The path of the pickle.
+        """
+        return f'{self.directory}/{key}.pkl'
+
+    def get(self, key):
+        """
+        Load fitted models from the cache.
+
+        Args:
+            key (str): The model key.
+
+        Returns:
+            tuple: The fitted models, or None on a miss.
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                models = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # A partly written or outdated pickle, fit again and overwrite it
+            self.misses += 1
+            os.remove(path)
+            return None
+
+        # The modification time is when the models were last used, which eviction goes by
+        os.utime(path)
+        self.hits += 1
+        return models
+
+    def put(self, key, models):
+        """
+        Save fitted models to the cache, then evict old models.
+
+        Args:
+            key (str): The model key.
+            models (tuple): The fitted models.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self.path(key)}.tmp-{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(models, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(key))
+        self.evict()
+
+    def entries(self):
+        """
+        List the models in the cache.
+
+        Returns:
+            list: (last used time, size, path) of each model, least recently used first.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(f'{self.directory}/{name}')
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, f'{self.directory}/{name}'))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Drop models older than the age limit, then the least recently used models until under the disk cap.
+        """
+        entries = self.entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age
+        for used, size, path in entries:
+            if used >= cutoff and total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Drop every model in the cache.
+        """
+        for _, _, path in self.entries():
+            os.remove(path)
+
+    def stats(self):
+        """
+        Get the cache's counters.
+
+        Returns:
+            dict: Hits, misses and evictions this process, and the models and bytes on disk.
+        """
+        entries = self.entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'models': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+def open_model_cache(data_location, max_mb=None, max_age_days=None):
+    """
+    Get the fitted model cache kept under a data location, created once per process.
+
+    Args:
+        data_location (str): The location of the data, models are kept in <data_location>/.store/models.
+        max_mb (float): The disk cap in megabytes (default: FPL_MODEL_CACHE_MB or DEFAULT_MAX_MB).
+        max_age_days (float): Drop models unused for this many days (default: FPL_MODEL_CACHE_DAYS or DEFAULT_MAX_AGE_DAYS).
+
+    Returns:
+        model_cache: The cache, with its limits updated to any given.
+    """
+    if data_location not in _caches:
+        _caches[data_location] = model_cache(
+            f'{data_location}/.store/models',
+            int(float(os.environ.get('FPL_MODEL_CACHE_MB', DEFAULT_MAX_MB)) * 2**20),
+            float(os.environ.get('FPL_MODEL_CACHE_DAYS', DEFAULT_MAX_AGE_DAYS)) * 86400)
+    fitted = _caches[data_location]
+    if max_mb is not None:
+        fitted.max_bytes = int(max_mb * 2**20)
+    if max_age_days is not None:
+        fitted.max_age = max_age_days * 86400
+    return fitted
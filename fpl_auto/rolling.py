@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+# Columns are summed as int64 in units of 1 / scale, the scales tried in order: whole numbers, then whole
+# tenths like the store's 'tenths' encoding (creativity, ict_index, ...)
+SCALES = [1, 10]
+
+def column_scale(values):
+    """
+    Pick the scale a column's values are whole numbers at.
+
+    Args:
+        values (numpy.ndarray): The column's values, NaNs allowed in floats.
+
+    Returns:
+        int: The first of SCALES the values are exact whole numbers at, or None if there is none.
+    """
+    if values.dtype.kind in 'biu':
+        return 1
+    if values.dtype.kind != 'f':
+        return None
+    values = values[~np.isnan(values)]
+    for scale in SCALES:
+        scaled = np.round(values * scale)
+        if np.all(np.abs(scaled) < 2**53) and np.array_equal(scaled / scale, values):
+            return scale
+    return None
+
+class rolling_means:
+    def __init__(self, load_week):
+        """
+        Initialize a sliding window of per-player means over gameweeks.
+
+        Running per-player sums and counts are kept for the current window, so moving the window forward
+        only adds the new week's totals and subtracts those of the week that drops out. The sums are exact
+        int64, so subtracting a week leaves no rounding error behind.
+
+        Args:
+            load_week (function): Called with a week number, returns that week's player data indexed by name.
+        """
+        self.load_week = load_week
+        self.window = {}
+        self.columns = None
+        self.scales = None
+        self.names = pd.Index([], dtype=object)
+        self.sums = None
+        self.counts = None
+        self.rows = np.zeros(0, dtype=np.int64)
+
+    def week_totals(self, week_num):
+        """
+        Sum one gameweek's data per player.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            tuple: The week's data, its player names (pandas.Index, sorted), and per player the sums (int64,
+                   in units of each column's scale), the counts of values that are not NaN and the rows.
+        """
+        week_data = self.load_week(week_num)
+        if self.columns is None:
+            self.columns = list(week_data.columns)
+            self.scales = [column_scale(week_data[column].to_numpy()) for column in self.columns]
+            self.sums = np.zeros((0, len(self.columns)), dtype=np.int64)
+            self.counts = np.zeros((0, len(self.columns)), dtype=np.int64)
+
+        names, positions = np.unique(week_data.index.to_numpy(dtype=object), return_inverse=True)
+        sums = np.zeros((len(names), len(self.columns)), dtype=np.int64)
+        counts = np.zeros((len(names), len(self.columns)), dtype=np.int64)
+        for i, column in enumerate(self.columns):
+            values = week_data[column].to_numpy()
+            if self.scales[i] is not None:
+                scale = column_scale(values)
+                if scale is None:
+                    # The column is not exact in this week, so it is averaged from the weeks' rows from now on
+                    self.scales[i] = None
+                elif scale > self.scales[i]:
+                    self.rescale(i, scale)
+            if self.scales[i] is None:
+                continue
+            present = ~pd.isna(values)
+            scaled = np.round(values[present].astype(np.float64) * self.scales[i]).astype(np.int64)
+            np.add.at(sums[:, i], positions[present], scaled)
+            counts[:, i] = np.bincount(positions[present], minlength=len(names))
+        rows = np.bincount(positions, minlength=len(names))
+        return week_data, pd.Index(names), sums, counts, rows
+
+    def rescale(self, column, scale):
+        """
+        Move a column's sums to a finer scale, e.g. when a column of whole numbers gets its first tenths.
+
+        Args:
+            column (int): The position of the column.
+            scale (int): Its new scale, a multiple of the old one.
+        """
+        factor = scale // self.scales[column]
+        self.sums[:, column] *= factor
+        for _, _, sums, _, _ in self.window.values():
+            sums[:, column] *= factor
+        self.scales[column] = scale
+
+    def add_week(self, week_num):
+        """
+        Add a gameweek to the window.
+
+        Args:
+            week_num (int): The week number.
+        """
+        week_data, names, sums, counts, rows = self.week_totals(week_num)
+        self.window[week_num] = (week_data, names, sums, counts, rows)
+
+        all_names = self.names.union(names)
+        if len(all_names) > len(self.names):
+            # Make room for new players, keeping the names sorted
+            old = all_names.get_indexer(self.names)
+            self.sums, self.counts, self.rows = self.grow(self.sums, old, len(all_names)), self.grow(self.counts, old, len(all_names)), self.grow(self.rows, old, len(all_names))
+            self.names = all_names
+        players = self.names.get_indexer(names)
+        self.sums[players] += sums
+        self.counts[players] += counts
+        self.rows[players] += rows
+
+    def remove_week(self, week_num):
+        """
+        Remove a gameweek from the window.
+
+        Args:
+            week_num (int): The week number.
+        """
+        _, names, sums, counts, rows = self.window.pop(week_num)
+        players = self.names.get_indexer(names)
+        self.sums[players] -= sums
+        self.counts[players] -= counts
+        self.rows[players] -= rows
+
+        # Forget players who no longer appear in any week of the window
+        in_window = self.rows > 0
+        if not np.all(in_window):
+            self.names = self.names[in_window]
+            self.sums, self.counts, self.rows = self.sums[in_window], self.counts[in_window], self.rows[in_window]
+
+    @staticmethod
+    def grow(values, old, length):
+        """
+        Copy per-player totals into a longer array of zeros.
+
+        Args:
+            values (numpy.ndarray): The totals, one row per player.
+            old (numpy.ndarray): The position of each of their players in the longer array.
+            length (int): The number of players in the longer array.
+
+        Returns:
+            numpy.ndarray: The longer array.
+        """
+        grown = np.zeros((length,) + values.shape[1:], dtype=values.dtype)
+        grown[old] = values
+        return grown
+
+    def move_to(self, weeks):
+        """
+        Move the window so that it covers exactly the given gameweeks.
+
+        Args:
+            weeks (list): The week numbers the window should cover.
+        """
+        weeks = set(weeks)
+        for week_num in sorted(set(self.window) - weeks):
+            self.remove_week(week_num)
+        for week_num in sorted(weeks - set(self.window)):
+            self.add_week(week_num)
+
+    def means(self):
+        """
+        Get the per-player means over the window.
+
+        Each mean is the exact sum divided by the count in one correctly rounded division, so whole number
+        columns match groupby().mean() exactly. Its compensated float sums depend on the order of the
+        rows, so tenths columns can differ from it in the last bit or two. Columns with values that are
+        not whole numbers or tenths are averaged from the window's rows with groupby().mean().
+
+        Returns:
+            pandas.DataFrame: The mean of each column per player, indexed and sorted by name.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = self.sums / (self.counts * np.array([scale or 1 for scale in self.scales]))
+        means = pd.DataFrame(np.where(self.counts > 0, values, np.nan), index=self.names, columns=self.columns)
+
+        replayed = [column for column, scale in zip(self.columns, self.scales) if scale is None]
+        if len(replayed) > 0:
+            rows = pd.concat([self.window[week_num][0][replayed] for week_num in sorted(self.window)])
+            means[replayed] = rows.groupby(level=0).mean().reindex(self.names)
+        means.index.name = 'name'
+        return means
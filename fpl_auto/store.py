@@ -0,0 +1,498 @@
+import json
+import os
+import re
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from fpl_auto import manifest
+
+# Bump whenever the on-disk layout changes so old stores get rebuilt
+STORE_VERSION = 5
+
+# Columns kept from each gw{N}.csv, everything else is thrown away at build time
+GW_COLUMNS = ['name', 'position', 'team', 'assists', 'bps', 'clean_sheets', 'creativity', 'goals_conceded', 'goals_scored', 'ict_index', 'influence', 'minutes', 'own_goals', 'penalties_missed', 'penalties_saved', 'red_cards', 'saves', 'threat', 'total_points', 'yellow_cards', 'selected', 'was_home', 'value']
+
+# Stored alongside GW_COLUMNS, the FPL element ID used by the element-keyed lookups
+STORE_COLUMNS = GW_COLUMNS + ['element']
+
+# Open stores, shared by every fpl_data instance in the process
+_stores = {}
+
+def encode_column(values):
+    """
+    Pick the most compact lossless on-disk form of a column.
+
+    Strings become integer codes into the column's categories, floats that are all whole tenths
+    (creativity, ict_index, ...) become integer tenths and integers the narrowest int that holds them.
+
+    Args:
+        values (numpy.ndarray): The column's values for the whole season.
+
+    Returns:
+        tuple: The array to save, the encoding ('category', 'tenths' or 'plain') and the categories (or None).
+    """
+    if values.dtype == object:
+        # Missing values get code -1, everything else is compared as text
+        missing = pd.isna(values)
+        categories, codes = np.unique(values[~missing].astype(str), return_inverse=True)
+        all_codes = np.full(len(values), -1, dtype=np.int64)
+        all_codes[~missing] = codes
+        return narrowest_int(all_codes), 'category', categories
+    if values.dtype.kind == 'f' and np.all(np.isfinite(values)):
+        tenths = np.round(values * 10)
+        if np.array_equal(tenths / 10, values):
+            return narrowest_int(tenths), 'tenths', None
+    if values.dtype.kind in 'iu':
+        return narrowest_int(values), 'plain', None
+    return values, 'plain', None
+
+def narrowest_int(values):
+    """
+    Cast whole numbers to the narrowest signed int that holds them all.
+
+    Args:
+        values (numpy.ndarray): Whole numbers.
+
+    Returns:
+        numpy.ndarray: The values as int8, int16, int32 or int64.
+    """
+    low, high = (values.min(), values.max()) if len(values) > 0 else (0, 0)
+    for dtype in [np.int8, np.int16, np.int32]:
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+def read_source_csv(path, usecols=None):
+    """
+    Read one source CSV, falling back to Latin-1 for the older seasons that are not UTF-8.
+
+    Args:
+        path (str): The path of the CSV.
+        usecols (function): Called with each column name, True to keep the column (default: keep every column).
+
+    Returns:
+        pandas.DataFrame: The CSV contents.
+    """
+    try:
+        return pd.read_csv(path, usecols=usecols)
+    except UnicodeDecodeError:
+        return pd.read_csv(path, usecols=usecols, encoding='latin-1')
+
+class csv_store:
+    # Directory under data/<season> the CSVs are read from, and the store's name under .store
+    directory = None
+    # Column holding each part's key, added to the stored rows (None for no column)
+    key_column = None
+    # Path of each CSV under the directory, at most one level down, whose group is the part's key
+    source_pattern = None
+
+    def __init__(self, data_location, season, pool=None):
+        """
+        Initialize the store for one of a season's directories of CSVs, building it first if it is missing or stale.
+
+        Every CSV (a part) becomes a contiguous run of rows in one .npy file per column, with the
+        part's start and stop offsets kept in the store's metadata.
+
+        Args:
+            data_location (str): The location of the data.
+            season (str): The season of the data.
+            pool (concurrent.futures.Executor): Pool to parse the CSVs with if the store has to be built (default: parse them one by one).
+        """
+        self.data_location = data_location
+        self.season = season
+        self.source = f'{data_location}/{season}/{self.directory}'
+        self.path = f'{data_location}/{season}/.store/{self.directory}'
+        self.build_stats = None
+
+        if not os.path.isdir(self.source):
+            raise FileNotFoundError(f'No {self.directory} data found at {self.source}')
+
+        if self.is_stale():
+            self.build(pool)
+        self.load()
+
+    def source_files(self):
+        """
+        Find the CSVs that make up the store.
+
+        Returns:
+            dict: Part key --> path of the CSV, in the order the parts are stored (sorted by key).
+        """
+        files = {}
+        for name in os.listdir(self.source):
+            if os.path.isdir(f'{self.source}/{name}'):
+                paths = [f'{name}/{inner_name}' for inner_name in os.listdir(f'{self.source}/{name}')]
+            else:
+                paths = [name]
+            for path in paths:
+                match = re.fullmatch(self.source_pattern, path)
+                if match:
+                    files[self.parse_key(match.group(1))] = f'{self.source}/{path}'
+        return dict(sorted(files.items()))
+
+    def read_part(self, path):
+        """
+        Read one of the store's CSVs.
+
+        Args:
+            path (str): The path of the CSV.
+
+        Returns:
+            pandas.DataFrame: The columns of the CSV to store.
+        """
+        return read_source_csv(path)
+
+    def parse_key(self, key):
+        """
+        Turn a part key read back from the metadata file into its original type.
+
+        Args:
+            key (str): The key as saved in meta.json.
+
+        Returns:
+            The part key.
+        """
+        return key
+
+    def source_signature(self):
+        """
+        Get the size and content hash of every source CSV, used to detect stale stores.
+
+        Hashes come from the season's manifest, so a CSV is only rehashed when its size or
+        modification time changes, and rewriting a CSV with the same contents leaves the store fresh.
+
+        Returns:
+            list: [key, size, hash] for each CSV.
+        """
+        season_manifest = manifest.open_manifest(self.data_location, self.season)
+        signature = []
+        for key, path in self.source_files().items():
+            entry = season_manifest.entry(os.path.relpath(path, season_manifest.root))
+            signature.append([key, entry['size'], entry['hash']])
+        season_manifest.save()
+        return signature
+
+    def read_meta(self):
+        """
+        Read the store's metadata file.
+
+        Returns:
+            dict: The metadata, or None if the store has not been built.
+        """
+        try:
+            with open(f'{self.path}/meta.json') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def is_stale(self):
+        """
+        Check whether the store needs to be (re)built from the CSVs.
+
+        Returns:
+            bool: True if the store is missing, from an older version or out of date.
+        """
+        meta = self.read_meta()
+        if meta is None or meta.get('version') != STORE_VERSION:
+            return True
+        return meta['signature'] != self.source_signature()
+
+    def reusable_parts(self, signature):
+        """
+        Read back the parts of the current store whose CSVs have not changed, so a rebuild only parses new or edited CSVs.
+
+        Args:
+            signature (list): [key, size, hash] for each CSV as it is now.
+
+        Returns:
+            dict: Part key --> the part's data, identical to parsing its CSV again.
+        """
+        meta = self.read_meta()
+        if meta is None or meta.get('version') != STORE_VERSION:
+            return {}
+        old_signature = {key: entry for key, *entry in meta['signature']}
+        unchanged = [key for key, *entry in signature if old_signature.get(key) == entry]
+        if len(unchanged) == 0:
+            return {}
+
+        self.load()
+        reusable = {key: self.get_part(key) for key in unchanged}
+        # Let go of the memory-mapped files before they are replaced
+        self.columns = {}
+        return reusable
+
+    def build(self, pool=None, reuse=True):
+        """
+        Parse every CSV once and write them as one compact .npy file per column.
+
+        Args:
+            pool (concurrent.futures.Executor): Pool to parse the CSVs with (default: parse them one by one).
+            reuse (bool): Take the parts whose CSVs have not changed from the current store rather than parsing them again.
+        """
+        start_time = time.perf_counter()
+        signature = self.source_signature()
+        source_files = self.source_files()
+        reusable = self.reusable_parts(signature) if reuse else {}
+        to_parse = [path for key, path in source_files.items() if key not in reusable]
+        if pool is None:
+            parsed = [self.read_part(path) for path in to_parse]
+        else:
+            parsed = list(pool.map(self.read_part, to_parse))
+        parsed = iter(parsed)
+        part_frames = [reusable[key] if key in reusable else next(parsed) for key in source_files]
+
+        frames = []
+        parts = {}
+        start = 0
+        for key, part_data in zip(source_files, part_frames):
+            # Record the parsed dtypes so that slices come back exactly as read_csv would give them
+            parts[key] = {
+                'start': start,
+                'stop': start + len(part_data),
+                'columns': list(part_data.columns),
+                'dtypes': [str(dtype) for dtype in part_data.dtypes],
+            }
+            start += len(part_data)
+            if len(part_data) > 0:
+                if self.key_column is not None:
+                    part_data = part_data.assign(**{self.key_column: key})
+                frames.append(part_data)
+
+        if len(frames) > 0:
+            all_data = pd.concat(frames, ignore_index=True)
+        else:
+            all_data = pd.DataFrame(columns=self.empty_columns())
+
+        # Write to a temporary directory first so readers never see a half built store
+        tmp_path = f'{self.path}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        columns = {}
+        for column in all_data.columns:
+            values, encoding, categories = encode_column(all_data[column].to_numpy())
+            np.save(f'{tmp_path}/{column}.npy', values, allow_pickle=False)
+            if categories is not None:
+                np.save(f'{tmp_path}/{column}.categories.npy', categories, allow_pickle=False)
+            columns[column] = {'dtype': str(values.dtype), 'encoding': encoding}
+
+        meta = {
+            'version': STORE_VERSION,
+            'season': self.season,
+            'signature': signature,
+            'columns': columns,
+            'parts': parts,
+        }
+        with open(f'{tmp_path}/meta.json', 'w') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(tmp_path, self.path)
+
+        self.build_stats = {
+            'files': len(to_parse),
+            'bytes': sum(size for key, size, _ in signature if key not in reusable),
+            'reused': len(reusable),
+            'seconds': time.perf_counter() - start_time,
+        }
+
+    def empty_columns(self):
+        """
+        Get the columns to write when every CSV is empty.
+
+        Returns:
+            list: The column names.
+        """
+        return [] if self.key_column is None else [self.key_column]
+
+    def load(self):
+        """
+        Memory-map the store's columns.
+        """
+        meta = self.read_meta()
+        self.parts = {self.parse_key(key): info for key, info in meta['parts'].items()}
+        self.columns = {}
+        self.encodings = {}
+        self.categories = {}
+        for column, info in meta['columns'].items():
+            self.columns[column] = np.load(f'{self.path}/{column}.npy', mmap_mode='r')
+            self.encodings[column] = info['encoding']
+            if info['encoding'] == 'category':
+                self.categories[column] = pd.Index(np.load(f'{self.path}/{column}.categories.npy').astype(object))
+
+    def decode(self, column, values, compact=False):
+        """
+        Turn stored values back into the column's values.
+
+        Args:
+            column (str): The column name.
+            values (numpy.ndarray): Stored values of the column.
+            compact (bool): Return strings as a categorical and tenths as float32 rather than str and float64.
+
+        Returns:
+            numpy.ndarray or pandas.Categorical: The column's values.
+        """
+        encoding = self.encodings[column]
+        if encoding == 'category':
+            if compact:
+                return pd.Categorical.from_codes(values, categories=self.categories[column])
+            decoded = self.categories[column].to_numpy()[values]
+            decoded[np.asarray(values) < 0] = np.nan
+            return decoded
+        if encoding == 'tenths':
+            return (values / 10).astype(np.float32) if compact else values / 10
+        if compact and values.dtype.kind == 'i':
+            # int8 is too easy to overflow in arithmetic, int16 is as narrow as a compact frame gets
+            return values.astype(np.promote_types(values.dtype, np.int16))
+        return np.asarray(values)
+
+    def get_column(self, column):
+        """
+        Get a column for every part.
+
+        Args:
+            column (str): The column name.
+
+        Returns:
+            numpy.ndarray: The column's values, in part order.
+        """
+        return self.decode(column, self.columns[column])
+
+    def get_part(self, key, compact=False):
+        """
+        Slice one CSV's rows out of the store.
+
+        Args:
+            key: The part key.
+            compact (bool): Use compact dtypes, categoricals for strings, int16/int32 for integers and float32
+                            for tenths, rather than the dtypes the CSV was read with.
+
+        Returns:
+            pandas.DataFrame: The CSV's data, identical to reading its columns directly unless compact.
+        """
+        part = self.parts[key]
+        start, stop = part['start'], part['stop']
+        part_data = {}
+        for column, dtype in zip(part['columns'], part['dtypes']):
+            values = self.decode(column, self.columns[column][start:stop], compact=compact)
+            if not compact:
+                if dtype == 'bool' and values.dtype == object:
+                    # Stored as text because other CSVs had something else in this column
+                    values = values == 'True'
+                values = np.array(values, dtype=dtype)
+            part_data[column] = values
+        return pd.DataFrame(part_data, columns=part['columns'])
+
+class gw_store(csv_store):
+    directory = 'gws'
+    key_column = 'gw'
+    # Week number --> gw{N}.csv
+    source_pattern = r'gw(\d+)\.csv'
+
+    def read_part(self, path):
+        gw_data = read_source_csv(path, usecols=lambda column: column in STORE_COLUMNS)
+        return gw_data[[column for column in STORE_COLUMNS if column in gw_data.columns]]
+
+    def parse_key(self, key):
+        return int(key)
+
+    def empty_columns(self):
+        return STORE_COLUMNS + [self.key_column]
+
+    @property
+    def weeks(self):
+        return self.parts
+
+    def has_week(self, week_num):
+        """
+        Check whether a gameweek is in the store.
+
+        Args:
+            week_num (int): The week number.
+
+        Returns:
+            bool: True if the gameweek CSV existed when the store was built.
+        """
+        return week_num in self.parts
+
+    def get_week(self, week_num, compact=False):
+        """
+        Slice a gameweek out of the store.
+
+        Args:
+            week_num (int): The week number.
+            compact (bool): Use compact dtypes, categoricals for strings, int16/int32 for integers and float32
+                            for tenths, rather than the dtypes gw{N}.csv was read with.
+
+        Returns:
+            pandas.DataFrame: The gameweek data, identical to reading the gw{N}.csv columns directly unless compact.
+        """
+        if week_num not in self.parts:
+            raise FileNotFoundError(f'{self.source}/gw{week_num}.csv')
+        return self.get_part(week_num, compact=compact)
+
+class player_store(csv_store):
+    directory = 'players'
+    # Player directory name (First_Last_id) --> its gw.csv
+    source_pattern = r'([^/]+)/gw\.csv'
+
+class understat_store(csv_store):
+    directory = 'understat'
+    # File name without .csv (First_Last_understatid) --> every player's match log, the per-team and summary files are left out
+    source_pattern = r'(.+_\d+)\.csv'
+
+# Store classes by the directory they are built from
+STORE_TYPES = {store_type.directory: store_type for store_type in [gw_store, player_store, understat_store]}
+
+def open_store(data_location, season, directory='gws', pool=None, force=False):
+    """
+    Get a store for a season, opening (and building) it only once per process.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        directory (str): 'gws', 'players' or 'understat' (default: 'gws').
+        pool (concurrent.futures.Executor): Pool to parse the CSVs with if the store has to be built.
+        force (bool): Whether to rebuild the store even if it is up to date.
+
+    Returns:
+        csv_store: The store, a gw_store for the gameweeks.
+    """
+    key = (data_location, season, directory)
+    if key not in _stores:
+        _stores[key] = STORE_TYPES[directory](data_location, season, pool=pool)
+    elif force:
+        _stores[key].build_stats = None
+    if force and _stores[key].build_stats is None:
+        _stores[key].build(pool, reuse=False)
+        _stores[key].load()
+    return _stores[key]
+
+def close_store(data_location, season, directory='gws'):
+    """
+    Forget an opened store, so the next open_store checks its CSVs again and updates it if they changed.
+
+    Args:
+        data_location (str): The location of the data.
+        season (str): The season of the data.
+        directory (str): 'gws', 'players' or 'understat' (default: 'gws').
+    """
+    _stores.pop((data_location, season, directory), None)
+
+def build_stores(data_location, seasons, force=False):
+    """
+    Build the gameweek stores for a list of seasons.
+
+    Args:
+        data_location (str): The location of the data.
+        seasons (list): The seasons to build.
+        force (bool): Whether to rebuild stores that are already up to date.
+    """
+    for season in seasons:
+        store = gw_store(data_location, season)
+        if force:
+            store.build(reuse=False)
+            store.load()
+        _stores[(data_location, season, 'gws')] = store
+        print(f'{season}: {len(store.weeks)} gameweeks stored in {store.path}')
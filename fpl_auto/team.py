@@ -1,8 +1,10 @@
+import numpy as np
 import pandas as pd
 import fpl_auto.data as fpl
+from fpl_auto import elements
 
 class team:
-    def __init__(self, season, gameweek=1, budget=100.0, transfers_left=0, players=[[], [], [], [], []], chips_used=[], transfer_history=[], triple_captain_available=True, bench_boost_available=True, free_hit_available=True, wildcard_available=True, free_hit_team=None):
+    def __init__(self, season, gameweek=1, budget=100.0, transfers_left=0, players=[[], [], [], [], []], chips_used=[], transfer_history=[], triple_captain_available=True, bench_boost_available=True, free_hit_available=True, wildcard_available=True, free_hit_team=None, element_ids=False):
         """
         Initializes a team object.
 
@@ -15,6 +17,7 @@ class team:
             - mids (list): List of midfielders in the team (default: []).
             - fwds (list): List of forwards in the team (default: []).
             - subs (list): List of substitutes in the team (default: []).
+            - element_ids (bool): Key players by their FPL element ID rather than their name (default: False).
 
         Returns:
             - None
@@ -30,6 +33,7 @@ class team:
         self.fwds = players[3]
         self.subs = players[4]
         self.free_hit_team = free_hit_team
+        self.element_ids = element_ids
 
         # From 2024-25 season, the number of transfers allowed is no longer capped
         if self.season == '2024-25':
@@ -47,7 +51,7 @@ class team:
         self.chip_free_hit_active = False
         self.chip_wildcard_available = wildcard_available
 
-        self.gw_data = self.fpl.get_gw_data(self.season, self.gameweek)
+        self.gw_data = self.get_gw_data(self.gameweek)
 
         if self.chip_wildcard_available is False and self.gameweek == 19:
             print('============== Wildcard Returned! ==============\n')
@@ -61,8 +65,16 @@ class team:
         self.combined_xp = [self.gk_xp, self.def_xp, self.mid_xp, self.fwd_xp]
         
         self.all_xp = self.get_n_gws_xp(5, discount_factor=0.8)
-        
-        self.player_list = self.fpl.player_list
+
+        if self.element_ids:
+            # Predictions are made per name, everything from here on is keyed by element ID
+            _, name_to_ids = self.fpl.get_element_names()
+            self.gk_xp, self.def_xp, self.mid_xp, self.fwd_xp = elements.predictions_to_elements([self.gk_xp, self.def_xp, self.mid_xp, self.fwd_xp], name_to_ids)
+            self.all_xp = elements.predictions_to_elements(self.all_xp, name_to_ids)
+            self.xp_arrays = [elements.xp_array(pos) for pos in self.all_xp]
+            self.player_list = self.fpl.get_element_list(season)
+        else:
+            self.player_list = self.fpl.player_list
         self.gk_player_list = self.generate_player_list('GK')
         self.def_player_list = self.generate_player_list('DEF')
         self.mid_player_list = self.generate_player_list('MID')
@@ -74,24 +86,22 @@ class team:
         self.fwd_xp_dict = dict(zip(self.fwd_xp.Name, self.fwd_xp.xP))
         self.player_xp_list = self.gk_xp.xP.tolist() + self.def_xp.xP.tolist() + self.mid_xp.xP.tolist() + self.fwd_xp.xP.tolist()
         
-        self.prev_pos_list = self.fpl.position_dict(self.gameweek - 1)
+        self.prev_pos_list = self.position_dict(self.gameweek - 1)
 
         self.captain = ''
         self.vice_captain = ''
 
-        try:
-            self.recent_gw = self.fpl.get_recent_gw() - 1
-        except:
-            self.recent_gw = 38
+        # Most recent gameweek with results, from the local calendar so backtests never wait on the network
+        self.recent_gw = self.fpl.get_finished_gw()
         if self.gameweek >= self.recent_gw and self.season == '2023-24':
-            self.positions_list = self.fpl.position_dict(self.recent_gw)
-            self.points_scored = self.fpl.actual_points_dict(season, self.recent_gw - 1)
+            self.positions_list = self.position_dict(self.recent_gw)
+            self.points_scored = self.actual_points_dict(self.recent_gw - 1)
         elif self.gameweek == 8 and self.season == '2023-24':
-            self.positions_list = self.fpl.position_dict(self.gameweek)
-            self.points_scored = self.fpl.actual_points_dict(season, self.gameweek)
+            self.positions_list = self.position_dict(self.gameweek)
+            self.points_scored = self.actual_points_dict(self.gameweek)
         else:
-            self.positions_list = self.fpl.position_dict(self.gameweek - 1)
-            self.points_scored = self.fpl.actual_points_dict(season, self.gameweek)
+            self.positions_list = self.position_dict(self.gameweek - 1)
+            self.points_scored = self.actual_points_dict(self.gameweek)
         
         # Optional stop list for players
         self.player_stop_list = []
@@ -99,6 +109,96 @@ class team:
         if self.free_hit_team is not None and self.free_hit_team[2] == self.gameweek - 1: 
             self.load_free_hit_team()
 
+    def get_gw_data(self, week_num):
+        """
+        Returns the data used to look up prices and clubs for a gameweek.
+
+        Parameters:
+            - week_num (int): The week number.
+
+        Returns:
+            - pandas.DataFrame or elements.element_table: The gameweek data, indexed by name or by element ID.
+        """
+        if self.element_ids:
+            return self.fpl.get_element_table(self.season, week_num)
+        return self.fpl.get_gw_data(self.season, week_num)
+
+    def position_dict(self, week_num):
+        """
+        Returns the position of every player in a gameweek.
+
+        Parameters:
+            - week_num (int): The week number.
+
+        Returns:
+            - dict: Player --> position.
+        """
+        if self.element_ids:
+            return self.fpl.get_element_table(self.season, week_num).column('position')
+        return self.fpl.position_dict(week_num)
+
+    def actual_points_dict(self, week_num):
+        """
+        Returns the points scored by every player in a gameweek.
+
+        Parameters:
+            - week_num (int): The week number.
+
+        Returns:
+            - dict: Player --> points.
+        """
+        if self.element_ids:
+            return self.fpl.get_element_table(self.season, week_num).column('points')
+        return self.fpl.actual_points_dict(self.season, week_num)
+
+    def players_who_didnt_play(self, week_num):
+        """
+        Returns the players who played no minutes in a gameweek.
+
+        Parameters:
+            - week_num (int): The week number.
+
+        Returns:
+            - dict: Player --> minutes.
+        """
+        if self.element_ids:
+            return self.fpl.get_element_table(self.season, week_num).didnt_play()
+        return self.fpl.get_players_who_didnt_play(week_num)
+
+    def player_name(self, player):
+        """
+        Returns the display name of a player.
+
+        Parameters:
+            - player (str or int): The name or element ID of the player.
+
+        Returns:
+            - str: The name of the player.
+        """
+        if self.element_ids and not isinstance(player, str):
+            id_to_name, _ = self.fpl.get_element_names()
+            return id_to_name.get(player, str(player))
+        return player
+
+    def player_id(self, player):
+        """
+        Resolves a player name to an element ID when keying players by element ID.
+
+        Parameters:
+            - player (str or int): The name or element ID of the player.
+
+        Returns:
+            - str or int: The element ID, preferring one in this gameweek's data when the name is shared, otherwise the player unchanged.
+        """
+        if not self.element_ids or not isinstance(player, str):
+            return player
+        _, name_to_ids = self.fpl.get_element_names()
+        ids = name_to_ids.get(player, [])
+        for element in ids:
+            if self.gw_data.has(element):
+                return element
+        return ids[0] if len(ids) > 0 else player
+
     def check_violate_club_rule(self, player, club_counts=None):
         """
         Checks if adding a player would violate the club rule.
@@ -109,6 +209,9 @@ class team:
         
         """
         player_club = self.fpl.get_player_team(player, self.gameweek, self.gw_data)
+        if self.element_ids and player_club is not None:
+            # get_club_counts keys clubs by their string form, names already are
+            player_club = str(player_club)
         if club_counts is None:
             club_counts = self.get_club_counts(self.gw_data)
         try:
@@ -132,6 +235,7 @@ class team:
         Returns:
             - None
         """
+        player = self.player_id(player)
         force = False
         if self.transfer_in_allowed(player, position, custom_price) or force and self.squad_size() < 15:
             #print('Adding', player, 'to', position)
@@ -159,6 +263,7 @@ class team:
         Returns:
             - bool: True if the transfer in is allowed, False otherwise.
         """
+        player = self.player_id(player)
         if custom_price == None:
             p_cost = self.player_value(player, self.gw_data)
         else:
@@ -345,12 +450,12 @@ class team:
         """
         Displays the current team lineup.
         """
-        print(f'GK: {self.gks}')
-        print(f'DEF: {self.defs}')
-        print(f'MID: {self.mids}')
-        print(f'FWD: {self.fwds}')
-        print(f'SUBS: {self.subs}')
-        print(f'C: {self.captain}, VC: {self.vice_captain}')
+        print(f'GK: {[self.player_name(player) for player in self.gks]}')
+        print(f'DEF: {[self.player_name(player) for player in self.defs]}')
+        print(f'MID: {[self.player_name(player) for player in self.mids]}')
+        print(f'FWD: {[self.player_name(player) for player in self.fwds]}')
+        print(f'SUBS: {[[self.player_name(player), position] for player, position in self.subs]}')
+        print(f'C: {self.player_name(self.captain)}, VC: {self.player_name(self.vice_captain)}')
         print(f'Budget: {self.budget:.1f}\n')
 
     def get_team(self):
@@ -535,6 +640,12 @@ class team:
         if position == None:
             position = self.player_pos(player)
 
+        if self.element_ids:
+            xp = self.xp_arrays[self.pos_to_num(position)]
+            if isinstance(player, (int, np.integer)) and 0 <= player < len(xp) and not np.isnan(xp[player]):
+                return float(xp[player])
+            return 0
+
         xp_dict = self.all_xp[self.pos_to_num(position)]
         xp_dict = dict(zip(xp_dict.Name, xp_dict.xP))
         
@@ -700,7 +811,7 @@ class team:
                         min_player = player
                 # Remove the player
                 self.remove_player(min_player, position)
-                print(f'Removed {min_player} from {position}', end='\r')
+                print(f'Removed {self.player_name(min_player)} from {position}', end='\r')
             
     def player_p(self, player, position):
         """
@@ -805,35 +916,35 @@ class team:
         captain_played = self.captain_played()
         for player in self.gks:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'GK', self.player_p(player, 'GK')])
+                p_list.append([f'(C) {self.player_name(player)}', 'GK', self.player_p(player, 'GK')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'GK', self.player_p(player, 'GK')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'GK', self.player_p(player, 'GK')])
             else:
-                p_list.append([player, 'GK', self.player_p(player, 'GK')])
+                p_list.append([self.player_name(player), 'GK', self.player_p(player, 'GK')])
         for player in self.defs:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([f'(C) {self.player_name(player)}', 'DEF', self.player_p(player, 'DEF')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'DEF', self.player_p(player, 'DEF')])
             else:
-                p_list.append([player, 'DEF', self.player_p(player, 'DEF')])
+                p_list.append([self.player_name(player), 'DEF', self.player_p(player, 'DEF')])
         for player in self.mids:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'MID', self.player_p(player, 'MID')])
+                p_list.append([f'(C) {self.player_name(player)}', 'MID', self.player_p(player, 'MID')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'MID', self.player_p(player, 'MID')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'MID', self.player_p(player, 'MID')])
             else:
-                p_list.append([player, 'MID', self.player_p(player, 'MID')])
+                p_list.append([self.player_name(player), 'MID', self.player_p(player, 'MID')])
         for player in self.fwds:
             if player == self.captain and captain_played:
-                p_list.append([f'(C) {player}', 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([f'(C) {self.player_name(player)}', 'FWD', self.player_p(player, 'FWD')])
             elif player == self.vice_captain and not captain_played:
-                p_list.append([f'(VC) {player}', 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([f'(VC) {self.player_name(player)}', 'FWD', self.player_p(player, 'FWD')])
             else:
-                p_list.append([player, 'FWD', self.player_p(player, 'FWD')])
+                p_list.append([self.player_name(player), 'FWD', self.player_p(player, 'FWD')])
         if include_subs:
             for player in self.subs:
-                p_list.append([player[0], player[1], self.player_p(player[0], player[1])])
+                p_list.append([self.player_name(player[0]), player[1], self.player_p(player[0], player[1])])
 
         return p_list
     
@@ -848,24 +959,24 @@ class team:
         self.auto_subs()
         for player in self.gks:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'GK', self.player_xp(player, 'GK') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'GK', self.player_xp(player, 'GK') * 2])
             else:
-                xp_list.append([player, 'GK', self.player_xp(player, 'GK')])
+                xp_list.append([self.player_name(player), 'GK', self.player_xp(player, 'GK')])
         for player in self.defs:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'DEF', self.player_xp(player, 'DEF') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'DEF', self.player_xp(player, 'DEF') * 2])
             else:
-                xp_list.append([player, 'DEF', self.player_xp(player, 'DEF')])
+                xp_list.append([self.player_name(player), 'DEF', self.player_xp(player, 'DEF')])
         for player in self.mids:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'MID', self.player_xp(player, 'MID') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'MID', self.player_xp(player, 'MID') * 2])
             else:
-                xp_list.append([player, 'MID', self.player_xp(player, 'MID')])
+                xp_list.append([self.player_name(player), 'MID', self.player_xp(player, 'MID')])
         for player in self.fwds:
             if player == self.captain:
-                xp_list.append([f'(C) {player}', 'FWD', self.player_xp(player, 'FWD') * 2])
+                xp_list.append([f'(C) {self.player_name(player)}', 'FWD', self.player_xp(player, 'FWD') * 2])
             else:
-                xp_list.append([player, 'FWD', self.player_xp(player, 'FWD')])
+                xp_list.append([self.player_name(player), 'FWD', self.player_xp(player, 'FWD')])
 
         return xp_list
     
@@ -910,7 +1021,7 @@ class team:
             return self.positions_list[player]
         elif player in self.prev_pos_list:
             return self.prev_pos_list[player]
-        next_pos_list = self.fpl.position_dict(self.gameweek)
+        next_pos_list = self.position_dict(self.gameweek)
         if player in next_pos_list:
             return next_pos_list[player]
     
@@ -1060,9 +1171,9 @@ class team:
                 elif self.squad_size() == 16:
                     self.remove_player(transfer_in, position)
                 else:
-                    print(f'TRANSFER: OUT {transfer_out} {position} --> IN {transfer_in} {position} | xP Gain: {xp_gain:.2f}\n')
+                    print(f'TRANSFER: OUT {self.player_name(transfer_out)} {position} --> IN {self.player_name(transfer_in)} {position} | xP Gain: {xp_gain:.2f}\n')
                     self.transfers_left -= 1
-                    self.transfer_history.append([self.gameweek, [transfer_out, transfer_in], round(xp_gain, 2)])
+                    self.transfer_history.append([self.gameweek, [self.player_name(transfer_out), self.player_name(transfer_in)], round(xp_gain, 2)])
         except ValueError:
             pass
         
@@ -1121,7 +1232,7 @@ class team:
         Swaps players who didn't play with substitutes in the team.
         """
         # Get players who didn't play
-        players_who_didnt_play = self.fpl.get_players_who_didnt_play(self.gameweek)
+        players_who_didnt_play = self.players_who_didnt_play(self.gameweek)
 
         # Get a list of players on the team who didnt play
         gks_who_didnt_play = []
@@ -1219,7 +1330,7 @@ class team:
         Returns:
             - team: The ideal team.
         """
-        temp_t = team(self.season, self.gameweek, self.budget, self.transfers_left, self.gks, self.defs, self.mids, self.fwds)
+        temp_t = team(self.season, self.gameweek, self.budget, self.transfers_left, self.gks, self.defs, self.mids, self.fwds, element_ids=self.element_ids)
         counts = {}
         new_fwds = self.initial_players('FWD', fwd_n, fwd_budget, counts)
         all_players = new_fwds
@@ -1287,7 +1398,7 @@ class team:
         # Sort by P all_p[x][2]
         all_p = sorted(p_list, key=lambda x: x[2], reverse=True)
         # Display best 3 players
-        print(f'''GW{self.gameweek} - {self.season} | P: {self.team_p()} | xP: {self.team_xp():.2f} | B: {self.budget:.1f} | C: {self.captain} | VC: {self.vice_captain}
+        print(f'''GW{self.gameweek} - {self.season} | P: {self.team_p()} | xP: {self.team_xp():.2f} | B: {self.budget:.1f} | C: {self.player_name(self.captain)} | VC: {self.player_name(self.vice_captain)}
     Top 3: {all_p[0][0]} {all_p[0][1]} {all_p[0][2]}, {all_p[1][0]} {all_p[1][1]} {all_p[1][2]}, {all_p[2][0]} {all_p[2][1]} {all_p[2][2]}
     Worst 3: {all_p[-1][0]} {all_p[-1][1]} {all_p[-1][2]}, {all_p[-2][0]} {all_p[-2][1]} {all_p[-2][2]}, {all_p[-3][0]} {all_p[-3][1]} {all_p[-3][2]}\n''')
 
@@ -1392,7 +1503,7 @@ class team:
         total_spent = 0
         original_budget = budget
 
-        last_gw_data = self.fpl.get_gw_data(self.season, self.gameweek + 1)
+        last_gw_data = self.get_gw_data(self.gameweek + 1)
         for player in players_by_xp:
             p_cost = self.player_value(player, last_gw_data) # <-----! Erroneous line
             
@@ -1534,7 +1645,7 @@ class team:
             captain_xp = self.player_xp(captain, self.player_pos(captain))
             #print(f'Captain xP: {captain_xp:.2f}')
             if captain_xp > triple_captain_threshold and self.gameweek > 1:
-                print(f'CHIP: Triple Captain activated on GW{self.gameweek} for {captain} with {captain_xp:.2f} xP\n')
+                print(f'CHIP: Triple Captain activated on GW{self.gameweek} for {self.player_name(captain)} with {captain_xp:.2f} xP\n')
                 self.chips_used.append(['Triple Captain', self.gameweek])
                 self.chip_triple_captain_available = False
                 self.chip_triple_captain_active = True
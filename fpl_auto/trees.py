@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import RandomForestRegressor
+
+# (row, tree) pairs walked at once by packed_ensemble.walk, to bound its memory
+PREDICT_CHUNK_PAIRS = 2**21
+
+# Ensembles of trees no deeper than this are padded to complete trees and predicted by table lookup, deeper
+# ones (the random forests) are walked. A complete tree of depth d has 2**d - 1 splits, whose results index a
+# table of 2**(2**d - 1) leaf values per tree
+LOOKUP_MAX_DEPTH = 3
+
+# Rows packed_ensemble.lookup predicts at once, so each block of split results stays in cache
+LOOKUP_CHUNK_ROWS = 512
+
+class packed_ensemble:
+    def __init__(self, trees, scale, baseline, feature_names=None):
+        """
+        Initialize an ensemble of regression trees packed into flat node arrays.
+
+        Every tree's nodes are stored one after another in feature, threshold, left, right and value,
+        indexed by global node number. Leaves point to themselves with an always-true split, so every row
+        can take exactly depth steps down every tree at once, without checking which ones are done.
+        Ensembles no deeper than LOOKUP_MAX_DEPTH are also packed as complete trees for lookup.
+
+        Args:
+            trees (list): The fitted sklearn.tree.DecisionTreeRegressor of each tree.
+            scale (float): Each leaf value is multiplied by this, e.g. the learning rate.
+            baseline (float): Added to the sum of the trees, e.g. a boosted model's initial prediction.
+            feature_names (array-like): The feature the model was fitted on in each column, to line up
+                                        DataFrames passed to predict (default: None, columns are used in order).
+        """
+        sizes = [tree.tree_.node_count for tree in trees]
+        offsets = np.concatenate(([0], np.cumsum(sizes)))
+        self.roots = offsets[:-1].astype(np.int32)
+        self.feature = np.empty(offsets[-1], dtype=np.int32)
+        self.threshold = np.empty(offsets[-1], dtype=np.float64)
+        self.left = np.empty(offsets[-1], dtype=np.int32)
+        self.right = np.empty(offsets[-1], dtype=np.int32)
+        self.value = np.empty(offsets[-1], dtype=np.float64)
+        for tree, start, stop in zip(trees, offsets[:-1], offsets[1:]):
+            nodes = tree.tree_
+            leaf = nodes.children_left == -1
+            own = np.arange(start, stop, dtype=np.int32)
+            self.feature[start:stop] = np.where(leaf, 0, nodes.feature)
+            self.threshold[start:stop] = np.where(leaf, np.inf, nodes.threshold)
+            self.left[start:stop] = np.where(leaf, own, nodes.children_left + start)
+            self.right[start:stop] = np.where(leaf, own, nodes.children_right + start)
+            # Scaled per leaf, as sklearn scales each tree's prediction before adding it
+            self.value[start:stop] = scale * nodes.value[:, 0, 0]
+
+        self.depth = max((tree.tree_.max_depth for tree in trees), default=0)
+        self.baseline = baseline
+        self.feature_names = None if feature_names is None else list(feature_names)
+        self.n_features = trees[0].tree_.n_features if len(trees) > 0 else 0
+        self.split_feature = None
+        self.split_threshold = None
+        self.split_index = None
+        self.split_bits = None
+        self.leaf_table = None
+        self.table_offsets = None
+        if len(trees) > 0 and self.depth <= LOOKUP_MAX_DEPTH:
+            self.pack_complete()
+
+    def pack_complete(self):
+        """
+        Pad every tree to a complete tree of the ensemble's depth and tabulate its leaves.
+
+        Splits are numbered level by level (heap order), each tree's 2**depth - 1 splits being the padded
+        nodes at each level, so a leaf's path sets a bit for every split it goes left at. The leaf a row
+        reaches only depends on those bits, so each tree gets a table of its leaf value for every bit
+        pattern. Splits shared by several trees are compared once, as the distinct (feature, threshold)
+        pairs in split_feature and split_threshold, which split_index maps each tree's splits to.
+        """
+        n_trees = len(self.roots)
+        n_splits = 2**self.depth - 1
+        feature = np.empty((n_splits, n_trees), dtype=np.int64)
+        threshold = np.empty((n_splits, n_trees), dtype=np.float64)
+        nodes = self.roots[None, :]
+        for level in range(self.depth):
+            feature[2**level - 1:2**(level + 1) - 1] = self.feature[nodes]
+            threshold[2**level - 1:2**(level + 1) - 1] = self.threshold[nodes]
+            # The children of the node at position i of a level are at 2i and 2i + 1 of the next
+            nodes = np.stack((self.left[nodes], self.right[nodes]), axis=1).reshape(-1, n_trees)
+        leaf_values = self.value[nodes]
+
+        # A float32 feature is <= a threshold exactly when it is <= the largest float32 not above it
+        threshold32 = threshold.astype(np.float32)
+        threshold32 = np.where(threshold32 > threshold, np.nextafter(threshold32, np.float32(-np.inf)), threshold32)
+        keys = (feature << 32) | threshold32.view(np.uint32).astype(np.int64)
+        unique_keys, split_index = np.unique(keys, return_inverse=True)
+        self.split_feature = (unique_keys >> 32).astype(np.intp)
+        self.split_threshold = (unique_keys & 0xFFFFFFFF).astype(np.uint32).view(np.float32)[:, None]
+        self.split_index = split_index.reshape(n_splits, n_trees)
+        self.split_bits = np.left_shift(np.uint8(1), np.arange(n_splits, dtype=np.uint8))[:, None, None]
+
+        # The leaf of every bit pattern, following the bit of each split from the root
+        leaf = np.zeros(2**n_splits, dtype=np.intp)
+        for _ in range(self.depth):
+            go_left = (np.arange(2**n_splits) >> leaf) & 1
+            leaf = np.where(go_left == 1, 2 * leaf + 1, 2 * leaf + 2)
+        leaf -= n_splits
+        self.leaf_table = leaf_values[leaf].T.ravel()
+        self.table_offsets = (np.arange(n_trees, dtype=np.intp) * 2**n_splits)[:, None]
+
+    def features(self, X):
+        """
+        Get the feature matrix in the layout the trees were fitted on.
+
+        Args:
+            X (pandas.DataFrame or array-like): The features, one row per prediction.
+
+        Returns:
+            numpy.ndarray: C-ordered float32 features, as sklearn's trees compare them.
+        """
+        if isinstance(X, pd.DataFrame):
+            if self.feature_names is not None and list(X.columns) != self.feature_names:
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict(self, X):
+        """
+        Predict a batch, by table lookup for shallow ensembles (the boosted models) and walking the trees otherwise.
+
+        Args:
+            X (pandas.DataFrame or array-like): The features, one row per prediction.
+
+        Returns:
+            numpy.ndarray: The predictions, equal to the model's predict to within float rounding.
+        """
+        if self.leaf_table is not None:
+            return self.lookup(X)
+        return self.walk(X)
+
+    def lookup(self, X):
+        """
+        Predict every row with every tree by comparing every split at once and looking up the leaves.
+
+        Each block of rows takes one comparison of every distinct split, then the bits of each tree's
+        splits are combined into an index into its leaf table, so no row steps down a tree.
+
+        Args:
+            X (pandas.DataFrame or array-like): The features, one row per prediction.
+
+        Returns:
+            numpy.ndarray: The predictions, equal to the model's predict to within float rounding.
+        """
+        X = self.features(X)
+        predictions = np.full(len(X), self.baseline, dtype=np.float64)
+        for start in range(0, len(X), LOOKUP_CHUNK_ROWS):
+            stop = min(start + LOOKUP_CHUNK_ROWS, len(X))
+            columns = np.ascontiguousarray(X[start:stop].T)
+            go_left = (columns[self.split_feature] <= self.split_threshold).view(np.uint8)
+            bits = go_left[self.split_index]
+            bits *= self.split_bits
+            pattern = np.bitwise_or.reduce(bits, axis=0).astype(np.intp)
+            pattern += self.table_offsets
+            predictions[start:stop] += np.take(self.leaf_table, pattern).sum(axis=0)
+        return predictions
+
+    def walk(self, X):
+        """
+        Predict every row with every tree at once.
+
+        Every row takes depth steps down every tree, which costs more per row than sklearn's predict, so
+        walked (deep) ensembles are only faster than sklearn for batches of up to about a hundred rows.
+
+        Args:
+            X (pandas.DataFrame or array-like): The features, one row per prediction.
+
+        Returns:
+            numpy.ndarray: The predictions, equal to the model's predict to within float rounding.
+        """
+        X = self.features(X)
+        n_trees = len(self.roots)
+        predictions = np.full(len(X), self.baseline, dtype=np.float64)
+        if n_trees == 0:
+            return predictions
+
+        chunk = max(1, PREDICT_CHUNK_PAIRS // n_trees)
+        flat = X.ravel()
+        for start in range(0, len(X), chunk):
+            stop = min(start + chunk, len(X))
+            # Position of each row's first feature in flat, so a row's value of feature f is flat[row_start + f]
+            row_start = (np.arange(start, stop, dtype=np.int64) * X.shape[1])[:, None]
+            node = np.broadcast_to(self.roots, (stop - start, n_trees))
+            for _ in range(self.depth):
+                go_left = flat[row_start + self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            predictions[start:stop] += self.value[node].sum(axis=1)
+        return predictions
+
+def export_model(model):
+    """
+    Pack a fitted gradient boosting or random forest model from get_model into flat node arrays.
+
+    Args:
+        model (GradientBoostingRegressor or RandomForestRegressor): The fitted model.
+
+    Returns:
+        packed_ensemble: The packed trees, predicting what the model does.
+
+    Raises:
+        ValueError: If the model is of another type, or a boosted model has an initial estimator other than
+                    the default mean or 'zero'.
+    """
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if isinstance(model, GradientBoostingRegressor):
+        if isinstance(model.init_, str) and model.init_ == 'zero':
+            baseline = 0.0
+        elif hasattr(model.init_, 'constant_'):
+            baseline = float(np.ravel(model.init_.constant_)[0])
+        else:
+            raise ValueError(f'Cannot export a gradient boosting model with init {model.init_!r}')
+        return packed_ensemble(list(model.estimators_[:, 0]), model.learning_rate, baseline, feature_names)
+    if isinstance(model, RandomForestRegressor):
+        return packed_ensemble(model.estimators_, 1 / len(model.estimators_), 0.0, feature_names)
+    raise ValueError(f'Cannot export a {type(model).__name__}, only gradient boosting and random forest models')
+
+def export_models(models):
+    """
+    Pack the fitted model of each position.
+
+    Args:
+        models (tuple): The fitted models for each position, from get_model.
+
+    Returns:
+        tuple: The packed_ensemble for each position.
+    """
+    return tuple(export_model(model) for model in models)
@@ -8,6 +8,7 @@ import fpl_auto.team as team
 import json
 import numpy as np
 from fpl_auto import evaluate as eval
+from fpl_auto import cache
 
 def parse_args():
     parser = argparse.ArgumentParser(description="FPL Automation Project: Team Manager")
@@ -30,6 +31,11 @@ def parse_args():
                         action=argparse.BooleanOptionalAction, default=False, help='Plot XP each week, default: False')
     parser.add_argument('-project_score', 
                         action=argparse.BooleanOptionalAction, default=False, help='If you are simulating part of a season, this will project your score for the rest of the season, use this with plot_score_comparison, default: false')
+    parser.add_argument('-cache_mb', type=float, default=None, help='Memory cap for cached gameweek data in MB, default: FPL_CACHE_MB or 256')
+    parser.add_argument('-element_ids',
+                        action=argparse.BooleanOptionalAction, default=False, help='Key players by FPL element ID rather than name, players who share a name are kept apart, default: False')
+    parser.add_argument('-cache_stats',
+                        action=argparse.BooleanOptionalAction, default=False, help='Print frame cache hits/misses at the end of the run, default: False')
     args = parser.parse_args()
     
     return args
@@ -39,6 +45,8 @@ season = inputs.season
 start_gw = inputs.start_gw
 repeat = inputs.repeat_until - 1
 project_score = inputs.project_score
+if inputs.cache_mb is not None:
+    cache.set_max_mb(inputs.cache_mb)
 
 def get_team_from_manager_id(manager_id):
     target_url = f'https://fantasy.premierleague.com/api/my-team/{manager_id}/'
@@ -47,15 +55,18 @@ def get_team_from_manager_id(manager_id):
     # Convert r to pds object
     r = json.loads(r)
     r = r['picks']
-    t = team.team(season, start_gw, 100)
+    t = team.team(season, start_gw, 100, element_ids=inputs.element_ids)
     for player in r:
+        if inputs.element_ids:
+            t.add_player(player['element'], t.positions_list[player['element']], (player['purchase_price'] / 10))
+            continue
         player_name = t.id_to_name(player['element'])
         t.add_player(player_name, t.positions_list[player_name], (player['purchase_price'] / 10))
     
     return t
 
 def my_team_at_gw1():
-    t = team.team(season, start_gw)
+    t = team.team(season, start_gw, element_ids=inputs.element_ids)
     t.add_player('Aaron Ramsdale', 'GK')
     t.add_player('Gabriel dos Santos Magalhães', 'DEF')
     t.add_player('Luke Shaw', 'DEF')
@@ -80,7 +91,7 @@ def main():
     elif inputs.starting_team == 'custom_2':
         t = get_team_from_manager_id(1) # 1 is my manager id
     else:
-        t = team.team(season, start_gw, 100)
+        t = team.team(season, start_gw, 100, element_ids=inputs.element_ids)
         t.initial_team_generator() #t = t.select_ideal_team(2, 12, 3, 12, 2, 7, 2, 5.5) 
 
     p_list = []
@@ -111,7 +122,7 @@ def main():
             t.return_subs_to_team()
             
             try:
-                t = team.team(season, i + 1, t.budget, t.transfers_left + 1, [t.gks, t.defs, t.mids, t.fwds, t.subs], t.chips_used, t.transfer_history, t.chip_triple_captain_available, t.chip_bench_boost_available, t.chip_free_hit_available, t.chip_wildcard_available, t.free_hit_team)
+                t = team.team(season, i + 1, t.budget, t.transfers_left + 1, [t.gks, t.defs, t.mids, t.fwds, t.subs], t.chips_used, t.transfer_history, t.chip_triple_captain_available, t.chip_bench_boost_available, t.chip_free_hit_available, t.chip_wildcard_available, t.free_hit_team, element_ids=inputs.element_ids)
             except FileNotFoundError:
                 print(f'GW{i} | End Reached')
                 break
@@ -125,6 +136,8 @@ def main():
     print(f'xp_sum: {xp_sum:.0f}')
     print(f'avg_xp: {xp_sum / len(p_list):.2f}')
     print(t.chips_used)
+    if inputs.cache_stats:
+        cache.print_stats()
 
     if inputs.save:
         eval.export_results(season, p_list, xp_list, t.chips_used, t.transfer_history)
@@ -4,9 +4,15 @@ Author: Benjamin Tindal
 '''
 
 import argparse
+import contextlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 from fpl_auto.data import fpl_data
 from fpl_auto import evaluate as eval
+from fpl_auto import model_cache
+from fpl_auto import elements
 import pandas as pd
 
 def parse_args():
@@ -15,7 +21,7 @@ def parse_args():
                         help='Location of Vastaav Dataset, default: data/')
     parser.add_argument('-model', type=str, default="gradientboost",
                         choices=[
-                            "linear", "randomforest", "gradientboost", "neuralnetwork"], 
+                            "linear", "randomforest", "gradientboost", "histgradientboost", "neuralnetwork"], 
                         help='Model type to use, default: gradientboost')
     parser.add_argument('-season', type=str, required=True, choices=['2021-22', '2022-23', '2023-24', '2024-25'], help='Season to predict points for. Format: YYYY-YY e.g 2021-22')
     parser.add_argument('-target_gw', type=int, default=1, help='Gameweek to predict points for, default 1')
@@ -30,7 +36,27 @@ def parse_args():
                         action=argparse.BooleanOptionalAction, default=False, help='Whether to export predictions to tsv, default: False')
     parser.add_argument('-score_train_vs_test',
                         action=argparse.BooleanOptionalAction, default=False, help='Print RMSE, AE etc.. of model on training and test data, default: False')
+    parser.add_argument('-jobs', type=int, default=1, help='How many target gameweeks to run at once in worker processes, default: 1')
+    parser.add_argument('-model_jobs', type=int, default=1, help='How many of the four position models to fit at once, -1 for all four, default: 1')
+    parser.add_argument('-seed', type=int, default=None, help='Random seed for the models, default: unseeded')
+    parser.add_argument('-fit_times',
+                        action=argparse.BooleanOptionalAction, default=False, help='Print how long each position model took to fit, default: False')
+    parser.add_argument('-warm_start', type=int, default=0, help='Continue the previous gameweek\'s boosted models with this many extra stages instead of refitting, 0 to refit every gameweek, default: 0')
+    parser.add_argument('-refit_every', type=int, default=4, help='With -warm_start, fit from scratch every this many gameweeks, default: 4')
+    parser.add_argument('-time_budget', type=float, nargs='+', default=None, help='Fit each position model within this many seconds, stopping early once it stops improving on a validation fold of the training data; one value for every position or four for GK DEF MID FWD, default: no budget')
+    parser.add_argument('-max_stages', type=int, nargs='+', default=None, help='Fit at most this many boosting stages, trees or epochs per position model, stopping early as with -time_budget; one value or four, default: no budget')
+    parser.add_argument('-refit',
+                        action=argparse.BooleanOptionalAction, default=False, help='Fit every model rather than reuse ones cached by earlier runs with the same settings and data, default: False')
+    parser.add_argument('-model_cache_mb', type=float, default=None, help='Disk cap for cached models in MB, default: FPL_MODEL_CACHE_MB or 512')
+    parser.add_argument('-model_cache_days', type=float, default=None, help='Drop cached models unused for this many days, default: FPL_MODEL_CACHE_DAYS or 30')
     args = parser.parse_args()
+    for budget in ['time_budget', 'max_stages']:
+        values = getattr(args, budget)
+        if values is not None and len(values) not in (1, 4):
+            parser.error(f'-{budget} takes one value for every position or four for GK DEF MID FWD')
+        if values is not None:
+            # One value applies to every position
+            setattr(args, budget, values[0] if len(values) == 1 else dict(zip(elements.POSITIONS, values)))
     
     return args
 
@@ -58,16 +84,26 @@ output_files = inputs.save
 # Initialise classes
 # Ensure that the correct location is specified for Vastaav data
 vastaav = fpl_data('data', season)
+# Whether full fits are budgeted and stopped early
+budgeted = inputs.time_budget is not None or inputs.max_stages is not None
+if not inputs.refit:
+    model_cache.open_model_cache(vastaav.data_location, inputs.model_cache_mb, inputs.model_cache_days)
 
-def main():
-    simulation_finished = False
-    count = 0
-    total_e = 0
-    total_rmse = 0
-    total_aa = 0
-    
-    # Predict points for GWi:
-    for i in range(target_gameweek, min(target_gameweek + repeat, 39)):
+def run_gameweeks(gameweeks):
+    """
+    Train, score and predict a run of target gameweeks in order, the first with models fitted from scratch
+    (or loaded from the model cache) and the rest warm started from the gameweek before with -warm_start.
+
+    Args:
+        gameweeks (list): The target gameweeks.
+
+    Yields:
+        dict: Per gameweek, the averaged 'error', 'rmse' (mean squared error) and 'accuracy', the 'predictions'
+              to export and the feature 'weights' to display. Stops after a gameweek with 'limit' set, which is
+              past the end of the data.
+    """
+    models = None
+    for i in gameweeks:
         # Retrain model each time
         # Lets sum up the last 10 gameweeks to get a more accurate representation of player performance
         try:
@@ -75,14 +111,32 @@ def main():
                 season, i - training_prev_weeks, i)
         except UnboundLocalError:
             print(f'Reached Prediction Limit for {season} GW{i}, can only predict 1 week beyond data.')
-            quit()
+            yield {'gameweek': i, 'limit': True}
+            return
+
+        if models is not None:
+            # Warm started models depend on every earlier gameweek, so only the full refits are cached
+            gk_model, def_model, mid_model, fwd_model = vastaav.update_models(models, training_data, inputs.warm_start)
+        elif budgeted:
+            # Stopped early on a fold of the training data, so the test scores below are as unbiased as get_model's
+            gk_model, def_model, mid_model, fwd_model = vastaav.get_budgeted_model(modelType, training_data, inputs.time_budget, inputs.max_stages, random_state=inputs.seed)
+        else:
+            cache_key = None if inputs.refit else (season, i, training_prev_weeks)
+            gk_model, def_model, mid_model, fwd_model = vastaav.get_model(modelType, training_data, n_jobs=inputs.model_jobs, random_state=inputs.seed, cache_key=cache_key)
 
-        gk_model, def_model, mid_model, fwd_model = vastaav.get_model(modelType, training_data)
+        if inputs.fit_times and vastaav.models_cached:
+            print(f'GW{i} Fit: loaded from the model cache')
+        elif inputs.fit_times and budgeted and models is None:
+            print(f'GW{i} Fit: ' + ', '.join(f'{position}: {seconds:.2f}s ({vastaav.fit_stages[position] or "-"} stages)' for position, seconds in vastaav.fit_times.items()) + f', wall-clock: {vastaav.fit_wall_time:.2f}s')
+        elif inputs.fit_times:
+            print(f'GW{i} Fit: ' + ', '.join(f'{position}: {seconds:.2f}s' for position, seconds in vastaav.fit_times.items()) + f', wall-clock: {vastaav.fit_wall_time:.2f}s')
 
+        weights = None
         if display_weights:
+            # Plotted by main(), which a worker process cannot do
             feature_list = training_data[0][0].columns
-            importances = [gk_model.feature_importances_, def_model.feature_importances_, mid_model.feature_importances_, fwd_model.feature_importances_]
-            eval.display_weights(i, importances, feature_list, ['GK', 'DEF', 'MID', 'FWD'])
+            importances = [eval.feature_importances(model, *test_data[j]) for j, model in enumerate([gk_model, def_model, mid_model, fwd_model])]
+            weights = (importances, feature_list)
         
         test_gk_predictions = np.round(gk_model.predict(test_data[0][0]), 5)
         test_def_predictions = np.round(def_model.predict(test_data[1][0]), 5)
@@ -107,7 +161,7 @@ def main():
 
             print(f'GW{i} Test: GK: AE: {test_gk_error:.3f}, RMSE: {np.sqrt(test_gk_square_error):.3f}, ACC: {test_gk_accuracy*100:.2f}%')
             print(f'GW{i} Train: GK: AE: {training_gk_error:.3f}, RMSE: {np.sqrt(training_gk_square_error):.3f}, ACC: {training_gk_accuracy*100:.2f}%')
-            
+        
             print(f'GW{i} Test: DEF: AE: {test_def_error:.3f}, RMSE: {np.sqrt(test_def_square_error):.3f}, ACC: {test_def_accuracy*100:.2f}%')
             print(f'GW{i} Train: DEF: AE: {training_def_error:.3f}, RMSE: {np.sqrt(training_def_square_error):.3f}, ACC: {training_def_accuracy*100:.2f}%')
 
@@ -123,11 +177,8 @@ def main():
         rmse = (test_gk_square_error + test_def_square_error + test_mid_square_error + test_fwd_square_error) / 4
         aa = (test_gk_accuracy + test_def_accuracy + test_mid_accuracy + test_fwd_accuracy) / 4
 
-        count += 1
-        total_e += error
-        total_rmse += rmse
-        total_aa += aa
-
+        # Every gameweek before this one was counted, or the run would have stopped
+        count = i - target_gameweek + 1
         print(f'Count: {count}, AE: {error:.2f}, RMSE: {np.sqrt(rmse):.2f}, Accuracy: {aa*100:.2f}%')
 
         # Lets use these models to predict the next gameweek
@@ -150,11 +201,83 @@ def main():
         if weeks_left > 1:
             clean_predictions = vastaav.post_model_weightings_for_next_gw(clean_predictions, i-1)
 
+        yield {'gameweek': i, 'limit': False, 'error': error, 'rmse': rmse, 'accuracy': aa,
+               'predictions': clean_predictions, 'weights': weights}
+        if inputs.warm_start == 0:
+            models = None
+
+def run_block(gameweeks):
+    """
+    Run a block of target gameweeks in a worker process.
+
+    Args:
+        gameweeks (list): The target gameweeks, warm started from the first with -warm_start.
+
+    Returns:
+        list: run_gameweeks' result for each gameweek, with what it printed as 'output'.
+    """
+    results = []
+    steps = run_gameweeks(gameweeks)
+    while True:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            result = next(steps, None)
+        if result is None:
+            return results
+        result['output'] = output.getvalue()
+        results.append(result)
+
+def main():
+    count = 0
+    total_e = 0
+    total_rmse = 0
+    total_aa = 0
+
+    # Warm started gameweeks follow on from the one before, so each block of -refit_every gameweeks runs in order
+    gameweeks = list(range(target_gameweek, min(target_gameweek + repeat, 39)))
+    block_size = inputs.refit_every if inputs.warm_start > 0 else 1
+    blocks = [gameweeks[j:j + block_size] for j in range(0, len(gameweeks), block_size)]
+
+    # Workers use this module's vastaav and inputs as they were when the pool forked, other start methods would
+    # import the script afresh without them
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    if inputs.jobs > 1 and not fork:
+        print('-jobs needs processes started by fork, which this platform lacks, running one gameweek at a time')
+    if inputs.jobs > 1 and fork:
+        # Build the seasons' training features before the pool forks, so every worker shares them rather than building its own
+        vastaav.get_feature_tensor(season)
+        if target_gameweek - training_prev_weeks < 1:
+            vastaav.get_feature_tensor(prev_season)
+        pool = ProcessPoolExecutor(max_workers=inputs.jobs, mp_context=multiprocessing.get_context('fork'))
+        # Blocks come back in gameweek order, whichever finishes first
+        results = (result for block in pool.map(run_block, blocks) for result in block)
+    else:
+        pool = None
+        results = (result for block in blocks for result in run_gameweeks(block))
+
+    # Predict points for GWi:
+    for result in results:
+        print(result.get('output', ''), end='')
+        if result['limit']:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            quit()
+
+        i = result['gameweek']
+        if result['weights'] is not None:
+            importances, feature_list = result['weights']
+            eval.display_weights(i, importances, feature_list, ['GK', 'DEF', 'MID', 'FWD'])
+
+        count += 1
+        total_e += result['error']
+        total_rmse += result['rmse']
+        total_aa += result['accuracy']
+
         if output_files:
-            eval.export_tsv(clean_predictions, season, i)
-        
-        if simulation_finished:
-            break
+            eval.export_tsv(result['predictions'], season, i)
+
+    if pool is not None:
+        pool.shutdown()
 
     if repeat > 1:
         total_e /= count
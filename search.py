@@ -0,0 +1,184 @@
+'''
+Hyperparameter Search for FPL Automation Project
+Author: Benjamin Tindal
+'''
+
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from fpl_auto import elements
+from fpl_auto import metrics
+from fpl_auto.data import fpl_data
+
+# Hyperparameters tried for each model type unless -grid is given, every combination is a configuration
+DEFAULT_GRIDS = {
+    'linear': {'fit_intercept': [True, False]},
+    'randomforest': {'n_estimators': [100, 300], 'max_features': [5, 20, 100], 'min_samples_leaf': [1, 5]},
+    'gradientboost': {'n_estimators': [60, 110, 200], 'learning_rate': [0.05, 0.1, 0.2], 'max_features': [5, 10, 20]},
+    'histgradientboost': {'learning_rate': [0.05, 0.1, 0.2], 'max_depth': [2, 3, 5], 'l2_regularization': [0.0, 1.0]},
+    'neuralnetwork': {'hidden_layer_sizes': [[50], [100, 100], [100, 100, 100, 100]], 'alpha': [0.0001, 0.01]},
+}
+
+# The fpl_data and the (training data, target gameweek data) of each walk-forward window, set by init_worker
+# in every worker process (and in the main process when running serially)
+vastaav = None
+windows = []
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="FPL Automation Project: Hyperparameter Search")
+    parser.add_argument('-gw_data', type=str, default='data',
+                        help='Location of Vastaav Dataset, default: data')
+    parser.add_argument('-model', type=str, default="gradientboost",
+                        choices=[
+                            "linear", "randomforest", "gradientboost", "histgradientboost", "neuralnetwork"],
+                        help='Model type to tune, default: gradientboost')
+    parser.add_argument('-season', type=str, default='2023-24', help='Season to tune on. Format: YYYY-YY e.g 2021-22, default: 2023-24')
+    parser.add_argument('-target_gw', type=int, default=10, help='First gameweek to predict, default: 10')
+    parser.add_argument('-repeat', type=int, default=10, help='How many walk-forward windows to evaluate over, default: 10')
+    parser.add_argument('-training_prev_weeks', type=int, default=19, help='How many past weeks of data to use for training, default: 19')
+    parser.add_argument('-grid', type=json.loads, default=None,
+                        help='Hyperparameters to try as JSON, e.g. \'{"learning_rate": [0.05, 0.1], "max_depth": [3, 4]}\', default: DEFAULT_GRIDS for -model')
+    parser.add_argument('-halving',
+                        action=argparse.BooleanOptionalAction, default=False, help='Successive halving: score every configuration on a few windows and only the best on more, default: False')
+    parser.add_argument('-factor', type=int, default=3, help='With -halving, keep the best 1 in this many configurations per round, and multiply the windows by it, default: 3')
+    parser.add_argument('-min_windows', type=int, default=1, help='With -halving, windows in the first round, default: 1')
+    parser.add_argument('-jobs', type=int, default=1, help='How many configurations to evaluate at once in worker processes, default: 1')
+    parser.add_argument('-seed', type=int, default=0, help='Random seed for the models, the same for every configuration, default: 0')
+    parser.add_argument('-top', type=int, default=5, help='How many configurations per position to print, default: 5')
+    parser.add_argument('-output', type=str, default=None, help='Leaderboard TSV to write, default: results/[season]/[season]_[model]_search.tsv')
+    args = parser.parse_args()
+
+    return args
+
+def configurations(grid):
+    """
+    List every combination of a hyperparameter grid.
+
+    Args:
+        grid (dict): Hyperparameter --> list of values.
+
+    Returns:
+        list: A dict of hyperparameter --> value for each combination.
+    """
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def init_worker(data_location, season, window_data):
+    """
+    Give a worker process the windows to evaluate on.
+
+    The windows are passed in rather than read from the parent's globals, so workers started by spawn or
+    forkserver get them too (forked workers share the parent's copy either way).
+
+    Args:
+        data_location (str): The location of the data, for the fpl_data that builds the models.
+        season (str): The season tuned on.
+        window_data (list): The (training data, target gameweek data) of each walk-forward window.
+    """
+    global vastaav, windows
+    vastaav = fpl_data(data_location, season)
+    windows = window_data
+
+def evaluate_config(task):
+    """
+    Fit one position's model with one configuration on each of the first windows, and score it on their target gameweeks.
+
+    Args:
+        task (tuple): (model type, position index, configuration, number of windows, seed).
+
+    Returns:
+        dict: The position, configuration and windows, with the mean 'rmse', 'error' and 'accuracy' over the
+              target gameweeks and the mean 'fit_time' in seconds.
+    """
+    model_type, position, config, n_windows, seed = task
+    if len(windows) < n_windows:
+        raise RuntimeError(f'Worker has {len(windows)} windows of the {n_windows} to evaluate on, was init_worker run?')
+    scores = {metric: [] for metric in metrics.METRICS}
+    fit_times = []
+    for training_data, target_data in windows[:n_windows]:
+        model = vastaav.make_models(model_type, seed)[position]
+        model.set_params(**config)
+        features, labels = training_data[position]
+        start = time.perf_counter()
+        model.fit(features, labels)
+        fit_times.append(time.perf_counter() - start)
+
+        target_features, target_labels = target_data[position]
+        window_scores = metrics.score(np.round(model.predict(target_features), 5), target_labels.to_numpy())
+        for metric in metrics.METRICS:
+            scores[metric].append(float(window_scores[metric]))
+
+    result = {'position': elements.POSITIONS[position], 'params': json.dumps(config, sort_keys=True), 'windows': n_windows}
+    result.update({metric: np.mean(values) for metric, values in scores.items()})
+    result['fit_time'] = np.mean(fit_times)
+    return result
+
+def main():
+    inputs = parse_args()
+    grid = inputs.grid if inputs.grid is not None else DEFAULT_GRIDS[inputs.model]
+    configs = configurations(grid)
+
+    # Built once, fitting a configuration only reads them
+    start = time.perf_counter()
+    data_location = inputs.gw_data.rstrip('/')
+    fpl = fpl_data(data_location, inputs.season)
+    targets = range(inputs.target_gw, min(inputs.target_gw + inputs.repeat, 39))
+    window_data = [(fpl.get_training_data_all(inputs.season, i - inputs.training_prev_weeks, i)[0], fpl.get_training_data(inputs.season, i))
+                   for i in targets]
+    print(f'{inputs.season} GW{targets[0]}-{targets[-1]}: {len(window_data)} walk-forward windows of {inputs.training_prev_weeks} weeks built in {time.perf_counter() - start:.2f}s')
+    print(f'{inputs.model}: {len(configs)} configurations of {", ".join(sorted(grid))}')
+
+    if inputs.jobs > 1:
+        pool = ProcessPoolExecutor(max_workers=inputs.jobs, initializer=init_worker, initargs=(data_location, inputs.season, window_data))
+    else:
+        pool = None
+        init_worker(data_location, inputs.season, window_data)
+    candidates = {position: configs for position in range(len(elements.POSITIONS))}
+    n_windows = min(inputs.min_windows, len(window_data)) if inputs.halving else len(window_data)
+    results = []
+    while True:
+        tasks = [(inputs.model, position, config, n_windows, inputs.seed) for position, position_configs in candidates.items() for config in position_configs]
+        start = time.perf_counter()
+        round_results = list(pool.map(evaluate_config, tasks) if pool is not None else map(evaluate_config, tasks))
+        print(f'Evaluated {len(tasks)} position configurations on {n_windows} windows in {time.perf_counter() - start:.2f}s')
+        results += round_results
+        if not inputs.halving or n_windows >= len(window_data):
+            break
+
+        # Only the best of each position go on to the next round, on more windows
+        for position in candidates:
+            ranked = sorted((result for result in round_results if result['position'] == elements.POSITIONS[position]), key=lambda result: result['rmse'])
+            keep = {result['params'] for result in ranked[:math.ceil(len(ranked) / inputs.factor)]}
+            candidates[position] = [config for config in candidates[position] if json.dumps(config, sort_keys=True) in keep]
+        n_windows = min(n_windows * inputs.factor, len(window_data))
+
+    if pool is not None:
+        pool.shutdown()
+
+    # Configurations scored on more windows rank above those dropped earlier, then by RMSE
+    leaderboard = pd.DataFrame(results).sort_values(['windows', 'rmse'], ascending=[False, True])
+    leaderboard = leaderboard.drop_duplicates(['position', 'params'])
+    leaderboard['position'] = pd.Categorical(leaderboard['position'], elements.POSITIONS, ordered=True)
+    leaderboard = leaderboard.sort_values(['position', 'windows', 'rmse'], ascending=[True, False, True], kind='stable')
+    leaderboard.insert(1, 'rank', leaderboard.groupby('position', observed=True).cumcount() + 1)
+    leaderboard = leaderboard[['position', 'rank', 'rmse', 'error', 'accuracy', 'fit_time', 'windows', 'params']]
+
+    output = inputs.output if inputs.output is not None else f'results/{inputs.season}/{inputs.season}_{inputs.model}_search.tsv'
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    leaderboard.to_csv(output, sep='\t', index=False, float_format='%.4f')
+
+    for position in elements.POSITIONS:
+        print(f'{position}:')
+        for _, row in leaderboard[leaderboard['position'] == position].head(inputs.top).iterrows():
+            print(f'  {row["rank"]:3d}. RMSE: {row["rmse"]:.3f}, AE: {row["error"]:.3f}, ACC: {row["accuracy"]*100:.2f}%, '
+                  f'Fit: {row["fit_time"]:.2f}s, Windows: {row["windows"]}, {row["params"]}')
+    print(f'- Saved leaderboard to {output}')
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,26 @@
 import unittest
+import datetime
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
 from fpl_auto import team
+from fpl_auto import store
+from fpl_auto import cache
+from fpl_auto import gw_calendar
+from fpl_auto import fixtures
+from fpl_auto import rolling
+from fpl_auto import manifest
+from fpl_auto import metrics
+from fpl_auto import evaluate
+from fpl_auto import model_cache
+from fpl_auto import trees
+from fpl_auto import budget
+from fpl_auto.data import fpl_data, DIFFICULTY_WEIGHTS
+import search
 
 class TestTeam(unittest.TestCase):
     def testMaxThreeFromSameTeam(self):
@@ -34,6 +55,383 @@ class TestTeam(unittest.TestCase):
         t.add_player('Andrew Robertson', 'DEF')
         self.assertFalse(t.add_player('Andrew Robertson', 'DEF'))
 
+    def testElementIdsSeparatePlayersWhoShareAName(self):
+        t = team.team('2021-22', 20, 100, element_ids=True)
+        _, name_to_ids = t.fpl.get_element_names()
+        liverpool, spurs = name_to_ids['Ben Davies'] # Two defenders called Ben Davies
+        self.assertEqual(t.player_value(liverpool, t.gw_data), 4.0)
+        self.assertEqual(t.player_value(spurs, t.gw_data), 4.5)
+        self.assertNotEqual(t.fpl.get_player_team(liverpool, 20, t.gw_data), t.fpl.get_player_team(spurs, 20, t.gw_data))
+        self.assertEqual(t.player_name(spurs), 'Ben Davies')
+
+class TestData(unittest.TestCase):
+    def testGwStoreMatchesCsv(self):
+        vastaav = fpl_data('data', '2023-24')
+        csv_data = pd.read_csv('data/2023-24/gws/gw10.csv')[store.GW_COLUMNS].set_index('name')
+        pd.testing.assert_frame_equal(vastaav.get_gw_data('2023-24', 10), csv_data)
+
+    def testCompactLoadingKeepsNumbers(self):
+        csv_data = pd.read_csv('data/2023-24/gws/gw10.csv')[store.STORE_COLUMNS]
+        compact = store.open_store('data', '2023-24').get_week(10, compact=True)
+        self.assertEqual(compact['team'].dtype, 'category')
+        for column in store.STORE_COLUMNS:
+            if csv_data[column].dtype == object:
+                np.testing.assert_array_equal(compact[column].astype(object), csv_data[column])
+            elif csv_data[column].dtype == np.float64:
+                self.assertEqual(compact[column].dtype, np.float32)
+                np.testing.assert_array_equal(compact[column], csv_data[column].astype(np.float32))
+            else:
+                np.testing.assert_array_equal(compact[column], csv_data[column])
+
+        vastaav = fpl_data('data', '2022-23')
+        profiled = vastaav.get_csv('2022-23', 'fixtures.csv')
+        self.assertNotIn('stats', profiled.columns)
+        full_index = fixtures.fixture_index(pd.read_csv('data/2022-23/fixtures.csv'))
+        for key, array in vars(vastaav.get_fixture_index('2022-23')).items():
+            np.testing.assert_array_equal(array, vars(full_index)[key])
+
+    def testBulkLoadMatchesCsvs(self):
+        stores = fpl_data('data', '2023-24').bulk_load(['2023-24'], directories=('players', 'understat'), workers=2)
+        player_dir = 'Mohamed_Salah_308'
+        pd.testing.assert_frame_equal(stores[('2023-24', 'players')].get_part(player_dir), pd.read_csv(f'data/2023-24/players/{player_dir}/gw.csv'))
+        understat = stores[('2023-24', 'understat')]
+        self.assertNotIn('understat_Arsenal', understat.parts)
+        for key in list(understat.parts)[:5]:
+            pd.testing.assert_frame_equal(understat.get_part(key), pd.read_csv(f'data/2023-24/understat/{key}.csv'))
+
+    def testPlayerHistoryMatchesCsv(self):
+        player_history = fpl_data('data', '2023-24').get_player_history('2023-24')
+        csv_data = pd.read_csv('data/2023-24/players/Mohamed_Salah_308/gw.csv')
+        last_k = player_history.last_k(308, 3, ['round', 'total_points'], before_round=20)
+        np.testing.assert_array_equal(last_k['total_points'], csv_data[csv_data['round'] < 20]['total_points'].tail(3))
+        means = player_history.window_means([308, 100000], ['total_points', 'bps'], 5, 10)
+        in_range = csv_data[csv_data['round'].between(5, 10)]
+        self.assertAlmostEqual(means.loc[308, 'bps'], in_range['bps'].mean())
+        self.assertTrue(means.loc[100000].isna().all())
+
+    def testAllPosDataMatchesPerPosition(self):
+        vastaav = fpl_data('data', '2022-23')
+        for week_num in [10, -1]: # GW-1 is last season's GW37, with clubs missing from this season's team list
+            all_pos_data = vastaav.get_all_pos_data('2022-23', week_num)
+            for pos_data, position in zip(all_pos_data, ['GK', 'DEF', 'MID', 'FWD']):
+                pd.testing.assert_frame_equal(pos_data, vastaav.get_pos_data('2022-23', week_num, position))
+
+    def testParallelModelsMatchSerial(self):
+        vastaav = fpl_data('data', '2023-24')
+        training_data, test_data = vastaav.get_training_data_all('2023-24', 5, 10)
+        serial = vastaav.get_model('gradientboost', training_data, random_state=7)
+        parallel = vastaav.get_model('gradientboost', training_data, n_jobs=4, random_state=7)
+        for serial_model, parallel_model, (features, _) in zip(serial, parallel, test_data):
+            np.testing.assert_array_equal(serial_model.predict(features), parallel_model.predict(features))
+        self.assertEqual(list(vastaav.fit_times), ['GK', 'DEF', 'MID', 'FWD'])
+
+    def testHistGradientBoostFitsAndExplains(self):
+        vastaav = fpl_data('data', '2023-24')
+        training_data, test_data = vastaav.get_training_data_all('2023-24', 5, 10)
+        models = vastaav.get_model('histgradientboost', training_data, random_state=7)
+        for model, (features, labels) in zip(models, test_data):
+            self.assertLessEqual(model.n_iter_, 500)
+            self.assertLess(evaluate.score_model(model.predict(features), labels)[1], 1.5)
+            # No impurity importances of its own, so the features are shuffled instead
+            self.assertEqual(evaluate.feature_importances(model, features, labels).shape, (features.shape[1],))
+
+    def testUpdateModelsAddsStages(self):
+        vastaav = fpl_data('data', '2023-24')
+        training_data, _ = vastaav.get_training_data_all('2023-24', 5, 10)
+        models = vastaav.get_model('gradientboost', training_data, random_state=7)
+        first_stage = models[1].estimators_[0, 0].tree_.threshold.copy()
+        next_data, _ = vastaav.get_training_data_all('2023-24', 6, 11)
+        vastaav.update_models(models, next_data, n_new=5)
+        self.assertEqual(models[1].estimators_.shape[0], 115)
+        np.testing.assert_array_equal(models[1].estimators_[0, 0].tree_.threshold, first_stage) # Earlier stages are kept
+
+        forest = RandomForestRegressor(n_estimators=20, oob_score=True, random_state=7).fit(*training_data[1])
+        vastaav.update_models((forest,), next_data[1:2])
+        self.assertEqual(len(forest.estimators_), 20) # Refitted rather than grown
+        self.assertFalse(forest.warm_start)
+
+    def testNextGwWeightingsMatchPerPlayerLoop(self):
+        rng = np.random.default_rng(0)
+        for season, week_num in [('2021-22', 10), ('2022-23', 6), ('2023-24', 20)]:
+            vastaav = fpl_data('data', season)
+            gw_data = vastaav.get_gw_data(season, week_num)
+            names = list(gw_data.index.unique()) + ['Not A Player']
+            # Four decimal places, so many weighted xP end in a 5 that the two roundings split differently
+            predictions = [pd.DataFrame({'xP': np.round(rng.uniform(0, 10, len(names)), 4)}, index=pd.Index(names, name='Name'))]
+            weighted = vastaav.post_model_weightings_for_next_gw(predictions, week_num)[0]
+
+            # The per-player loop it replaced, rounding each float64 xP with numpy
+            expected = []
+            for name, xP in zip(names, predictions[0]['xP'].to_numpy()):
+                try:
+                    team_id = vastaav.team_to_id[vastaav.get_player_team(name, week_num, gw_data)]
+                    fixture = vastaav.get_future_fixtures_for_player(name, week_num, gw_data).iloc[0]
+                except (KeyError, TypeError):
+                    expected.append(0)
+                    continue
+                home = fixture['team_h'] == team_id
+                difficulty = fixture['team_h_difficulty'] if home else fixture['team_a_difficulty']
+                expected.append(round(xP + (xP * (0.1 if home else -0.1) + xP * DIFFICULTY_WEIGHTS[difficulty]), 3))
+            np.testing.assert_array_equal(weighted['xP'].to_numpy(), np.array(expected, dtype=np.float64))
+
+    def testRollingWindowMatchesGroupbyMean(self):
+        vastaav = fpl_data('data', '2023-24')
+        vastaav.rolling_window('2023-24', 'MID', [5, 6, 7, 8])
+        rolled = vastaav.rolling_window('2023-24', 'MID', [6, 7, 8, 9]) # Drops GW5, adds GW9
+        concat = pd.concat([vastaav.get_pos_data('2023-24', i, 'MID') for i in [6, 7, 8, 9]])
+        expected = concat.groupby('name').mean()
+        pd.testing.assert_index_equal(rolled.index, expected.index)
+        pd.testing.assert_index_equal(rolled.columns, expected.columns)
+        # Whole number columns are exact, tenths differ from groupby().mean()'s compensated sums by a bit or two at most
+        tenths = ['creativity', 'influence', 'threat']
+        np.testing.assert_array_equal(rolled.drop(columns=tenths).to_numpy(), expected.drop(columns=tenths).to_numpy(dtype=np.float64))
+        np.testing.assert_allclose(rolled[tenths].to_numpy(), expected[tenths].to_numpy(), rtol=1e-15, atol=0)
+
+        # Values with no exact scale, NaNs, whole numbers that later get tenths and a player with two rows in a week
+        weeks = {1: pd.DataFrame({'x': [1e-300, 0.5, np.nan], 'y': [1.0, 2.0, np.nan]}, index=pd.Index(['a', 'b', 'a'], name='name')),
+                 2: pd.DataFrame({'x': [0.1, 1e300, 0.2], 'y': [0.5, 1.5, 2.5]}, index=pd.Index(['a', 'a', 'b'], name='name')),
+                 3: pd.DataFrame({'x': [0.3], 'y': [3.0]}, index=pd.Index(['c'], name='name'))}
+        window = rolling.rolling_means(lambda week_num: weeks[week_num])
+        window.move_to([1, 2])
+        pd.testing.assert_frame_equal(window.means(), pd.concat([weeks[1], weeks[2]]).groupby('name').mean())
+        window.move_to([2, 3])
+        pd.testing.assert_frame_equal(window.means(), pd.concat([weeks[2], weeks[3]]).groupby('name').mean())
+
+    def testGwStoreMissingWeek(self):
+        vastaav = fpl_data('data', '2024-25')
+        with self.assertRaises(UnboundLocalError):
+            vastaav.get_gw_data('2024-25', 20)
+
+    def testDiscountNextGws(self):
+        vastaav = fpl_data('data', '2023-24')
+        predictions = [pd.read_csv(f'predictions/2023-24/GW10/{pos}.tsv', sep='\t') for pos in ['GK', 'DEF', 'MID', 'FWD']]
+        discounted = vastaav.discount_next_n_gws(predictions, 10, 5, discount_factor=0.8)
+        next_gws = vastaav.post_model_weightings(predictions, 10, 5)
+        for pos, pos_next_gws in zip(discounted, next_gws):
+            for xP, xp_array in zip(pos['xP'], pos_next_gws['xP']):
+                self.assertEqual(xP, round(np.mean([p * 0.8 ** i for i, p in enumerate(xp_array)]), 2))
+
+    def testFeatureTensorMatchesConcat(self):
+        vastaav = fpl_data('data', '2023-24')
+        pieces = vastaav.get_feature_tensor('2023-24').get_weeks(5, 8)
+        weeks = [vastaav.get_training_data('2023-24', i) for i in [5, 6, 7, 8]]
+        for position in range(4):
+            self.assertEqual(len(pieces[position]), 1) # One slice, no concatenation
+            features, labels = pieces[position][0]
+            pd.testing.assert_frame_equal(features, pd.concat([week[position][0] for week in weeks]))
+            pd.testing.assert_series_equal(labels, pd.concat([week[position][1] for week in weeks]))
+
+class TestCalendar(unittest.TestCase):
+    def testRecentGwFromFixtures(self):
+        calendar = gw_calendar.gw_calendar('data', '2024-25')
+        self.assertEqual(calendar.finished_gw, 4)
+        self.assertEqual(calendar.current_gw(datetime.datetime(2024, 8, 1)), 0)
+        self.assertEqual(calendar.current_gw(datetime.datetime(2024, 8, 20)), 1)
+
+    def testNonPlayersEmptyForUnplayedWeek(self):
+        vastaav = fpl_data('data', '2024-25')
+        self.assertEqual(len(vastaav.non_players('2024-25', 6)), 0) # No gw6.csv yet
+
+class TestFixtures(unittest.TestCase):
+    def testBlankAndDoubleGameweeks(self):
+        all_fixtures = pd.read_csv('data/2022-23/fixtures.csv')
+        index = fixtures.fixture_index(all_fixtures)
+        self.assertEqual(index.n_fixtures[1, 6], 0) # Arsenal blank in GW7
+        self.assertEqual(index.n_fixtures[1, 22], 2) # Arsenal double in GW23
+        self.assertTrue((index.n_fixtures[1:].sum(axis=1) == 38).all())
+
+    def testNextFixturesMatchCsv(self):
+        all_fixtures = pd.read_csv('data/2022-23/fixtures.csv')
+        index = fixtures.fixture_index(all_fixtures)
+        next_fixtures = index.next_fixtures([1, 0], 20, 5)
+        expected = all_fixtures[(all_fixtures['event'] > 20) & ((all_fixtures['team_h'] == 1) | (all_fixtures['team_a'] == 1))][0:5]
+        np.testing.assert_array_equal(next_fixtures['row'][0], expected.index)
+        np.testing.assert_array_equal(next_fixtures['event'][0], expected['event'])
+        np.testing.assert_array_equal(next_fixtures['is_home'][0], expected['team_h'] == 1)
+        self.assertTrue((next_fixtures['row'][1] == -1).all()) # No team, no fixtures
+
+    def testFixtureStatsMatchPlayerHistory(self):
+        table = fpl_data('data', '2023-24').get_fixture_table('2023-24')
+        self.assertNotIn('stats', table.fixtures.columns)
+        salah = table.get_stats().for_element(308)
+        player_history = pd.read_csv('data/2023-24/players/Mohamed_Salah_308/gw.csv').set_index('fixture')
+        np.testing.assert_array_equal(salah['bps'], player_history.loc[salah['fixture'], 'bps'])
+        self.assertEqual(salah['goals_scored'].sum(), player_history['goals_scored'].sum())
+        self.assertIs(fpl_data('data', '2023-24').get_fixture_table('2023-24'), table) # Read once per season
+
+class TestManifest(unittest.TestCase):
+    def testFingerprintFollowsContentNotMtime(self):
+        with tempfile.TemporaryDirectory() as data_location:
+            os.makedirs(f'{data_location}/2023-24/gws')
+            for week_num in [1, 2]:
+                shutil.copy(f'data/2023-24/gws/gw{week_num}.csv', f'{data_location}/2023-24/gws/gw{week_num}.csv')
+            season_manifest = manifest.manifest(data_location, '2023-24')
+            fingerprint = season_manifest.fingerprint(['gws/gw1.csv', 'gws/gw2.csv'])
+            gw1_fingerprint = season_manifest.fingerprint(['gws/gw1.csv'])
+            season_manifest.save()
+
+            os.utime(f'{data_location}/2023-24/gws/gw1.csv', (0, 0)) # Rewritten with the same contents
+            with open(f'{data_location}/2023-24/gws/gw2.csv', 'a') as f:
+                f.write('\n')
+            season_manifest = manifest.manifest(data_location, '2023-24')
+            self.assertEqual(season_manifest.refresh()['changed'], ['gws/gw2.csv'])
+            self.assertTrue(season_manifest.is_fresh(['gws/gw1.csv'], gw1_fingerprint))
+            self.assertFalse(season_manifest.is_fresh(['gws/gw1.csv', 'gws/gw2.csv'], fingerprint))
+
+class TestIngest(unittest.TestCase):
+    def testIngestParsesOnlyNewWeek(self):
+        with tempfile.TemporaryDirectory() as data_location:
+            os.makedirs(f'{data_location}/2023-24/gws')
+            for file_name in ['cleaned_players.csv', 'fixtures.csv', 'player_idlist.csv', 'players_raw.csv', 'teams.csv']:
+                shutil.copy(f'data/2023-24/{file_name}', f'{data_location}/2023-24/{file_name}')
+            for week_num in [1, 2, 3]:
+                shutil.copy(f'data/2023-24/gws/gw{week_num}.csv', f'{data_location}/2023-24/gws/gw{week_num}.csv')
+            fpl_data(data_location, '2023-24').ingest('2023-24') # Records the season as it is
+            store.open_store(data_location, '2023-24')
+
+            shutil.copy('data/2023-24/gws/gw4.csv', f'{data_location}/2023-24/gws/gw4.csv')
+            changes = fpl_data(data_location, '2023-24').ingest('2023-24')
+            self.assertEqual(changes['added'], ['gws/gw4.csv'])
+            self.assertEqual(changes['weeks'], [4])
+            self.assertEqual(store.open_store(data_location, '2023-24').build_stats['reused'], 3)
+
+            ingested = fpl_data(data_location, '2023-24')
+            fresh = fpl_data('data', '2023-24')
+            for week_num in [1, 2, 3, 4]:
+                pd.testing.assert_frame_equal(ingested.get_gw_data('2023-24', week_num), fresh.get_gw_data('2023-24', week_num))
+            store.close_store(data_location, '2023-24')
+
+    def testExportClearsStalePredictions(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                for week_num in [3, 5, 6]:
+                    os.makedirs(f'predictions/2023-24/GW{week_num}')
+                self.assertEqual(evaluate.mark_predictions_stale('2023-24', 4), [5, 6])
+                self.assertEqual(evaluate.mark_predictions_stale('2023-24', 4), []) # Already stale
+                predictions = [pd.DataFrame({'xP': [1.0, 2.0]}, index=pd.Index(['a', 'b'], name='name')) for _ in range(4)]
+                evaluate.export_tsv(predictions, '2023-24', 5)
+                self.assertEqual(evaluate.stale_predictions('2023-24'), [6])
+                self.assertTrue(os.path.exists('predictions/2023-24/GW5/MID.tsv'))
+            finally:
+                os.chdir(cwd)
+
+class TestModelCache(unittest.TestCase):
+    def testKeyFollowsDataAndHyperparameters(self):
+        fpl = fpl_data('data', '2023-24')
+        training_data, _ = fpl.get_training_data_all('2023-24', 8, 10)
+        models = fpl.get_model('linear', training_data)
+        training_hash = model_cache.data_hash(training_data)
+        key = model_cache.model_key('2023-24', 10, 2, 'linear', models, training_hash)
+        other_data, _ = fpl.get_training_data_all('2023-24', 7, 10)
+        self.assertNotEqual(key, model_cache.model_key('2023-24', 10, 2, 'linear', models, model_cache.data_hash(other_data)))
+        models[0].set_params(fit_intercept=False)
+        self.assertNotEqual(key, model_cache.model_key('2023-24', 10, 2, 'linear', models, training_hash))
+
+        with tempfile.TemporaryDirectory() as directory:
+            fitted = model_cache.model_cache(directory, 2**30, 86400)
+            self.assertIsNone(fitted.get(key))
+            fitted.put(key, models)
+            cached = fitted.get(key)
+            self.assertTrue(np.array_equal(cached[1].predict(training_data[1][0]), models[1].predict(training_data[1][0])))
+            self.assertEqual((fitted.hits, fitted.misses), (1, 1))
+
+            fitted.max_bytes = 0 # Everything is over the cap
+            fitted.evict()
+            self.assertEqual(fitted.stats()['models'], 0)
+
+class TestMetrics(unittest.TestCase):
+    def testMatchesPerRowLoop(self):
+        predictions = np.array([0.4, 2.5, 3.5, -1.2, 6.0, 1.49])
+        labels = pd.Series([0, 2, 3, 1, 6, 2], index=list('abcdef'))
+        error = np.mean([abs(p - l) for p, l in zip(predictions, labels)])
+        rmse = np.sqrt(np.mean([(p - l) ** 2 for p, l in zip(predictions, labels)]))
+        accuracy = np.mean([round(p) == l for p, l in zip(predictions, labels)]) # round(2.5) == 2, half to even
+        np.testing.assert_allclose(evaluate.score_model(predictions, labels), (error, rmse, accuracy))
+
+        groups = np.array([0, 1, 0, 2, 1, 0])
+        grouped = metrics.score_groups(predictions, labels, groups, n_groups=4)
+        for group in range(3):
+            rows = groups == group
+            expected = metrics.score(predictions[rows], labels[rows])
+            for metric in metrics.METRICS:
+                self.assertAlmostEqual(grouped[metric][group], expected[metric])
+        self.assertTrue(np.isnan(grouped['rmse'][3]))
+        batch = metrics.score_batch([predictions[:2], predictions[2:]], [labels[:2], labels[2:]])
+        self.assertAlmostEqual(batch['error'][1], metrics.score(predictions[2:], labels[2:])['error'])
+
+    def testBootstrapCoversEstimate(self):
+        rng = np.random.default_rng(0)
+        labels = rng.integers(0, 10, 500)
+        predictions = labels + rng.normal(0, 1, 500)
+        estimate = metrics.score(predictions, labels)
+        for intervals in [metrics.bootstrap(predictions, labels, random_state=0), metrics.bootstrap(predictions, labels, groups=np.arange(500) // 10, random_state=0)]:
+            for metric, (low, high) in intervals.items():
+                self.assertLess(low, estimate[metric])
+                self.assertGreater(high, estimate[metric])
+
+class TestBudget(unittest.TestCase):
+    def testStopsWithinBudget(self):
+        vastaav = fpl_data('data', '2023-24')
+        training_data, test_data = vastaav.get_training_data_all('2023-24', 5, 10)
+        models = vastaav.get_budgeted_model('gradientboost', training_data, max_stages={'GK': 20, 'DEF': 30, 'MID': 30, 'FWD': 30}, random_state=7)
+        self.assertLessEqual(vastaav.fit_stages['GK'], 20)
+        for model, stages in zip(models, vastaav.fit_stages.values()):
+            self.assertEqual(budget.fitted_stages(model), stages)
+        self.assertEqual(list(vastaav.fit_times), ['GK', 'DEF', 'MID', 'FWD'])
+
+        # A thousand trees take seconds, so the budget runs out first
+        forest, report = budget.fit_budgeted(RandomForestRegressor(n_estimators=1000, random_state=7), *training_data[1], test_data[1], time_budget=0.2)
+        self.assertEqual(report['stopped'], 'time')
+        self.assertEqual(len(forest.estimators_), report['stages'])
+        self.assertAlmostEqual(budget.validation_rmse(forest, test_data[1]), report['validation_rmse'])
+
+class TestSearch(unittest.TestCase):
+    def testScoresConfigurationOnTargetGameweek(self):
+        self.assertEqual(search.configurations({'b': [1, 2], 'a': [3]}), [{'a': 3, 'b': 1}, {'a': 3, 'b': 2}])
+        search.vastaav = fpl_data('data', '2023-24')
+        search.windows = [(search.vastaav.get_training_data_all('2023-24', 5, 10)[0], search.vastaav.get_training_data('2023-24', 10))]
+        result = search.evaluate_config(('linear', 2, {'fit_intercept': False}, 1, 0))
+        model = LinearRegression(fit_intercept=False).fit(*search.windows[0][0][2])
+        features, labels = search.windows[0][1][2]
+        self.assertAlmostEqual(result['rmse'], metrics.score(np.round(model.predict(features), 5), labels)['rmse'])
+        self.assertEqual((result['position'], result['params'], result['windows']), ('MID', '{"fit_intercept": false}', 1))
+
+class TestTrees(unittest.TestCase):
+    def testPackedMatchesSklearn(self):
+        vastaav = fpl_data('data', '2023-24')
+        training_data, test_data = vastaav.get_training_data_all('2023-24', 5, 10)
+        boosted = vastaav.get_model('gradientboost', training_data, random_state=7)
+        forest = RandomForestRegressor(n_estimators=5, random_state=7).fit(*training_data[1])
+        for model, packed, (features, _), (training_features, _) in zip(boosted, trees.export_models(boosted), test_data, training_data):
+            self.assertIsNotNone(packed.leaf_table) # Depth 3, predicted by table lookup
+            batch = pd.concat([training_features] * 2) # More than one chunk of rows
+            self.assertGreater(len(batch), trees.LOOKUP_CHUNK_ROWS)
+            np.testing.assert_allclose(packed.predict(batch), model.predict(batch), rtol=0, atol=1e-9)
+            np.testing.assert_allclose(packed.predict(features.iloc[:1]), model.predict(features.iloc[:1]), rtol=0, atol=1e-9)
+            np.testing.assert_allclose(packed.walk(features), model.predict(features), rtol=0, atol=1e-9)
+        features = test_data[1][0]
+        packed_forest = trees.export_model(forest)
+        self.assertIsNone(packed_forest.leaf_table) # Too deep for lookup, walked
+        np.testing.assert_allclose(packed_forest.predict(features.iloc[:1]), forest.predict(features.iloc[:1]), rtol=0, atol=1e-9)
+        np.testing.assert_allclose(packed_forest.predict(features.to_numpy()), forest.predict(features), rtol=0, atol=1e-9)
+        with self.assertRaises(ValueError):
+            trees.export_model(LinearRegression())
+
+class TestFrameCache(unittest.TestCase):
+    def testEvictsLeastRecentlyUsed(self):
+        frame = pd.DataFrame({'points': range(100)})
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        frames = cache.frame_cache(2 * size)
+        frames.get('a', lambda: frame)
+        frames.get('b', lambda: frame)
+        frames.get('a', lambda: frame)
+        frames.get('c', lambda: frame) # Should evict b, the least recently used
+        self.assertIn('a', frames.frames)
+        self.assertNotIn('b', frames.frames)
+        self.assertEqual((frames.hits, frames.misses, frames.evictions), (1, 3, 1))
+
 if __name__ == '__main__':
     unittest.main()
 